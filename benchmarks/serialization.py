@@ -0,0 +1,96 @@
+"""
+Compares serializing /crypto/all_by_symbol pages through the pydantic
+response models with the orjson path, run from the repository root:
+
+    PYTHONPATH=.:src python benchmarks/serialization.py --rows 1000 10000 100000
+
+Only serialization is measured, the rows are built in memory.
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from api.schemas import BinanceModel, KlinePage
+from api.serialization import dump_kline_page
+from database import BinanceData
+
+PAGE_FIELD = create_response_field('KlinePage', KlinePage)
+
+
+def make_rows(count: int) -> list[BinanceData]:
+    """Builds count hourly candles"""
+    start = datetime(2023, 1, 1)
+    return [
+        BinanceData(
+            id=i, interval='1h', symbol='BTCUSDT',
+            open_time=start + timedelta(hours=i),
+            open=Decimal('26666.87000000'), high=Decimal('26690.06000000'),
+            low=Decimal('26636.98000000'), close=Decimal('26690.05000000'),
+            volume=Decimal('519.80287000')
+        )
+        for i in range(count)
+    ]
+
+
+async def pydantic_page(rows: list[BinanceData]) -> bytes:
+    """The previous path: a model per row, then FastAPI validates and encodes the page"""
+    page = KlinePage(
+        items=[
+            BinanceModel(
+                id=row.id, interval=row.interval, symbol=row.symbol,
+                open_time=row.open_time, open=row.open, high=row.high,
+                low=row.low, close=row.close, volume=row.volume
+            )
+            for row in rows
+        ],
+        size=len(rows),
+        next_cursor=None
+    )
+    content = await serialize_response(field=PAGE_FIELD, response_content=page)
+    return JSONResponse(content).body
+
+
+async def orjson_page(rows: list[BinanceData]) -> bytes:
+    return dump_kline_page(rows, len(rows), None)
+
+
+async def orjson_compact_page(rows: list[BinanceData]) -> bytes:
+    return dump_kline_page(rows, len(rows), None, compact=True)
+
+
+async def best_of(render, rows: list[BinanceData], repeat: int) -> tuple[float, int]:
+    """Returns the fastest of repeat runs in seconds and the body size"""
+    best, body = float('inf'), b''
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = await render(rows)
+        best = min(best, time.perf_counter() - started)
+    return best, len(body)
+
+
+async def main(counts: list[int], repeat: int):
+    print(f'{"rows":>8} {"path":<16} {"ms":>10} {"bytes":>12} {"speedup":>8}')
+    for count in counts:
+        rows = make_rows(count)
+        baseline, _ = await best_of(pydantic_page, rows, repeat)
+        for name, render in (
+                ('pydantic', pydantic_page),
+                ('orjson', orjson_page),
+                ('orjson compact', orjson_compact_page)):
+            elapsed, size = await best_of(render, rows, repeat)
+            print(
+                f'{count:>8} {name:<16} {elapsed * 1000:>10.1f} {size:>12} '
+                f'{baseline / elapsed:>7.1f}x'
+            )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat))
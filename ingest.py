@@ -0,0 +1,13 @@
+import asyncio
+import logging
+from config import STREAM_SYMBOLS, STREAM_INTERVALS
+from response_binance import KlineStreamIngester
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level='INFO'.upper(),
+        format='%(asctime)s | %(levelname)s | %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    asyncio.run(KlineStreamIngester(STREAM_SYMBOLS, STREAM_INTERVALS).run())
@@ -1,14 +1,38 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 import uvicorn
 from fastapi import FastAPI
-from api import router
-from fastapi_paginate import add_pagination
+from api import router, CompressionMiddleware
+from config import JOB_WORKER_IN_API
+from database import partition_manager
+from export import ExportPool
+from response_binance import BinanceClient, JobWorker, price_hub
 
 
-app = FastAPI(title='Binance_API-service')
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await BinanceClient.start()
+    ExportPool.start()
+    # set JOB_WORKER_IN_API=0 when jobs and partition maintenance
+    # run in separate worker.py processes
+    worker = JobWorker() if JOB_WORKER_IN_API else None
+    worker_task = worker and asyncio.create_task(worker.run())
+    partitions_task = worker and asyncio.create_task(partition_manager.run())
+    yield
+    if worker is not None:
+        worker.stop()
+        partition_manager.stop()
+        await asyncio.gather(worker_task, partitions_task)
+    await price_hub.close()
+    await ExportPool.close()
+    await BinanceClient.close()
+
+
+app = FastAPI(title='Binance_API-service', lifespan=lifespan)
+app.add_middleware(CompressionMiddleware)
 
 app.include_router(router, prefix='/crypto', tags=['crypto'])
-add_pagination(app)
 
 
 if __name__ == '__main__':
@@ -1 +1,2 @@
-from .handlers import router
\ No newline at end of file
+from .handlers import router
+from .compression import CompressionMiddleware
@@ -0,0 +1,130 @@
+import zlib
+from typing import Optional, Sequence
+import brotli
+import zstandard
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from config import COMPRESS_MIN_SIZE, COMPRESS_ENCODINGS, COMPRESS_TYPES
+from export import GZIP, ZSTD
+from .streaming import negotiate_encoding
+
+BROTLI = 'br'
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+
+
+class Compressor:
+    """
+    Incremental encoder of one response body in a content coding,
+    every chunk is flushed so it can be sent as soon as it is produced
+    """
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == GZIP:
+            self.encoder = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        elif encoding == BROTLI:
+            self.encoder = brotli.Compressor(quality=BROTLI_QUALITY)
+        elif encoding == ZSTD:
+            self.encoder = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        else:
+            raise ValueError(f'Unsupported content coding {encoding}')
+
+    def compress(self, data: bytes, final: bool = False) -> bytes:
+        """Encodes a chunk of the body, final ends the encoded stream"""
+        if self.encoding == BROTLI:
+            encoded = self.encoder.process(data)
+            return encoded + (self.encoder.finish() if final else self.encoder.flush())
+        encoded = self.encoder.compress(data)
+        if final:
+            return encoded + self.encoder.flush()
+        if self.encoding == GZIP:
+            return encoded + self.encoder.flush(zlib.Z_SYNC_FLUSH)
+        return encoded + self.encoder.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses in the content coding the client prefers:
+    Attributes:
+        - minimum_size: complete bodies smaller than it are sent as is
+        - encodings: content codings offered, the first one wins equal q-values
+        - media_types: media types compressed
+    Only 200 responses without a Content-Encoding are compressed, so
+    stored files, partial and 304 responses pass through. Their strong
+    ETag is weakened, the bytes differ per coding.
+    """
+
+    def __init__(
+            self, app: ASGIApp, minimum_size: int = COMPRESS_MIN_SIZE,
+            encodings: Sequence[str] = COMPRESS_ENCODINGS,
+            media_types: Sequence[str] = COMPRESS_TYPES):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = tuple(encodings)
+        self.media_types = set(media_types)
+        # an unsupported COMPRESS_ENCODINGS entry fails at startup
+        for encoding in self.encodings:
+            Compressor(encoding)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        encoding = None
+        if scope['type'] == 'http':
+            encoding = negotiate_encoding(
+                Headers(scope=scope).get('accept-encoding'), self.encodings
+            )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        compressor: Optional[Compressor] = None
+        passthrough = False
+
+        async def compressing_send(message: Message):
+            nonlocal start, compressor, passthrough
+            if message['type'] == 'http.response.start':
+                start = message
+                return
+            if message['type'] != 'http.response.body' or passthrough:
+                await send(message)
+                return
+
+            body, more_body = message.get('body', b''), message.get('more_body', False)
+            if compressor is not None:
+                await send({
+                    'type': 'http.response.body',
+                    'body': compressor.compress(body, final=not more_body),
+                    'more_body': more_body
+                })
+                return
+
+            headers = MutableHeaders(raw=start['headers'])
+            media_type = headers.get('content-type', '').split(';')[0].strip()
+            if (start['status'] != 200 or 'content-encoding' in headers
+                    or media_type not in self.media_types):
+                passthrough = True
+            else:
+                headers.add_vary_header('Accept-Encoding')
+                passthrough = not more_body and len(body) < self.minimum_size
+            if passthrough:
+                await send(start)
+                await send(message)
+                return
+
+            compressor = Compressor(encoding)
+            body = compressor.compress(body, final=not more_body)
+            headers['Content-Encoding'] = encoding
+            del headers['Accept-Ranges']
+            etag = headers.get('etag')
+            if etag is not None and not etag.startswith('W/'):
+                headers['ETag'] = f'W/{etag}'
+            if more_body:
+                del headers['Content-Length']
+            else:
+                headers['Content-Length'] = str(len(body))
+            await send(start)
+            await send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+
+        await self.app(scope, receive, compressing_send)
@@ -0,0 +1,64 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+from fastapi import Request
+from fastapi.responses import Response
+from starlette import status
+
+# headers repeated on a 304, the others describe the body it does not send
+VALIDATOR_HEADERS = {'etag', 'last-modified', 'cache-control', 'vary'}
+
+
+def http_date(value: datetime) -> str:
+    """Formats a naive UTC datetime as an HTTP date"""
+    return format_datetime(value.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def weak_etag(*parts: Any) -> str:
+    """Returns a weak entity tag hashing the reprs of parts"""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Weakly compares the entity tags of an If-None-Match header with etag"""
+    if header is None:
+        return False
+    if header.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(tag.strip().removeprefix('W/') == opaque for tag in header.split(','))
+
+
+def is_not_modified(
+        request: Request, etag: str,
+        last_modified: Optional[datetime] = None) -> bool:
+    """
+    Evaluates If-None-Match, or If-Modified-Since when it is absent and a
+    naive UTC last_modified is given, to the second like HTTP dates
+    """
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    since = request.headers.get('if-modified-since')
+    if last_modified is None or since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+
+def not_modified(headers: dict[str, str]) -> Response:
+    """Returns the bodiless 304 response carrying the validators of headers"""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={
+            name: value for name, value in headers.items()
+            if name.lower() in VALIDATOR_HEADERS
+        }
+    )
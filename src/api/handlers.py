@@ -1,74 +1,150 @@
+import asyncio
 import logging
-import io
+import numpy as np
+import orjson
+from datetime import datetime
+from functools import partial
 from http import HTTPStatus
-from typing import Annotated, List, Any
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
-from fastapi.responses import Response
+from typing import Annotated, List, Any, Optional, AsyncIterator
+from fastapi import (APIRouter, HTTPException, Depends, Query, Request,
+                     WebSocket)
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
-from .schemas import BinanceModel, TickerPrice, ResponseCreateData
-from database import get_async_session, BinanceData, CSVData
-from response_binance import BinanceAPI
+from starlette.background import BackgroundTask
+from .schemas import (KlinePage, TickerPrice, TickerPriceResult,
+                      ResponseCreateData, ResponseCreateBatch,
+                      IndicatorPoint, IndicatorSeries, JobStatus, FileInfo)
+from .pagination import encode_cursor, decode_cursor
+from .params import TimeRange, naive_utc
+from .streaming import parse_range, accepts_encoding
+from .conditional import http_date, weak_etag, is_not_modified, not_modified
+from .serialization import dump_kline_page, dump_candles
+from database import (get_async_session, BinanceData, CSVData, KlineRollup,
+                      Job)
+from response_binance import (BinanceAPI, is_supported_interval,
+                              can_resample, bucket_params, is_rolled_up,
+                              closed_before, interval_length, ticker_cache,
+                              weight_limiter,
+                              RateLimitExceeded, CREATE_DATA, GENERATE_FILE,
+                              BACKFILL, PriceSubscription, price_hub)
+from export import (iter_csv, iter_decoded, FileFormat, MEDIA_TYPES,
+                    COMPRESSIONS, IDENTITY)
+from indicators import INDICATORS, make_indicator, indicator_cache, to_candles
+from cache import kline_store, to_klines, result_cache
 from binance.exceptions import BinanceAPIException
-from fastapi_paginate import Page, paginate
 
 
 router = APIRouter()
 
 
-async def format_model_binance(result: list) -> List[BinanceModel]:
-    """Format a list of Binance models"""
-    return [
-        BinanceModel(
-            id=res.id,
-            interval=res.interval,
-            symbol=res.symbol,
-            open_time=res.open_time,
-            open=res.open,
-            high=res.high,
-            low=res.low,
-            close=res.close,
-            volume=res.volume
-        )
-        for res in result
-    ]
+async def enqueue_jobs(
+        session: AsyncSession, kind: str, symbols: List[str],
+        intervals: List[str], params: dict[str, Any]) -> List[int]:
+    """Queues a job for every (symbol, interval) pair and returns their ids"""
+    try:
+        return [
+            await Job.enqueue(session, kind, symbol, interval, params)
+            for symbol in symbols for interval in intervals
+        ]
+    except IntegrityError as err:
+        logging.error(f'Enqueue {kind} failed: {err}')
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail='Database error')
+
+
+def file_params(file_format: FileFormat, compression: Optional[str]) -> dict[str, Any]:
+    """Returns the generate_file job params, rejecting unsupported codecs"""
+    if compression not in COMPRESSIONS[file_format]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'Unsupported {file_format.value} compression {compression}'
+        )
+    return {'format': file_format.value, 'compression': compression}
 
 
-@router.get('/generate/file')
+@router.get('/generate/file', status_code=status.HTTP_202_ACCEPTED)
 async def generate_file(
+        session: Annotated[AsyncSession, Depends(get_async_session)],
         symbol: str, interval: str,
-        background_tasks: BackgroundTasks,
-        binance: BinanceAPI = Depends()) -> dict[str, Any]:
-    """Generates a csv file and save in database"""
-    try:
-        background_tasks.add_task(
-            binance.write_to_csv_and_save_to_db, symbol, interval)
-        return {
-            'status': HTTPStatus.OK,
-            'detail': 'Is file generated successfully'
+        file_format: FileFormat = Query(FileFormat.CSV, alias='format'),
+        compression: Optional[str] = None) -> dict[str, Any]:
+    """
+    Queues the generation of a csv, parquet or arrow file saved in
+    database, compression picks the codec of the columnar formats
+    """
+    job_ids = await enqueue_jobs(
+        session, GENERATE_FILE, [symbol], [interval],
+        file_params(file_format, compression)
+    )
+    return {
+        'status': HTTPStatus.ACCEPTED,
+        'detail': 'File generation queued',
+        'job_id': job_ids[0]
+    }
+
+
+@router.get('/export/file')
+async def export_file(
+        session: Annotated[AsyncSession, Depends(get_async_session)],
+        window: Annotated[TimeRange, Depends()],
+        symbol: str, interval: str) -> StreamingResponse:
+    """Streams stored candles for a time range as a csv file"""
+    rows = BinanceData.stream_by_range(
+        session, symbol, interval, window.start, window.end
+    )
+    return StreamingResponse(
+        iter_csv(rows),
+        media_type='text/csv',
+        headers={
+            'Content-Disposition':
+                f'attachment; filename="{symbol}-{interval}.csv"'
         }
-    except BinanceAPIException as err:
-        logging.error(err.message)
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=err.message
+    )
+
+
+@router.get('/generate/file/batch', response_model=ResponseCreateBatch,
+            status_code=status.HTTP_202_ACCEPTED)
+async def generate_file_batch(
+        session: Annotated[AsyncSession, Depends(get_async_session)],
+        symbols: Annotated[List[str], Query()],
+        intervals: Annotated[List[str], Query()],
+        file_format: FileFormat = Query(FileFormat.CSV, alias='format'),
+        compression: Optional[str] = None) -> ResponseCreateBatch:
+    """Queues a file generation for every (symbol, interval) pair"""
+    return ResponseCreateBatch(
+        status=HTTPStatus.ACCEPTED,
+        symbols=symbols,
+        intervals=intervals,
+        job_ids=await enqueue_jobs(
+            session, GENERATE_FILE, symbols, intervals,
+            file_params(file_format, compression)
         )
+    )
 
 
 @router.get('/download/file')
 async def download_file(
-        session: Annotated[AsyncSession, Depends(get_async_session)]
+        request: Request,
+        session: Annotated[AsyncSession, Depends(get_async_session)],
+        file_format: Optional[FileFormat] = Query(None, alias='format'),
+        symbol: Optional[str] = None, interval: Optional[str] = None,
+        generated_before: Optional[datetime] = None,
+        file_id: Optional[int] = None
 ) -> Response:
-    """Returns a FileResponse csv data"""
+    """
+    Streams the last saved file matching the filters, or the file_id one.
+    Compressed files are sent as stored with Content-Encoding when the
+    client accepts it, honouring single bytes Range requests, and
+    decompressed on the fly otherwise. The ETag is the content hash,
+    a matching If-None-Match or If-Modified-Since answers 304.
+    """
     try:
-        data_csv = await CSVData.get_last_csv_data(session)
-        content_type = io.BytesIO(data_csv[0].data).read()
-
-        return Response(
-            content=content_type,
-            media_type='multipart/form-data',
-            headers={'Content-Disposition': f'attachment; filename="{data_csv[0].filename}"'}
+        data_csv = await CSVData.get_last_csv_info(
+            session, file_format and file_format.value, symbol, interval,
+            generated_before, file_id
         )
     except IntegrityError as err:
         logging.error(f'Download file failed: {err}')
@@ -76,39 +152,323 @@ async def download_file(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail='Download file failed'
         )
+    if data_csv is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='No file saved in database'
+        )
+
+    media_type = MEDIA_TYPES[FileFormat(data_csv.format)]
+    passthrough = data_csv.encoding == IDENTITY or accepts_encoding(
+        request.headers.get('accept-encoding'), data_csv.encoding
+    )
+    etag = f'"{data_csv.blob_hash}"'
+    if passthrough and data_csv.encoding != IDENTITY:
+        etag = f'"{data_csv.blob_hash}-{data_csv.encoding}"'
+    headers = {
+        'Content-Disposition': f'attachment; filename="{data_csv.filename}"',
+        'Vary': 'Accept-Encoding',
+        'Cache-Control': 'no-cache',
+        'ETag': etag,
+        'Last-Modified': http_date(data_csv.generated_at)
+    }
+    if is_not_modified(request, etag, data_csv.generated_at):
+        return not_modified(headers)
+
+    if not passthrough:
+        headers['Content-Length'] = str(data_csv.size)
+        return StreamingResponse(
+            iter_decoded(CSVData.iter_csv_chunks(
+                session, data_csv.blob_hash, 0, data_csv.stored_size - 1
+            ), data_csv.encoding),
+            media_type=media_type,
+            headers=headers
+        )
 
+    if data_csv.encoding != IDENTITY:
+        headers['Content-Encoding'] = data_csv.encoding
+    headers['Accept-Ranges'] = 'bytes'
 
-@router.get('/all_by_symbol', response_model=Page[BinanceModel])
+    size = data_csv.stored_size
+    byte_range = None
+    if request.headers.get('if-range', etag) == etag:
+        byte_range = parse_range(request.headers.get('range'), size)
+
+    status_code = status.HTTP_200_OK
+    start, end = 0, size - 1
+    if byte_range is not None:
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        start, end = byte_range
+        headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+    headers['Content-Length'] = str(end - start + 1)
+
+    return StreamingResponse(
+        CSVData.iter_csv_chunks(session, data_csv.blob_hash, start, end),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers
+    )
+
+
+@router.get('/files', response_model=List[FileInfo])
+async def list_files(
+        session: Annotated[AsyncSession, Depends(get_async_session)],
+        symbol: str = 'BTCUSDT', interval: Optional[str] = None,
+        limit: int = Query(100, ge=1, le=1000)) -> List[FileInfo]:
+    """Returns the newest saved files of a symbol, pass an id as file_id to download it"""
+    return [
+        FileInfo(
+            id=row.id, filename=row.filename, format=row.format,
+            symbol=row.symbol, interval=row.interval,
+            generated_at=row.generated_at, size=row.size
+        )
+        for row in await CSVData.list_csv_data(session, symbol, interval, limit)
+    ]
+
+
+@router.get('/all_by_symbol', response_model=KlinePage)
 async def get_all_by_symbol(
+        request: Request,
         session: Annotated[AsyncSession, Depends(get_async_session)],
-        symbol: str = 'BTCUSDT'):
-    """Returns all results by symbol"""
+        window: Annotated[TimeRange, Depends()],
+        symbol: str = 'BTCUSDT', interval: Optional[str] = None,
+        cursor: Optional[str] = None,
+        size: int = Query(50, ge=1, le=1000),
+        resample: Optional[str] = None,
+        compact: bool = False) -> Response:
+    """
+    Returns one page of results by symbol ordered by open time,
+    pass next_cursor back as cursor to get the following page.
+    resample aggregates the stored interval candles into a coarser interval.
+    compact returns the field names once in columns and each kline as an array.
+    The ETag derives from the versions every write of the symbol and
+    interval candles bumps, so a matching If-None-Match answers 304
+    without reading the page. Last-Modified is the time of the last write,
+    If-Modified-Since is not honoured as several writes share a second.
+    Pages are cached per ETag until candles of the symbol and interval
+    are ingested.
+    """
+    start, end = window.start, window.end
+    after = decode_cursor(cursor)
+    if resample is not None and (
+            interval is None or not can_resample(interval, resample)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'Cannot resample {interval} candles to {resample}'
+        )
+
     try:
-        result = await BinanceData.get_all_data_by_symbol(
-            symbol, session
+        versions = await BinanceData.get_versions(session, symbol, interval)
+    except IntegrityError as err:
+        logging.info(f'Error getting versions for symbol {err}')
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail='Database error')
+
+    headers = {'Cache-Control': 'no-cache'}
+    validator = tuple((row.interval, row.version) for row in versions)
+    if validator:
+        headers['ETag'] = weak_etag(*validator)
+        headers['Last-Modified'] = http_date(max(row.updated_at for row in versions))
+        if is_not_modified(request, headers['ETag']):
+            return not_modified(headers)
+
+    async def load() -> bytes:
+        try:
+            if resample is None:
+                result = await BinanceData.get_page_by_symbol(
+                    session, symbol, size + 1, interval, start, end, after
+                )
+            elif is_rolled_up(interval, resample):
+                result = await KlineRollup.get_page(
+                    session, symbol, resample, size + 1, start, end,
+                    after and after[0]
+                )
+            else:
+                stride, origin = bucket_params(resample)
+                result = await BinanceData.get_resampled_page(
+                    session, symbol, interval, resample, stride, origin,
+                    size + 1, start, end, after and after[0]
+                )
+        except IntegrityError as err:
+            logging.info(f'Error getting results for symbol {err}')
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail='Database error')
+
+        if not result and after is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f'Symbol {symbol} not found in database'
+            )
+
+        next_cursor = None
+        if len(result) > size:
+            result = result[:size]
+            next_cursor = encode_cursor(result[-1].open_time, result[-1].id or 0)
+
+        return dump_kline_page(result, size, next_cursor, compact)
+
+    # candles ingested by another process change the validator, so
+    # a cached page is never served past them
+    key = (
+        symbol, interval, resample, start, end, cursor, size, compact, validator
+    )
+    return Response(
+        await result_cache.get(key, load),
+        media_type='application/json',
+        headers=headers
+    )
+
+
+@router.get('/klines/latest', response_model=KlinePage)
+async def get_latest_klines(
+        session: Annotated[AsyncSession, Depends(get_async_session)],
+        symbol: str = 'BTCUSDT', interval: str = '1h',
+        limit: int = Query(100, ge=1, le=1000),
+        compact: bool = False) -> Response:
+    """
+    Returns the last limit candles of a symbol and interval from the
+    in-memory ring of the pair, without ids and with prices and volume
+    rendered from float64 with 8 decimals
+    """
+    if not is_supported_interval(interval):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'Unsupported interval {interval}'
+        )
+
+    load = partial(BinanceData.get_latest, session, symbol, interval)
+    try:
+        ring = await kline_store.get(symbol, interval, load)
+        if limit <= ring.size or ring.complete:
+            candles = ring.last(limit)
+        else:
+            candles = to_klines(await load(limit))
+    except IntegrityError as err:
+        logging.info(f'Error getting latest klines {err}')
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail='Database error')
+
+    if not len(candles):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f'Symbol {symbol} not found in database'
+        )
+    return Response(
+        dump_candles(symbol, interval, candles, compact),
+        media_type='application/json'
+    )
+
+
+@router.get('/indicators', response_model=IndicatorSeries)
+async def get_indicators(
+        session: Annotated[AsyncSession, Depends(get_async_session)],
+        window: Annotated[TimeRange, Depends()],
+        symbol: str = 'BTCUSDT', interval: str = '1h',
+        indicator: str = 'sma',
+        period: int = Query(20, ge=1, le=1000),
+        k: float = Query(2.0, gt=0),
+        limit: int = Query(500, ge=1, le=5000)) -> IndicatorSeries:
+    """
+    Returns the last limit values of an indicator computed over the
+    stored interval candles, the computation is cached and only extended
+    with the candles stored since the previous request. Only the candles
+    of the last limit intervals before end, or the newest stored candle,
+    and the warm-up the indicator needs ahead of them are loaded. Windows
+    ending before the last closed candle are computed without caching.
+    """
+    if indicator not in INDICATORS or not is_supported_interval(interval):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'Unsupported indicator {indicator} or interval {interval}'
         )
-        result = await format_model_binance(result)
-        if not result:
+    start, end = window.start, window.end
+
+    async def load(after: Optional[datetime]) -> list[tuple]:
+        if after is not None:
+            ring = await kline_store.get(
+                symbol, interval, partial(BinanceData.get_latest, session, symbol, interval)
+            )
+            if ring.size and after >= ring.first_open_time.astype(datetime):
+                return ring.since(after).tolist()
+        return [
+            row async for row in BinanceData.stream_by_range(
+                session, symbol, interval, start=after
+            )
+        ]
+
+    computed = make_indicator(indicator, period, k)
+    step = interval_length(interval)
+    closed = closed_before(interval, datetime.utcnow())
+    try:
+        last = await BinanceData.get_last_open_time(session, symbol, interval)
+        if last is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f'Symbol {symbol} not found in database'
             )
-        return paginate(result)
+        first = min(end or last + step, last + step) - limit * step
+        if start is not None:
+            first = max(first, start)
+        since = computed.warmup_start(first, step)
 
+        if end is not None and end < closed:
+            candles = to_candles([
+                row async for row in BinanceData.stream_by_range(
+                    session, symbol, interval, since, end
+                )
+            ])
+            open_times = candles['open_time']
+            values, _ = computed.extend(candles, None)
+        else:
+            open_times, values = await indicator_cache.get(
+                symbol, interval, computed, load, closed, since
+            )
     except IntegrityError as err:
-        logging.info(f'Error getting results for symbol {err}')
+        logging.info(f'Error computing indicator {err}')
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail='Database error')
 
+    if not len(open_times):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f'Symbol {symbol} not found in database'
+        )
+
+    mask = np.ones(len(open_times), dtype=bool)
+    if start is not None:
+        mask &= open_times >= np.datetime64(start, 'ms')
+    if end is not None:
+        mask &= open_times < np.datetime64(end, 'ms')
+    selected = np.flatnonzero(mask)[-limit:]
+
+    return IndicatorSeries(
+        symbol=symbol,
+        interval=interval,
+        indicator=indicator,
+        items=[
+            IndicatorPoint(
+                open_time=open_times[i].astype(datetime),
+                values={
+                    output: None if np.isnan(series[i]) else float(series[i])
+                    for output, series in values.items()
+                }
+            )
+            for i in selected
+        ]
+    )
+
 
 @router.get('/ticker/price', response_model=TickerPrice)
 async def get_ticker_price(
         symbol: str = 'BTCUSDT', binance: BinanceAPI = Depends()
 ) -> TickerPrice:
-    """Returns the ticker price"""
+    """Returns the ticker price, cached for TICKER_CACHE_TTL seconds"""
     try:
-        res = await binance.get_symbol_ticker(symbol)
+        res = await binance.get_cached_symbol_ticker(symbol)
         return TickerPrice(symbol=res.get('symbol'), price=res.get('price'))
 
     except BinanceAPIException as err:
@@ -117,27 +477,206 @@ async def get_ticker_price(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=err.message
         )
+    except RateLimitExceeded as err:
+        logging.error(err)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(err),
+            headers={'Retry-After': str(int(err.retry_after) + 1)}
+        )
+
 
+@router.get('/ticker/prices', response_model=List[TickerPriceResult])
+async def get_ticker_prices(
+        symbols: Annotated[List[str], Query()],
+        binance: BinanceAPI = Depends()) -> List[TickerPriceResult]:
+    """Returns the ticker price of every symbol, failed symbols carry an error"""
+    results = await binance.get_cached_symbol_tickers(symbols)
+    prices = []
+    for symbol, res in results.items():
+        if isinstance(res, BinanceAPIException):
+            prices.append(TickerPriceResult(symbol=symbol, error=res.message))
+        elif isinstance(res, Exception):
+            logging.error(f'Ticker price failed for {symbol}: {res}')
+            prices.append(TickerPriceResult(symbol=symbol, error=str(res)))
+        else:
+            prices.append(TickerPriceResult(symbol=symbol, price=res.get('price')))
+    return prices
 
-@router.post('/create/data', response_model=ResponseCreateData)
+
+@router.websocket('/ws/prices')
+async def stream_prices_ws(
+        websocket: WebSocket, symbols: Annotated[List[str], Query()]):
+    """
+    Pushes {symbol, price, time} updates of the subscribed symbols,
+    send {"subscribe": [...]} or {"unsubscribe": [...]} to change them.
+    A slow client skips to the latest price of each symbol.
+    """
+    await websocket.accept()
+    subscription = PriceSubscription()
+    try:
+        await price_hub.subscribe(subscription, symbols)
+    except ValueError as err:
+        await websocket.close(status.WS_1008_POLICY_VIOLATION, str(err))
+        return
+
+    async def receive():
+        while True:
+            message = await websocket.receive_json()
+            if not isinstance(message, dict):
+                await websocket.send_json({'error': 'Expected a JSON object'})
+                continue
+            try:
+                price_hub.unsubscribe(subscription, message.get('unsubscribe', []))
+                await price_hub.subscribe(subscription, message.get('subscribe', []))
+            except ValueError as err:
+                await websocket.send_json({'error': str(err)})
+
+    async def send():
+        while True:
+            for update in await subscription.get():
+                await websocket.send_json(update)
+
+    tasks = [asyncio.create_task(receive()), asyncio.create_task(send())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        price_hub.unsubscribe(subscription)
+
+
+@router.get('/prices/stream')
+async def stream_prices_sse(
+        symbols: Annotated[List[str], Query()]) -> StreamingResponse:
+    """
+    Server-Sent Events variant of /ws/prices, one price event per update
+    and a comment every heartbeat_interval seconds while idle
+    """
+    subscription = PriceSubscription()
+    try:
+        await price_hub.subscribe(subscription, symbols)
+    except ValueError as err:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(err))
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            while True:
+                try:
+                    updates = await asyncio.wait_for(
+                        subscription.get(), price_hub.heartbeat_interval
+                    )
+                except asyncio.TimeoutError:
+                    yield ': ping\n\n'
+                    continue
+                for update in updates:
+                    yield f'event: price\ndata: {orjson.dumps(update).decode()}\n\n'
+        finally:
+            price_hub.unsubscribe(subscription)
+
+    # the events never start when the client leaves before the response
+    return StreamingResponse(
+        events(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        background=BackgroundTask(price_hub.unsubscribe, subscription)
+    )
+
+
+@router.post('/create/data', response_model=ResponseCreateData,
+             status_code=status.HTTP_202_ACCEPTED)
 async def create_data(
-        background_tasks: BackgroundTasks,
-        binance: BinanceAPI = Depends(),
-        symbol: str = 'BTCUSDT', interval: str = '2h'
+        session: Annotated[AsyncSession, Depends(get_async_session)],
+        symbol: str = 'BTCUSDT', interval: str = '2h',
+        incremental: bool = True
 ) -> ResponseCreateData:
-    """Create a new data in the database"""
-    try:
-        background_tasks.add_task(
-            binance.create_data_in_db, symbol, interval)
+    """
+    Queues new data for the database, incremental only fetches
+    candles newer than the last stored one
+    """
+    job_ids = await enqueue_jobs(
+        session, CREATE_DATA, [symbol], [interval], {'incremental': incremental}
+    )
+    return ResponseCreateData(
+        status=HTTPStatus.ACCEPTED,
+        symbol=symbol,
+        interval=interval,
+        job_id=job_ids[0]
+    )
+
 
-        return ResponseCreateData(
-            status=HTTPStatus.OK,
-            symbol=symbol,
-            interval=interval,
+@router.post('/create/data/batch', response_model=ResponseCreateBatch,
+             status_code=status.HTTP_202_ACCEPTED)
+async def create_data_batch(
+        session: Annotated[AsyncSession, Depends(get_async_session)],
+        symbols: Annotated[List[str], Query()],
+        intervals: Annotated[List[str], Query()] = ['2h'],
+        incremental: bool = True) -> ResponseCreateBatch:
+    """Queues new data for every (symbol, interval) pair"""
+    return ResponseCreateBatch(
+        status=HTTPStatus.ACCEPTED,
+        symbols=symbols,
+        intervals=intervals,
+        job_ids=await enqueue_jobs(
+            session, CREATE_DATA, symbols, intervals,
+            {'incremental': incremental}
         )
-    except BinanceAPIException as err:
-        logging.error(err.message)
+    )
+
+
+@router.post('/backfill', response_model=ResponseCreateData,
+             status_code=status.HTTP_202_ACCEPTED)
+async def backfill(
+        session: Annotated[AsyncSession, Depends(get_async_session)],
+        symbol: str, interval: str, start: datetime,
+        end: Optional[datetime] = None) -> ResponseCreateData:
+    """
+    Queues fetching the candles missing from the database in [start, end),
+    an open end runs up to the time the job runs
+    """
+    if not is_supported_interval(interval):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=err.message
+            detail=f'Unsupported interval {interval}'
         )
+    # an open end stays open so identical requests share one pending job
+    # the job compares the bounds with the naive UTC stored open times
+    params = {'start': naive_utc(start).isoformat()}
+    if end is not None:
+        params['end'] = naive_utc(end).isoformat()
+    job_ids = await enqueue_jobs(session, BACKFILL, [symbol], [interval], params)
+
+    return ResponseCreateData(
+        status=HTTPStatus.ACCEPTED,
+        symbol=symbol,
+        interval=interval,
+        job_id=job_ids[0]
+    )
+
+
+@router.get('/jobs/{job_id}', response_model=JobStatus)
+async def get_job(
+        session: Annotated[AsyncSession, Depends(get_async_session)],
+        job_id: int) -> JobStatus:
+    """Returns the status of a queued job"""
+    job = await Job.get_job(session, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f'Job {job_id} not found'
+        )
+    return JobStatus.from_orm(job)
+
+
+@router.get('/metrics')
+async def get_metrics() -> dict[str, Any]:
+    """Returns the in-process cache counters and Binance weight usage"""
+    return {
+        'ticker_cache': ticker_cache.stats(),
+        'indicator_cache': indicator_cache.stats(),
+        'kline_store': kline_store.stats(),
+        'result_cache': result_cache.stats(),
+        'price_streams': price_hub.stats(),
+        'binance_weight': weight_limiter.stats()
+    }
@@ -0,0 +1,26 @@
+import base64
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException
+from starlette import status
+
+
+def encode_cursor(open_time: datetime, row_id: int) -> str:
+    """Encodes the keyset position of the last row of a page"""
+    raw = f'{open_time.isoformat()}|{row_id}'.encode('utf8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[tuple[datetime, int]]:
+    """Decodes a cursor into the (open_time, id) keyset position"""
+    if cursor is None:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf8')
+        open_time, row_id = raw.split('|')
+        return datetime.fromisoformat(open_time), int(row_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Invalid cursor'
+        )
@@ -0,0 +1,22 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Converts an aware datetime to the naive UTC the open time columns hold"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class TimeRange:
+    """
+    The start and end query params bounding open times, as naive UTC:
+    Attributes:
+        - start: the first open time returned
+        - end: the open times returned are before it
+    """
+
+    def __init__(self, start: Optional[datetime] = None, end: Optional[datetime] = None):
+        self.start = naive_utc(start)
+        self.end = naive_utc(end)
@@ -1,13 +1,15 @@
+from datetime import datetime
 from http import HTTPStatus
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
 
 class BinanceModel(BaseModel):
-    """Data model for the Binance"""
-    id: int = Field(..., example=1)
+    """Data model for the Binance, resampled candles have no id"""
+    id: Optional[int] = Field(None, example=1)
     interval: str = Field(..., example='1h')
     symbol: str = Field(..., example='BTCUSDT')
-    open_time: str = Field(..., example='2023-05-27 07:00:00')
+    open_time: datetime = Field(..., example='2023-05-27T07:00:00')
     open: str = Field(..., example='26752.00000000')
     high: str = Field(..., example='26786.51000000')
     low: str = Field(..., example='26725.50000000')
@@ -15,12 +17,79 @@ class BinanceModel(BaseModel):
     volume: str = Field(..., example='736.60810000')
 
 
+class KlinePage(BaseModel):
+    """One keyset page of Binance data ordered by open time"""
+    items: List[BinanceModel]
+    size: int = Field(..., example=50)
+    next_cursor: Optional[str] = Field(
+        None, example='MjAyMy0wNS0yN1QwNzowMDowMHwx'
+    )
+
+
 class TickerPrice(BaseModel):
     symbol: str = Field(..., example='BTCUSDT')
     price: str = Field(..., example='4.00000200')
 
 
+class TickerPriceResult(BaseModel):
+    """Price of one symbol in a batch, error is set when it failed"""
+    symbol: str = Field(..., example='BTCUSDT')
+    price: Optional[str] = Field(None, example='4.00000200')
+    error: Optional[str] = Field(None, example=None)
+
+
 class ResponseCreateData(BaseModel):
-    status: int = Field(..., example=HTTPStatus.OK)
+    status: int = Field(..., example=HTTPStatus.ACCEPTED)
     symbol: str = Field(..., example='BTCUSDT')
     interval: str = Field(..., example='1h')
+    job_id: int = Field(..., example=1)
+
+
+class ResponseCreateBatch(BaseModel):
+    status: int = Field(..., example=HTTPStatus.ACCEPTED)
+    symbols: List[str] = Field(..., example=['BTCUSDT', 'ETHUSDT'])
+    intervals: List[str] = Field(..., example=['1h', '1d'])
+    job_ids: List[int] = Field(..., example=[1, 2, 3, 4])
+
+
+class JobStatus(BaseModel):
+    """State of a queued job, error holds its last failure"""
+    id: int = Field(..., example=1)
+    kind: str = Field(..., example='create_data')
+    symbol: str = Field(..., example='BTCUSDT')
+    interval: str = Field(..., example='1h')
+    status: str = Field(..., example='pending')
+    attempts: int = Field(..., example=0)
+    max_attempts: int = Field(..., example=5)
+    error: Optional[str] = Field(None, example=None)
+    run_at: datetime = Field(..., example='2023-05-27T07:00:00')
+    created_at: datetime = Field(..., example='2023-05-27T07:00:00')
+    finished_at: Optional[datetime] = Field(None, example=None)
+
+    class Config:
+        orm_mode = True
+
+
+class IndicatorPoint(BaseModel):
+    """Indicator values at one candle, None while warming up"""
+    open_time: datetime = Field(..., example='2023-05-27T07:00:00')
+    values: Dict[str, Optional[float]] = Field(..., example={'value': 26741.3})
+
+
+class IndicatorSeries(BaseModel):
+    """Latest indicator values of a stored series"""
+    symbol: str = Field(..., example='BTCUSDT')
+    interval: str = Field(..., example='1h')
+    indicator: str = Field(..., example='sma')
+    items: List[IndicatorPoint]
+
+
+class FileInfo(BaseModel):
+    """A saved file, size is its decoded size in bytes"""
+    id: int = Field(..., example=1)
+    filename: str = Field(..., example='BTCUSDT-1h.csv')
+    format: str = Field(..., example='csv')
+    symbol: Optional[str] = Field(None, example='BTCUSDT')
+    interval: Optional[str] = Field(None, example='1h')
+    generated_at: datetime = Field(..., example='2023-05-27T07:00:00')
+    size: int = Field(..., example=58213)
@@ -0,0 +1,65 @@
+from decimal import Decimal
+from operator import attrgetter
+from typing import Any, Optional, Sequence
+import numpy as np
+import orjson
+from .schemas import BinanceModel
+
+KLINE_FIELDS = tuple(BinanceModel.__fields__)
+
+kline_values = attrgetter(*KLINE_FIELDS)
+
+
+def encode_default(value: Any) -> str:
+    """Serializes the numeric columns as exact strings, like BinanceModel does"""
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError
+
+
+def dump_kline_page(
+        rows: Sequence[Any], size: int, next_cursor: Optional[str],
+        compact: bool = False) -> bytes:
+    """
+    Serializes a page of kline rows straight to JSON, skipping the
+    pydantic models. The default layout matches KlinePage, compact sends
+    the field names once in columns and every kline as an array.
+    """
+    if compact:
+        return orjson.dumps({
+            'columns': KLINE_FIELDS,
+            'items': [kline_values(row) for row in rows],
+            'size': size,
+            'next_cursor': next_cursor
+        }, default=encode_default)
+
+    return orjson.dumps({
+        'items': [dict(zip(KLINE_FIELDS, kline_values(row))) for row in rows],
+        'size': size,
+        'next_cursor': next_cursor
+    }, default=encode_default)
+
+
+def dump_candles(
+        symbol: str, interval: str, candles: np.ndarray,
+        compact: bool = False) -> bytes:
+    """
+    Serializes in-memory candles in the kline page layouts,
+    prices and volume rendered with the 8 decimals they are stored with
+    """
+    open_times = np.datetime_as_string(candles['open_time'], unit='s').tolist()
+    values = [np.char.mod('%.8f', candles[field]).tolist() for field in KLINE_FIELDS[4:]]
+    rows = [
+        (None, interval, symbol, open_time, *prices)
+        for open_time, *prices in zip(open_times, *values)
+    ]
+    if compact:
+        return orjson.dumps({
+            'columns': KLINE_FIELDS, 'items': rows,
+            'size': len(rows), 'next_cursor': None
+        })
+    return orjson.dumps({
+        'items': [dict(zip(KLINE_FIELDS, row)) for row in rows],
+        'size': len(rows),
+        'next_cursor': None
+    })
@@ -0,0 +1,73 @@
+import re
+from typing import Optional, Sequence
+from fastapi import HTTPException
+from starlette import status
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """
+    Parses a single-range bytes Range header into an inclusive
+    (start, end) pair, None means the whole content is served
+    """
+    if header is None:
+        return None
+    match = RANGE_PATTERN.match(header.strip())
+    if match is None:
+        # multiple or malformed ranges are answered with the full body
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail='Requested range not satisfiable',
+            headers={'Content-Range': f'bytes */{size}'}
+        )
+    return start, end
+
+
+def encoding_weights(header: Optional[str]) -> dict[str, float]:
+    """Returns the q-value of every content coding of an Accept-Encoding header"""
+    weights = {}
+    for item in (header or '').split(','):
+        name, _, params = item.partition(';')
+        weight = 1.0
+        key, _, value = params.partition('=')
+        if key.strip().lower() == 'q':
+            try:
+                weight = float(value)
+            except ValueError:
+                weight = 0.0
+        if name.strip():
+            weights[name.strip().lower()] = weight
+    return weights
+
+
+def accepts_encoding(header: Optional[str], encoding: str) -> bool:
+    """Returns True if an Accept-Encoding header allows the content coding"""
+    weights = encoding_weights(header)
+    return weights.get(encoding, weights.get('*', 0.0)) > 0
+
+
+def negotiate_encoding(header: Optional[str], encodings: Sequence[str]) -> Optional[str]:
+    """
+    Returns the content coding of encodings with the highest q-value in an
+    Accept-Encoding header, the first one listed on ties, None if none is allowed
+    """
+    weights = encoding_weights(header)
+    best, best_weight = None, 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
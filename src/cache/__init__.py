@@ -0,0 +1,3 @@
+from .ttl import TTLCache
+from .klines import KlineRing, KlineStore, KLINE_DTYPE, to_klines, kline_store
+from .results import ResultCache, result_cache
@@ -0,0 +1,222 @@
+import asyncio
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Optional
+import numpy as np
+from config import KLINE_RING_CAPACITY, KLINE_STORE_BUDGET_MB, KLINE_STORE_MAX_AGE
+
+# one candle: open_time as datetime64[ms], prices and volume as float64
+KLINE_DTYPE = np.dtype([
+    ('open_time', 'datetime64[ms]'), ('open', 'f8'), ('high', 'f8'),
+    ('low', 'f8'), ('close', 'f8'), ('volume', 'f8')
+])
+
+
+def to_klines(rows: list[tuple]) -> np.ndarray:
+    """Packs (open_time, open, high, low, close, volume) rows into a structured array"""
+    return np.array(
+        [(row[0], *map(float, row[1:6])) for row in rows], dtype=KLINE_DTYPE
+    )
+
+
+class KlineRing:
+    """
+    The most recent candles of one (symbol, interval) in a fixed-size array:
+    Attributes:
+        - data: capacity candles, written circularly from head
+        - size: candles held
+        - synced_at: monotonic time the ring was last topped up from the database
+        - complete: the ring holds every stored candle of the pair
+    Every stored candle opened at or after the first one held is in the ring.
+    """
+
+    def __init__(self, capacity: int):
+        self.data = np.zeros(capacity, dtype=KLINE_DTYPE)
+        self.head = 0
+        self.size = 0
+        self.synced_at = 0.0
+        self.complete = False
+
+    @property
+    def capacity(self) -> int:
+        return len(self.data)
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+    @property
+    def first_open_time(self) -> Optional[np.datetime64]:
+        return self.data[(self.head - self.size) % self.capacity]['open_time'] if self.size else None
+
+    @property
+    def last_open_time(self) -> Optional[np.datetime64]:
+        return self.data[self.head - 1]['open_time'] if self.size else None
+
+    def last(self, count: int) -> np.ndarray:
+        """Returns a copy of the last count candles in open time order"""
+        count = min(count, self.size)
+        return self.data[np.arange(self.head - count, self.head) % self.capacity]
+
+    def since(self, open_time: datetime) -> np.ndarray:
+        """Returns a copy of the candles opened at or after open_time"""
+        candles = self.last(self.size)
+        return candles[candles['open_time'] >= np.datetime64(open_time, 'ms')]
+
+    def extend(self, candles: np.ndarray):
+        """
+        Adds candles, replacing the ones already held with the same open time.
+        Candles older than the first one held are dropped, they may not be
+        the newest missing ones.
+        """
+        if not len(candles):
+            return
+        times = candles['open_time']
+        if np.all(times[1:] > times[:-1]) and (
+                self.size == 0 or times[0] > self.last_open_time):
+            self._append(candles[-self.capacity:])
+            return
+
+        merged = np.concatenate((self.last(self.size), candles))
+        merged = merged[np.argsort(merged['open_time'], kind='stable')]
+        # a later occurrence of an open time replaces the earlier ones
+        keep = np.append(merged['open_time'][1:] != merged['open_time'][:-1], True)
+        merged = merged[keep]
+        if self.size:
+            older = merged['open_time'] < self.first_open_time
+            self.complete = self.complete and not older.any()
+            merged = merged[~older]
+        merged = merged[-self.capacity:]
+        self.data[:len(merged)] = merged
+        self.head = len(merged) % self.capacity
+        self.size = len(merged)
+
+    def _append(self, candles: np.ndarray):
+        positions = np.arange(self.head, self.head + len(candles)) % self.capacity
+        self.data[positions] = candles
+        self.head = (self.head + len(candles)) % self.capacity
+        self.size = min(self.size + len(candles), self.capacity)
+
+
+class KlineStore:
+    """
+    In-memory rings of the recent candles of the pairs being read:
+    Attributes:
+        - capacity: candles kept per (symbol, interval)
+        - budget: bytes the rings may use, the least recently read
+          pairs are evicted past it
+        - max_age: seconds a ring is served before it is topped up with
+          the candles other processes stored since its last one
+        - hits, topups, misses, evictions: counters
+    Ingestion in this process updates the rings directly.
+    """
+
+    def __init__(
+            self, capacity: int = KLINE_RING_CAPACITY,
+            budget: int = KLINE_STORE_BUDGET_MB * 1024 * 1024,
+            max_age: float = KLINE_STORE_MAX_AGE):
+        self.capacity = capacity
+        self.budget = budget
+        self.max_age = max_age
+        self.rings: OrderedDict[tuple[str, str], KlineRing] = OrderedDict()
+        self.locks: dict[tuple[str, str], asyncio.Lock] = defaultdict(asyncio.Lock)
+        self.versions: dict[tuple[str, str], int] = defaultdict(int)
+        self.hits = self.topups = self.misses = self.evictions = 0
+
+    @property
+    def nbytes(self) -> int:
+        return sum(ring.nbytes for ring in self.rings.values())
+
+    async def get(
+            self, symbol: str, interval: str,
+            load: Callable[[int, Optional[datetime]], Awaitable[list[tuple]]]) -> KlineRing:
+        """
+        Returns the ring of symbol and interval, topped up when older than max_age.
+        load(limit, after) must return the last limit candle rows opened
+        at or after after, in open time order. Pairs without candles get
+        an empty ring that is not kept.
+        """
+        key = (symbol, interval)
+        try:
+            return await self._get(key, load)
+        finally:
+            if key not in self.rings and not self.locks[key].locked():
+                del self.locks[key]
+
+    async def _get(
+            self, key: tuple[str, str],
+            load: Callable[[int, Optional[datetime]], Awaitable[list[tuple]]]) -> KlineRing:
+        async with self.locks[key]:
+            ring = self.rings.get(key)
+            if ring is not None and time.monotonic() - ring.synced_at < self.max_age:
+                self.hits += 1
+                self.rings.move_to_end(key)
+                return ring
+
+            version = self.versions[key]
+            after = None if ring is None else ring.last_open_time.astype(datetime)
+            candles = to_klines(await load(self.capacity, after))
+            if ring is None:
+                self.misses += 1
+                ring = KlineRing(self.capacity)
+                # fewer candles than asked for are all the pair has
+                ring.complete = len(candles) < self.capacity
+                if not len(candles):
+                    return ring
+            else:
+                self.topups += 1
+
+            # rows ingested while loading may be newer than the loaded ones
+            if version != self.versions[key]:
+                if key in self.rings:
+                    return ring
+                fresh = KlineRing(self.capacity)
+                fresh.extend(candles)
+                return fresh
+
+            ring.extend(candles)
+            ring.synced_at = time.monotonic()
+            self._store(key, ring)
+            return ring
+
+    def _store(self, key: tuple[str, str], ring: KlineRing):
+        self.rings[key] = ring
+        self.rings.move_to_end(key)
+        while len(self.rings) > 1 and self.nbytes > self.budget:
+            evicted, _ = self.rings.popitem(last=False)
+            self.evictions += 1
+            if not self.locks[evicted].locked():
+                del self.locks[evicted]
+
+    def ingest(self, rows: list[dict[str, Any]]):
+        """Merges freshly upserted binance_data rows into the rings of their pairs"""
+        grouped: dict[tuple[str, str], list[tuple]] = defaultdict(list)
+        for row in rows:
+            grouped[row['symbol'], row['interval']].append((
+                row['open_time'], row['open'], row['high'],
+                row['low'], row['close'], row['volume']
+            ))
+        for key, candles in grouped.items():
+            self.versions[key] += 1
+            ring = self.rings.get(key)
+            if ring is not None:
+                candles.sort(key=lambda candle: candle[0])
+                ring.extend(to_klines(candles))
+
+    def stats(self) -> dict[str, Any]:
+        """Returns the store counters and memory use"""
+        lookups = self.hits + self.topups + self.misses
+        return {
+            'pairs': len(self.rings),
+            'bytes': self.nbytes,
+            'budget': self.budget,
+            'hits': self.hits,
+            'topups': self.topups,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+kline_store = KlineStore()
@@ -0,0 +1,94 @@
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Optional
+from config import RESULT_CACHE_SIZE, RESULT_CACHE_BUDGET_MB, RESULT_CACHE_TTL
+
+
+class ResultCache:
+    """
+    LRU cache of serialized query results:
+    Attributes:
+        - max_entries: results kept before the least recently used is dropped
+        - budget: bytes the results may use
+        - ttl: seconds a result is served, bounds how stale it gets when
+          candles are ingested by another process
+        - hits, misses, expirations, invalidations, evictions: counters
+    Keys start with (symbol, interval), interval None meaning every
+    interval of the symbol. Ingesting candles of a pair drops its results
+    and the symbol wide ones.
+    """
+
+    def __init__(
+            self, max_entries: int = RESULT_CACHE_SIZE,
+            budget: int = RESULT_CACHE_BUDGET_MB * 1024 * 1024,
+            ttl: float = RESULT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.budget = budget
+        self.ttl = ttl
+        self.entries: OrderedDict[tuple, tuple[bytes, float]] = OrderedDict()
+        self.nbytes = 0
+        self.versions: dict[tuple[str, Optional[str]], int] = defaultdict(int)
+        self.hits = self.misses = self.expirations = 0
+        self.invalidations = self.evictions = 0
+
+    async def get(self, key: tuple, load: Callable[[], Awaitable[bytes]]) -> bytes:
+        """Returns the cached result for key, loading it on a miss"""
+        entry = self.entries.get(key)
+        if entry is not None:
+            if time.monotonic() < entry[1]:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return entry[0]
+            self.expirations += 1
+            self._pop(key)
+
+        self.misses += 1
+        symbol, interval = key[:2]
+        version = self.versions[symbol, interval], self.versions[symbol, None]
+        value = await load()
+        # candles ingested while loading may be missing from the result
+        if version == (self.versions[symbol, interval], self.versions[symbol, None]):
+            self._store(key, value)
+        return value
+
+    def _store(self, key: tuple, value: bytes):
+        self._pop(key)
+        self.entries[key] = (value, time.monotonic() + self.ttl)
+        self.nbytes += len(value)
+        while self.entries and (
+                len(self.entries) > self.max_entries or self.nbytes > self.budget):
+            self._pop(next(iter(self.entries)))
+            self.evictions += 1
+
+    def _pop(self, key: tuple):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= len(entry[0])
+
+    def invalidate(self, symbol: str, interval: str):
+        """Drops the results that may include candles of symbol and interval"""
+        self.versions[symbol, interval] += 1
+        self.versions[symbol, None] += 1
+        for key in [
+            key for key in self.entries
+            if key[0] == symbol and key[1] in (interval, None)
+        ]:
+            self._pop(key)
+            self.invalidations += 1
+
+    def stats(self) -> dict[str, Any]:
+        """Returns the cache counters"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'bytes': self.nbytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+result_cache = ResultCache()
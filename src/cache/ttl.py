@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class TTLCache:
+    """
+    In-process TTL cache with single-flight loading:
+    Attributes:
+        - ttl: seconds a loaded value is fresh
+        - stale_ttl: seconds past ttl a value is still served
+          while one background load refreshes it
+        - hits, stale_hits, misses, coalesced, errors: counters
+    Concurrent misses for one key share a single loader call.
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float = 0):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.entries: dict[Hashable, tuple[Any, float]] = {}
+        self.inflight: dict[Hashable, asyncio.Task] = {}
+        self.hits = self.stale_hits = self.misses = 0
+        self.coalesced = self.errors = 0
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Returns the cached value for key, loading it on a miss"""
+        entry = self.entries.get(key)
+        now = time.monotonic()
+        if entry is not None and now < entry[1]:
+            self.hits += 1
+            return entry[0]
+        if entry is not None and now < entry[1] + self.stale_ttl:
+            self.stale_hits += 1
+            self.load(key, loader)
+            return entry[0]
+
+        self.misses += 1
+        return await asyncio.shield(self.load(key, loader))
+
+    def load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Starts a load for key unless one is already in flight"""
+        task = self.inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task
+
+        task = asyncio.create_task(self._load(key, loader))
+        task.add_done_callback(self._log_error)
+        self.inflight[key] = task
+        return task
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await loader()
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            return value
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            del self.inflight[key]
+
+    @staticmethod
+    def _log_error(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logging.debug(f'Cache load failed: {task.exception()}')
+
+    def is_fresh(self, key: Hashable) -> bool:
+        """Returns True if key holds a value younger than ttl"""
+        entry = self.entries.get(key)
+        return entry is not None and time.monotonic() < entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        """Stores a value loaded outside of get"""
+        self.entries[key] = (value, time.monotonic() + self.ttl)
+
+    def invalidate(self, key: Hashable):
+        """Drops the cached value for key"""
+        self.entries.pop(key, None)
+
+    def stats(self) -> dict[str, Any]:
+        """Returns the cache counters"""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+            'hit_rate': (self.hits + self.stale_hits) / lookups if lookups else 0.0
+        }
@@ -1,4 +1,28 @@
 from .config import (DATABASE_URL, DB_PASS, DB_PORT,
                      DB_USER, DB_NAME, DB_HOST,
                      API_KEY, API_SECRET,
-                     DATABASE_URL_TEST)
\ No newline at end of file
+                     DATABASE_URL_TEST, LEGACY_OPEN_TIME_TZ,
+                     INGEST_BATCH_SIZE,
+                     BACKFILL_CONCURRENCY, ROLLUP_SOURCE_INTERVAL,
+                     ROLLUP_INTERVALS, PARTITION_INTERVALS,
+                     PARTITION_RETENTION_DAYS, PARTITION_MONTHS_AHEAD,
+                     PARTITION_CHECK_INTERVAL, INDICATOR_CACHE_SIZE, KLINE_RING_CAPACITY,
+                     KLINE_STORE_BUDGET_MB, KLINE_STORE_MAX_AGE,
+                     RESULT_CACHE_SIZE, RESULT_CACHE_BUDGET_MB,
+                     RESULT_CACHE_TTL, STREAM_SYMBOLS,
+                     STREAM_INTERVALS, STREAM_BATCH_SIZE,
+                     STREAM_FLUSH_INTERVAL, STREAM_MAX_RECONNECT_WAIT,
+                     PRICE_MAX_SYMBOLS, PRICE_HEARTBEAT_INTERVAL,
+                     PRICE_MAX_STREAMS, PRICE_SYMBOLS_TTL,
+                     BINANCE_POOL_SIZE, BINANCE_KEEPALIVE_TIMEOUT,
+                     BINANCE_MAX_CONCURRENCY, BINANCE_WEIGHT_LIMIT,
+                     BINANCE_WEIGHT_RESERVE, INTERACTIVE_MAX_WAIT,
+                     BACKGROUND_MAX_WAIT, TICKER_CACHE_TTL,
+                     TICKER_CACHE_STALE_TTL, TICKER_ALL_THRESHOLD,
+                     BATCH_CONCURRENCY, DOWNLOAD_CHUNK_SIZE,
+                     EXPORT_FETCH_SIZE, EXPORT_POOL, EXPORT_POOL_SIZE,
+                     EXPORT_POOL_NICE, CSV_STORAGE_ENCODING,
+                     CSV_RETENTION_DAYS, CSV_RETENTION_KEEP, COMPRESS_MIN_SIZE,
+                     COMPRESS_ENCODINGS, COMPRESS_TYPES, JOB_CONCURRENCY, JOB_POLL_INTERVAL,
+                     JOB_MAX_ATTEMPTS, JOB_RETRY_BASE, JOB_LOCK_TIMEOUT,
+                     JOB_WORKER_IN_API)
\ No newline at end of file
@@ -1,2 +1,4 @@
 from .database import Base, async_session_maker, get_async_session
-from .tables.tables import BinanceData, metadata, CSVData
\ No newline at end of file
+from .tables.tables import BinanceData, metadata, CSVData, KlineRollup, \
+    Job, CSVBlob
+from .partitions import PartitionManager, partition_manager
\ No newline at end of file
@@ -0,0 +1,84 @@
+"""Typed kline columns
+
+Revision ID: 3c7e41a9d2b5
+Revises: 9212aca8f813
+Create Date: 2026-10-17 10:12:41.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from tzlocal import get_localzone_name
+from src.config import LEGACY_OPEN_TIME_TZ
+
+
+# revision identifiers, used by Alembic.
+revision = '3c7e41a9d2b5'
+down_revision = '9212aca8f813'
+branch_labels = None
+depends_on = None
+
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def source_timezone() -> str:
+    """
+    Returns the timezone of the string open times, written with
+    datetime.fromtimestamp in the local time of the ingesting server,
+    quoted for SQL. New rows are written in UTC.
+    """
+    timezone = LEGACY_OPEN_TIME_TZ or get_localzone_name()
+    return "'" + timezone.replace("'", "''") + "'"
+
+
+def upgrade() -> None:
+    # keep only the latest row of every (symbol, interval, open_time)
+    op.execute(
+        'DELETE FROM binance_data AS a USING binance_data AS b '
+        'WHERE a.symbol = b.symbol AND a.interval = b.interval '
+        'AND a.open_time = b.open_time AND a.id < b.id'
+    )
+    op.alter_column(
+        'binance_data', 'open_time',
+        existing_type=sa.String(length=128),
+        type_=sa.DateTime(),
+        existing_nullable=False,
+        postgresql_using=(
+            f"(open_time::timestamp AT TIME ZONE {source_timezone()}) "
+            "AT TIME ZONE 'UTC'"
+        )
+    )
+    for column in PRICE_COLUMNS:
+        op.alter_column(
+            'binance_data', column,
+            existing_type=sa.String(length=255),
+            type_=sa.Numeric(precision=28, scale=8),
+            existing_nullable=False,
+            postgresql_using=f'{column}::numeric'
+        )
+    op.create_index(
+        'ix_binance_data_symbol_interval_open_time', 'binance_data',
+        ['symbol', 'interval', 'open_time'], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'ix_binance_data_symbol_interval_open_time',
+        table_name='binance_data'
+    )
+    for column in PRICE_COLUMNS:
+        op.alter_column(
+            'binance_data', column,
+            existing_type=sa.Numeric(precision=28, scale=8),
+            type_=sa.String(length=255),
+            existing_nullable=False
+        )
+    op.alter_column(
+        'binance_data', 'open_time',
+        existing_type=sa.DateTime(),
+        type_=sa.String(length=128),
+        existing_nullable=False,
+        postgresql_using=(
+            f"((open_time AT TIME ZONE 'UTC') AT TIME ZONE {source_timezone()})::varchar"
+        )
+    )
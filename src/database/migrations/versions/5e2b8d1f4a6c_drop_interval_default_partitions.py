@@ -0,0 +1,54 @@
+"""Drop interval default partitions
+
+Revision ID: 5e2b8d1f4a6c
+Revises: c9f4a2e7b1d8
+Create Date: 2026-10-17 21:08:43.512907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from src.config import PARTITION_INTERVALS
+from src.database.partitions import interval_table, month_partition_ddl
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2b8d1f4a6c'
+down_revision = 'c9f4a2e7b1d8'
+branch_labels = None
+depends_on = None
+
+COLUMNS = 'id, interval, symbol, open_time, open, high, low, close, volume'
+
+
+def exists(table: str) -> bool:
+    return op.get_bind().scalar(
+        sa.text('SELECT to_regclass(:name) IS NOT NULL'), {'name': table}
+    )
+
+
+def upgrade() -> None:
+    # an interval partition with a default partition cannot detach
+    # its expired months concurrently, the rows of the default move
+    # to partitions of their months
+    for interval in PARTITION_INTERVALS:
+        table = interval_table(interval)
+        default = f'{table}_default'
+        if not exists(default):
+            continue
+        op.execute(f'ALTER TABLE {table} DETACH PARTITION {default}')
+        months = op.get_bind().execute(sa.text(
+            f"SELECT DISTINCT date_trunc('month', open_time) FROM {default}"
+        )).scalars().all()
+        for month in sorted(months):
+            op.execute(month_partition_ddl(interval, month))
+        op.execute(f'INSERT INTO binance_data ({COLUMNS}) SELECT {COLUMNS} FROM {default}')
+        op.drop_table(default)
+
+
+def downgrade() -> None:
+    for interval in PARTITION_INTERVALS:
+        table = interval_table(interval)
+        if exists(table):
+            op.execute(
+                f'CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT'
+            )
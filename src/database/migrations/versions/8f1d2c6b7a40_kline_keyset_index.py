@@ -0,0 +1,29 @@
+"""Kline keyset index
+
+Revision ID: 8f1d2c6b7a40
+Revises: 3c7e41a9d2b5
+Create Date: 2026-10-17 11:03:17.284551
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f1d2c6b7a40'
+down_revision = '3c7e41a9d2b5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_binance_data_symbol_open_time_id', 'binance_data',
+        ['symbol', 'open_time', 'id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'ix_binance_data_symbol_open_time_id', table_name='binance_data'
+    )
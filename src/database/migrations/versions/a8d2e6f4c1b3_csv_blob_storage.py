@@ -0,0 +1,94 @@
+"""CSV blob storage
+
+Revision ID: a8d2e6f4c1b3
+Revises: f3c5d8a1b6e9
+Create Date: 2026-10-17 16:02:41.518203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8d2e6f4c1b3'
+down_revision = 'f3c5d8a1b6e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'csv_blob',
+        sa.Column('hash', sa.String(length=64), nullable=False),
+        sa.Column('encoding', sa.String(length=16), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('data', postgresql.BYTEA(), nullable=False),
+        sa.PrimaryKeyConstraint('hash')
+    )
+    # blobs are mostly compressed already, skip TOAST compression so
+    # ranged substring reads only fetch the chunks they need
+    op.execute('ALTER TABLE csv_blob ALTER COLUMN data SET STORAGE EXTERNAL')
+    op.execute(
+        """
+        INSERT INTO csv_blob (hash, encoding, size, data)
+        SELECT encode(sha256(data), 'hex'), 'identity', octet_length(data), data
+        FROM csv_data
+        ON CONFLICT (hash) DO NOTHING
+        """
+    )
+
+    op.add_column('csv_data', sa.Column('symbol', sa.String(length=128)))
+    op.add_column('csv_data', sa.Column('interval', sa.String(length=10)))
+    op.add_column(
+        'csv_data',
+        sa.Column(
+            'generated_at', sa.DateTime(), nullable=False,
+            server_default=sa.text("timezone('UTC', now())")
+        )
+    )
+    op.add_column('csv_data', sa.Column('blob_hash', sa.String(length=64)))
+    op.execute(
+        """
+        UPDATE csv_data SET
+            symbol = split_part(filename, '-', 1),
+            interval = split_part(split_part(filename, '-', 2), '.', 1),
+            blob_hash = encode(sha256(data), 'hex')
+        """
+    )
+    op.alter_column('csv_data', 'blob_hash', nullable=False)
+    op.create_foreign_key(
+        'csv_data_blob_hash_fkey', 'csv_data', 'csv_blob',
+        ['blob_hash'], ['hash']
+    )
+    op.create_index(
+        'ix_csv_data_symbol_interval_generated_at', 'csv_data',
+        ['symbol', 'interval', 'generated_at']
+    )
+    op.drop_column('csv_data', 'data')
+
+
+def downgrade() -> None:
+    op.add_column('csv_data', sa.Column('data', postgresql.BYTEA()))
+    # compressed blobs cannot be decoded in SQL, their exports are dropped
+    op.execute(
+        """
+        DELETE FROM csv_data USING csv_blob
+        WHERE csv_blob.hash = csv_data.blob_hash
+          AND csv_blob.encoding <> 'identity'
+        """
+    )
+    op.execute(
+        """
+        UPDATE csv_data SET data = csv_blob.data
+        FROM csv_blob WHERE csv_blob.hash = csv_data.blob_hash
+        """
+    )
+    op.alter_column('csv_data', 'data', nullable=False)
+    op.drop_index('ix_csv_data_symbol_interval_generated_at', 'csv_data')
+    op.drop_constraint('csv_data_blob_hash_fkey', 'csv_data', type_='foreignkey')
+    op.drop_column('csv_data', 'blob_hash')
+    op.drop_column('csv_data', 'generated_at')
+    op.drop_column('csv_data', 'interval')
+    op.drop_column('csv_data', 'symbol')
+    op.drop_table('csv_blob')
@@ -0,0 +1,25 @@
+"""CSV data external storage
+
+Revision ID: b52e9f0c1d37
+Revises: 8f1d2c6b7a40
+Create Date: 2026-10-17 11:48:02.915730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b52e9f0c1d37'
+down_revision = '8f1d2c6b7a40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # uncompressed TOAST lets substring() read only the requested chunks
+    op.execute('ALTER TABLE csv_data ALTER COLUMN data SET STORAGE EXTERNAL')
+
+
+def downgrade() -> None:
+    op.execute('ALTER TABLE csv_data ALTER COLUMN data SET STORAGE EXTENDED')
@@ -0,0 +1,116 @@
+"""Binance data partitions
+
+Revision ID: b6e1f9a3d7c2
+Revises: a8d2e6f4c1b3
+Create Date: 2026-10-17 17:24:05.731442
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+from src.config import PARTITION_INTERVALS, PARTITION_MONTHS_AHEAD
+from src.database.partitions import (default_partition_ddl,
+                                     interval_partition_ddl,
+                                     month_partition_ddl, month_start,
+                                     next_month)
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e1f9a3d7c2'
+down_revision = 'a8d2e6f4c1b3'
+branch_labels = None
+depends_on = None
+
+COLUMNS = 'id, interval, symbol, open_time, open, high, low, close, volume'
+INDEXES = (
+    'binance_data_pkey',
+    'ix_binance_data_symbol_interval_open_time',
+    'ix_binance_data_symbol_open_time_id'
+)
+
+
+def kline_columns() -> list[sa.Column]:
+    return [
+        sa.Column(
+            'id', sa.Integer(), nullable=False,
+            server_default=sa.text("nextval('binance_data_id_seq')")
+        ),
+        sa.Column('interval', sa.String(length=10), nullable=False),
+        sa.Column('symbol', sa.String(length=128), nullable=False),
+        sa.Column('open_time', sa.DateTime(), nullable=False),
+        sa.Column('open', sa.Numeric(precision=28, scale=8), nullable=False),
+        sa.Column('high', sa.Numeric(precision=28, scale=8), nullable=False),
+        sa.Column('low', sa.Numeric(precision=28, scale=8), nullable=False),
+        sa.Column('close', sa.Numeric(precision=28, scale=8), nullable=False),
+        sa.Column('volume', sa.Numeric(precision=28, scale=8), nullable=False)
+    ]
+
+
+def create_indexes():
+    op.create_index(
+        'ix_binance_data_symbol_interval_open_time', 'binance_data',
+        ['symbol', 'interval', 'open_time'], unique=True
+    )
+    op.create_index(
+        'ix_binance_data_symbol_open_time_id', 'binance_data',
+        ['symbol', 'open_time', 'id']
+    )
+
+
+def rename_old_table():
+    op.rename_table('binance_data', 'binance_data_old')
+    for index in INDEXES:
+        op.execute(f'ALTER INDEX {index} RENAME TO {index}_old')
+    op.execute('ALTER SEQUENCE binance_data_id_seq OWNED BY NONE')
+
+
+def move_rows_and_drop_old_table():
+    op.execute(
+        f'INSERT INTO binance_data ({COLUMNS}) '
+        f'SELECT {COLUMNS} FROM binance_data_old'
+    )
+    op.execute('ALTER SEQUENCE binance_data_id_seq OWNED BY binance_data.id')
+    op.drop_table('binance_data_old')
+
+
+def upgrade() -> None:
+    rename_old_table()
+    op.create_table(
+        'binance_data',
+        *kline_columns(),
+        sa.PrimaryKeyConstraint('id', 'interval', 'open_time'),
+        postgresql_partition_by='LIST (interval)'
+    )
+    op.execute(default_partition_ddl())
+    for interval in PARTITION_INTERVALS:
+        for ddl in interval_partition_ddl(interval):
+            op.execute(ddl)
+
+    # a partition for every month already stored and the upcoming ones
+    months = op.get_bind().execute(sa.text(
+        "SELECT DISTINCT interval, date_trunc('month', open_time) "
+        'FROM binance_data_old WHERE interval = ANY(:intervals)'
+    ), {'intervals': PARTITION_INTERVALS}).all()
+    upcoming = [month_start(datetime.utcnow())]
+    for _ in range(PARTITION_MONTHS_AHEAD):
+        upcoming.append(next_month(upcoming[-1]))
+    months = set(months) | {
+        (interval, month)
+        for interval in PARTITION_INTERVALS for month in upcoming
+    }
+    for interval, month in sorted(months):
+        op.execute(month_partition_ddl(interval, month))
+
+    create_indexes()
+    move_rows_and_drop_old_table()
+
+
+def downgrade() -> None:
+    rename_old_table()
+    op.create_table(
+        'binance_data',
+        *kline_columns(),
+        sa.PrimaryKeyConstraint('id')
+    )
+    create_indexes()
+    move_rows_and_drop_old_table()
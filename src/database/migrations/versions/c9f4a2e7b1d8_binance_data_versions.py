@@ -0,0 +1,38 @@
+"""Binance data versions
+
+Revision ID: c9f4a2e7b1d8
+Revises: b6e1f9a3d7c2
+Create Date: 2026-10-17 18:42:51.906317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9f4a2e7b1d8'
+down_revision = 'b6e1f9a3d7c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'binance_data_version',
+        sa.Column('symbol', sa.String(length=128), nullable=False),
+        sa.Column('interval', sa.String(length=10), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.Column(
+            'updated_at', sa.DateTime(), nullable=False,
+            server_default=sa.text("timezone('UTC', now())")
+        ),
+        sa.PrimaryKeyConstraint('symbol', 'interval')
+    )
+    op.execute(
+        'INSERT INTO binance_data_version (symbol, interval, version) '
+        'SELECT DISTINCT symbol, interval, 1 FROM binance_data'
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('binance_data_version')
@@ -0,0 +1,101 @@
+"""Kline rollup
+
+Revision ID: d4a8c31e5f62
+Revises: b52e9f0c1d37
+Create Date: 2026-10-17 12:36:18.207455
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from src.config import ROLLUP_SOURCE_INTERVAL, ROLLUP_INTERVALS
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a8c31e5f62'
+down_revision = 'b52e9f0c1d37'
+branch_labels = None
+depends_on = None
+
+# the fixed intervals of response_binance.intervals, the app package
+# cannot be imported from migrations
+MINUTE_MS = 60 * 1000
+INTERVAL_MS = {
+    '1m': MINUTE_MS, '3m': 3 * MINUTE_MS, '5m': 5 * MINUTE_MS,
+    '15m': 15 * MINUTE_MS, '30m': 30 * MINUTE_MS, '1h': 60 * MINUTE_MS,
+    '2h': 2 * 60 * MINUTE_MS, '4h': 4 * 60 * MINUTE_MS,
+    '6h': 6 * 60 * MINUTE_MS, '8h': 8 * 60 * MINUTE_MS,
+    '12h': 12 * 60 * MINUTE_MS, '1d': 24 * 60 * MINUTE_MS,
+    '3d': 3 * 24 * 60 * MINUTE_MS, '1w': 7 * 24 * 60 * MINUTE_MS
+}
+WEEK_ORIGIN_MS = 4 * 24 * 60 * MINUTE_MS  # 1970-01-05, a Monday
+
+
+def can_resample(base: str, target: str) -> bool:
+    """Returns True if every target candle is made of whole base candles"""
+    if base not in INTERVAL_MS:
+        return False
+    if target == '1M':
+        return INTERVAL_MS['1d'] % INTERVAL_MS[base] == 0
+    if target not in INTERVAL_MS:
+        return False
+    step = INTERVAL_MS[target]
+    origin = WEEK_ORIGIN_MS if target == '1w' else 0
+    return step > INTERVAL_MS[base] and step % INTERVAL_MS[base] == 0 and (
+        origin % INTERVAL_MS[base] == 0
+    )
+
+
+# the targets the app refreshes and serves, see rollup.ROLLUP_TARGETS
+ROLLUP_TARGETS = [
+    target for target in ROLLUP_INTERVALS
+    if can_resample(ROLLUP_SOURCE_INTERVAL, target)
+]
+
+
+def bucket_sql(target: str) -> str:
+    """Returns the bucket of a target interval, binned like intervals.bucket_params"""
+    if target == '1M':
+        return "date_trunc('month', open_time)"
+    origin = '1970-01-05' if target == '1w' else '1970-01-01'
+    return f"date_bin('{INTERVAL_MS[target]} milliseconds', open_time, '{origin}')"
+
+
+def upgrade() -> None:
+    op.create_table(
+        'kline_rollup',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('interval', sa.String(length=10), nullable=False),
+        sa.Column('symbol', sa.String(length=128), nullable=False),
+        sa.Column('open_time', sa.DateTime(), nullable=False),
+        sa.Column('open', sa.Numeric(precision=28, scale=8), nullable=False),
+        sa.Column('high', sa.Numeric(precision=28, scale=8), nullable=False),
+        sa.Column('low', sa.Numeric(precision=28, scale=8), nullable=False),
+        sa.Column('close', sa.Numeric(precision=28, scale=8), nullable=False),
+        sa.Column('volume', sa.Numeric(precision=28, scale=8), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_kline_rollup_symbol_interval_open_time', 'kline_rollup',
+        ['symbol', 'interval', 'open_time'], unique=True
+    )
+    # seed the configured rollups from the source candles already stored,
+    # later ingests only refresh the buckets they touch
+    for target in ROLLUP_TARGETS:
+        op.execute(
+            'INSERT INTO kline_rollup '
+            '(interval, symbol, open_time, open, high, low, close, volume) '
+            f"SELECT '{target}', symbol, bucket, "
+            '(array_agg(open ORDER BY open_time))[1], max(high), min(low), '
+            '(array_agg(close ORDER BY open_time DESC))[1], sum(volume) '
+            f'FROM (SELECT *, {bucket_sql(target)} AS bucket FROM binance_data '
+            f"WHERE interval = '{ROLLUP_SOURCE_INTERVAL}') AS candles "
+            'GROUP BY symbol, bucket'
+        )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'ix_kline_rollup_symbol_interval_open_time',
+        table_name='kline_rollup'
+    )
+    op.drop_table('kline_rollup')
@@ -0,0 +1,49 @@
+"""Job queue
+
+Revision ID: e7b19a4c2d80
+Revises: d4a8c31e5f62
+Create Date: 2026-10-17 14:05:27.611942
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b19a4c2d80'
+down_revision = 'd4a8c31e5f62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'job',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=32), nullable=False),
+        sa.Column('symbol', sa.String(length=128), nullable=False),
+        sa.Column('interval', sa.String(length=10), nullable=False),
+        sa.Column('params', postgresql.JSONB(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('max_attempts', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('run_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_job_pending_dedupe', 'job',
+        ['kind', 'symbol', 'interval', 'params'], unique=True,
+        postgresql_where=sa.text("status = 'pending'")
+    )
+    op.create_index('ix_job_status_run_at', 'job', ['status', 'run_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_job_status_run_at', table_name='job')
+    op.drop_index('ix_job_pending_dedupe', table_name='job')
+    op.drop_table('job')
@@ -0,0 +1,30 @@
+"""CSV data format
+
+Revision ID: f3c5d8a1b6e9
+Revises: e7b19a4c2d80
+Create Date: 2026-10-17 15:21:09.347816
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c5d8a1b6e9'
+down_revision = 'e7b19a4c2d80'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'csv_data',
+        sa.Column(
+            'format', sa.String(length=16), nullable=False,
+            server_default='csv'
+        )
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('csv_data', 'format')
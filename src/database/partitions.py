@@ -0,0 +1,261 @@
+import asyncio
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Optional
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, async_sessionmaker
+from src.config import (PARTITION_INTERVALS, PARTITION_MONTHS_AHEAD,
+                        PARTITION_RETENTION_DAYS, PARTITION_CHECK_INTERVAL)
+from src.database.database import async_session_maker
+
+# binance_data is partitioned by LIST (interval), the PARTITION_INTERVALS
+# partitions by RANGE (open_time) in calendar months, every other
+# interval goes to binance_data_default. The interval partitions have no
+# default partition, Postgres only detaches concurrently without one.
+PARENT = 'binance_data'
+DEFAULT_PARTITION = f'{PARENT}_default'
+INTERVAL_PATTERN = re.compile(r'^\d+[mhdwM]$')
+LOCK_KEY = 'binance_data_partitions'
+
+
+def interval_table(interval: str) -> str:
+    """Returns the partition name of an interval, 1M is spelled 1mo"""
+    if not INTERVAL_PATTERN.match(interval):
+        raise ValueError(f'Unsupported interval {interval}')
+    return f'{PARENT}_{interval.replace("M", "mo")}'
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def next_month(month: datetime) -> datetime:
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def month_table(interval: str, month: datetime) -> str:
+    return f'{interval_table(interval)}_p{month:%Y_%m}'
+
+
+def default_partition_ddl() -> str:
+    return f'CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT'
+
+
+def interval_partition_ddl(interval: str) -> list[str]:
+    """Creates the monthly partitioned table of an interval"""
+    return [
+        f"CREATE TABLE IF NOT EXISTS {interval_table(interval)} PARTITION OF {PARENT} "
+        f"FOR VALUES IN ('{interval}') PARTITION BY RANGE (open_time)"
+    ]
+
+
+def month_partition_ddl(interval: str, month: datetime) -> str:
+    return (
+        f'CREATE TABLE IF NOT EXISTS {month_table(interval, month)} '
+        f'PARTITION OF {interval_table(interval)} '
+        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{next_month(month):%Y-%m-%d}')"
+    )
+
+
+class PartitionManager:
+    """
+    Keeps the monthly partitions of binance_data:
+    Attributes:
+        - intervals: intervals partitioned by month
+        - months_ahead: months created ahead of the current one
+        - retention: interval -> days its month partitions are kept,
+          intervals missing from it are kept forever, the ones not
+          partitioned by month are kept forever with a warning
+        - check_interval: seconds between maintenance runs
+        - known: partitions this process already saw, so ingestion
+          only goes to the database for months it has not written yet
+    Months are dropped whole once their last day is older than the
+    retention, instead of deleting their rows. Every write creates the
+    partitions of its months first, rows of a missing month are rejected.
+    """
+
+    def __init__(
+            self, intervals: Iterable[str] = PARTITION_INTERVALS,
+            months_ahead: int = PARTITION_MONTHS_AHEAD,
+            retention: Optional[dict[str, int]] = None,
+            check_interval: float = PARTITION_CHECK_INTERVAL,
+            session_maker: async_sessionmaker = async_session_maker):
+        self.intervals = set(intervals)
+        self.months_ahead = months_ahead
+        self.retention = PARTITION_RETENTION_DAYS if retention is None else retention
+        unpartitioned = sorted(set(self.retention) - self.intervals)
+        if unpartitioned:
+            logging.warning(
+                f'Retention of {", ".join(unpartitioned)} ignored, '
+                'only PARTITION_INTERVALS months are dropped'
+            )
+        self.check_interval = check_interval
+        self.session_maker = session_maker
+        self.known: set[str] = set()
+        self.stopped = asyncio.Event()
+
+    def stop(self):
+        """Asks the maintenance loop to return"""
+        self.stopped.set()
+
+    @staticmethod
+    async def exists(session: AsyncSession, table: str) -> bool:
+        return await session.scalar(
+            text('SELECT to_regclass(:name) IS NOT NULL'), {'name': table}
+        )
+
+    async def create(self, session: AsyncSession, months: Iterable[tuple[str, datetime]]) -> list[str]:
+        """
+        Creates the missing month partitions, in one transaction serialized
+        across processes. Expired months are looked up again, another
+        process may have dropped them.
+        """
+        now = datetime.utcnow()
+        missing = sorted({
+            (interval, month_start(month)) for interval, month in months
+            if interval in self.intervals and (
+                month_table(interval, month) not in self.known
+                or self.is_expired(interval, month, now))
+        })
+        if not missing:
+            return []
+
+        created = []
+        await session.execute(
+            text('SELECT pg_advisory_xact_lock(hashtext(:key))'), {'key': LOCK_KEY}
+        )
+        for interval, month in missing:
+            table = month_table(interval, month)
+            if await self.exists(session, table):
+                self.known.add(table)
+                continue
+            try:
+                async with session.begin_nested():
+                    if not await self.exists(session, interval_table(interval)):
+                        for ddl in interval_partition_ddl(interval):
+                            await session.execute(text(ddl))
+                    await session.execute(text(month_partition_ddl(interval, month)))
+                self.known.add(table)
+                created.append(table)
+            except DBAPIError as err:
+                logging.error(f'Creating partition {table} failed: {err}')
+        await session.commit()
+        if created:
+            logging.info(f'Created partitions {", ".join(created)}')
+        return created
+
+    async def create_for_rows(self, session: AsyncSession, rows: list[dict[str, Any]]) -> list[str]:
+        """Creates the month partitions binance_data rows are about to be written to"""
+        return await self.create(
+            session, {(row['interval'], month_start(row['open_time'])) for row in rows}
+        )
+
+    async def create_upcoming(self, session: AsyncSession, now: datetime) -> list[str]:
+        """Creates the partitions of the current month and the months_ahead next ones"""
+        months, month = [], month_start(now)
+        for _ in range(self.months_ahead + 1):
+            months.append(month)
+            month = next_month(month)
+        return await self.create(
+            session, [(interval, month) for interval in self.intervals for month in months]
+        )
+
+    def is_expired(self, interval: str, month: datetime, now: datetime) -> bool:
+        """Returns True if the month ended before the retention of its interval"""
+        days = self.retention.get(interval)
+        return days is not None and (
+            next_month(month_start(month)) <= now - timedelta(days=days)
+        )
+
+    async def drop_expired(self, session: AsyncSession, now: datetime) -> list[str]:
+        """
+        Drops the month partitions entirely older than their interval retention.
+        Each one is detached concurrently first, so reads and writes of the
+        interval keep running while it is dropped. Detaching runs outside
+        a transaction, on its own connection, once session is committed;
+        a detach left pending by an interrupted run is finalized.
+        """
+        await session.commit()
+        dropped: dict[str, list[str]] = {}
+        async with self.session_maker() as maintenance:
+            connection = await maintenance.connection(
+                execution_options={'isolation_level': 'AUTOCOMMIT'}
+            )
+            await connection.execute(
+                text('SELECT pg_advisory_lock(hashtext(:key))'), {'key': LOCK_KEY}
+            )
+            try:
+                for interval in self.retention:
+                    if interval not in self.intervals:
+                        continue
+                    for name in await self.detach_expired(connection, interval, now):
+                        dropped.setdefault(interval, []).append(name)
+            finally:
+                await connection.execute(
+                    text('SELECT pg_advisory_unlock(hashtext(:key))'), {'key': LOCK_KEY}
+                )
+
+        # pages served from the dropped candles are no longer valid
+        for interval in dropped:
+            await session.execute(text(
+                'UPDATE binance_data_version SET version = version + 1, '
+                "updated_at = timezone('UTC', now()) WHERE interval = :interval"
+            ), {'interval': interval})
+        await session.commit()
+        names = [name for names in dropped.values() for name in names]
+        if names:
+            logging.info(f'Dropped expired partitions {", ".join(names)}')
+        return names
+
+    async def detach_expired(self, connection: AsyncConnection, interval: str, now: datetime) -> list[str]:
+        """Detaches and drops the expired month partitions of an interval"""
+        parent = interval_table(interval)
+        pattern = re.compile(rf'^{parent}_p(\d{{4}})_(\d{{2}})$')
+        query_result = await connection.execute(text(
+            'SELECT child.relname, pg_inherits.inhdetachpending FROM pg_inherits '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+            'WHERE parent.relname = :parent ORDER BY child.relname'
+        ), {'parent': parent})
+        dropped = []
+        for name, pending in query_result.all():
+            match = pattern.match(name)
+            if match is None or not self.is_expired(
+                    interval, datetime(int(match[1]), int(match[2]), 1), now):
+                continue
+            mode = 'FINALIZE' if pending else 'CONCURRENTLY'
+            try:
+                await connection.execute(text(
+                    f'ALTER TABLE {parent} DETACH PARTITION {name} {mode}'
+                ))
+                await connection.execute(text(f'DROP TABLE IF EXISTS {name}'))
+            except DBAPIError as err:
+                logging.error(f'Dropping partition {name} failed: {err}')
+                continue
+            self.known.discard(name)
+            dropped.append(name)
+        return dropped
+
+    async def maintain(self, now: Optional[datetime] = None):
+        """Creates the upcoming partitions and drops the expired ones"""
+        now = now or datetime.utcnow()
+        async with self.session_maker() as session:
+            await self.create_upcoming(session, now)
+            await self.drop_expired(session, now)
+
+    async def run(self):
+        """Maintains the partitions every check_interval seconds until stopped"""
+        while not self.stopped.is_set():
+            try:
+                await self.maintain()
+            except Exception as err:
+                logging.error(f'Partition maintenance failed: {err}')
+            try:
+                await asyncio.wait_for(self.stopped.wait(), self.check_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+partition_manager = PartitionManager()
@@ -1,28 +1,137 @@
-from typing import Any
+import hashlib
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Optional, AsyncIterator
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from src.config import INGEST_BATCH_SIZE, DOWNLOAD_CHUNK_SIZE, \
+    EXPORT_FETCH_SIZE, JOB_MAX_ATTEMPTS, CSV_RETENTION_KEEP, \
+    PARTITION_INTERVALS
 from src.database.database import Base
-from sqlalchemy import Column, String, Integer, Select, \
-    select, Result, MetaData, Table, desc
-from sqlalchemy.dialects.postgresql import BYTEA
+from src.database.partitions import default_partition_ddl, \
+    interval_partition_ddl, partition_manager
+from sqlalchemy import Column, String, Integer, Select, DateTime, Numeric, \
+    Index, select, tuple_, func, literal, null, Result, MetaData, Table, desc, \
+    Text, text, update, and_, or_, BigInteger, ForeignKey, delete, exists, \
+    DDL, event
+from sqlalchemy.dialects.postgresql import BYTEA, JSONB, insert, \
+    aggregate_order_by
 from sqlalchemy.orm import Mapped, mapped_column
 
 
 metadata = MetaData()
 
+# server side UTC clock shared by every worker process
+utc_now = func.timezone('UTC', func.now(), type_=DateTime)
+
+# partition keys must be part of the primary key and of unique indexes
 binance_data = Table(
     'binance_data',
     metadata,
-    Column('id', Integer, primary_key=True),
-    Column('interval', String(10), nullable=False),
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('interval', String(10), primary_key=True),
     Column('symbol', String(128), nullable=False),
-    Column('open_time', String(128), nullable=False),
-    Column('open', String(255), nullable=False),
-    Column('high', String(255), nullable=False),
-    Column('low', String(255), nullable=False),
-    Column('close', String(255), nullable=False),
-    Column('volume', String(255), nullable=False)
+    Column('open_time', DateTime, primary_key=True),
+    Column('open', Numeric(28, 8), nullable=False),
+    Column('high', Numeric(28, 8), nullable=False),
+    Column('low', Numeric(28, 8), nullable=False),
+    Column('close', Numeric(28, 8), nullable=False),
+    Column('volume', Numeric(28, 8), nullable=False),
+    Index(
+        'ix_binance_data_symbol_interval_open_time',
+        'symbol', 'interval', 'open_time', unique=True
+    ),
+    Index('ix_binance_data_symbol_open_time_id', 'symbol', 'open_time', 'id'),
+    postgresql_partition_by='LIST (interval)'
 )
 
+for partition_ddl in [default_partition_ddl()] + [
+        ddl for interval in PARTITION_INTERVALS
+        for ddl in interval_partition_ddl(interval)]:
+    event.listen(binance_data, 'after_create', DDL(partition_ddl))
+
+# one version per (symbol, interval), bumped by every write of its candles
+binance_data_version = Table(
+    'binance_data_version',
+    metadata,
+    Column('symbol', String(128), primary_key=True),
+    Column('interval', String(10), primary_key=True),
+    Column('version', BigInteger, nullable=False),
+    Column('updated_at', DateTime, nullable=False, server_default=utc_now)
+)
+
+
+async def bump_versions(session: AsyncSession, pairs: set[tuple[str, str]]):
+    """
+    Increments the version of (symbol, interval) pairs in the current
+    transaction, in key order so concurrent writers do not deadlock
+    """
+    if not pairs:
+        return
+    query = insert(binance_data_version).values([
+        {'symbol': symbol, 'interval': interval, 'version': 1}
+        for symbol, interval in sorted(pairs)
+    ])
+    query = query.on_conflict_do_update(
+        index_elements=['symbol', 'interval'],
+        set_={
+            'version': binance_data_version.c.version + 1,
+            'updated_at': utc_now
+        }
+    )
+    await session.execute(query)
+
+
+def aggregate_candles(
+        symbol: str, interval: str, target: str,
+        stride: Optional[timedelta], origin: datetime,
+        start: Optional[datetime] = None, end: Optional[datetime] = None,
+        after: Optional[datetime] = None) -> Select:
+    """
+    Returns a query aggregating stored interval candles into target candles
+    binned by date_bin(stride, open_time, origin), or by calendar month
+    when stride is None, ordered by open time
+    """
+    if stride is None:
+        bucket = func.date_trunc('month', binance_data.c.open_time)
+    else:
+        bucket = func.date_bin(stride, binance_data.c.open_time, origin)
+
+    candles = select(
+        bucket.label('bucket'), binance_data.c.open_time, binance_data.c.open,
+        binance_data.c.high, binance_data.c.low, binance_data.c.close,
+        binance_data.c.volume
+    ).where(
+        binance_data.c.symbol == symbol, binance_data.c.interval == interval
+    )
+    if start is not None:
+        candles = candles.where(binance_data.c.open_time >= start)
+    if end is not None:
+        candles = candles.where(binance_data.c.open_time < end)
+    if after is not None:
+        candles = candles.where(binance_data.c.open_time > after)
+    candles = candles.subquery()
+
+    query: Select = select(
+        literal(target).label('interval'),
+        literal(symbol).label('symbol'),
+        candles.c.bucket.label('open_time'),
+        func.array_agg(aggregate_order_by(
+            candles.c.open, candles.c.open_time.asc()
+        ))[1].label('open'),
+        func.max(candles.c.high).label('high'),
+        func.min(candles.c.low).label('low'),
+        func.array_agg(aggregate_order_by(
+            candles.c.close, candles.c.open_time.desc()
+        ))[1].label('close'),
+        func.sum(candles.c.volume).label('volume')
+    )
+    if after is not None:
+        # rows of the bucket after itself pass the open_time filter
+        query = query.where(candles.c.bucket > after)
+
+    return query.group_by(candles.c.bucket).order_by(candles.c.bucket)
+
 
 class BinanceData(Base):
     """
@@ -31,50 +140,69 @@ class BinanceData(Base):
         - id: The id of the symbol
         - interval: The interval between
         - symbol: The symbol
-        - open_time: The open time of the symbol
+        - open_time: The open time of the symbol (UTC)
         - open: amount at the opening of the transaction
         - high: maximum amount
         - low: minimum amount
         - close: amount at the close of the transaction
         - volume: volume
-        - close_time: the close time of the transaction
+    (symbol, interval, open_time) is unique, so re-ingesting
+    a candle updates it in place. The table is partitioned by interval,
+    then by month of open time, see partitions.py.
     """
 
     __tablename__ = 'binance_data'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index(
+            'ix_binance_data_symbol_interval_open_time',
+            'symbol', 'interval', 'open_time', unique=True
+        ),
+        Index(
+            'ix_binance_data_symbol_open_time_id',
+            'symbol', 'open_time', 'id'
+        ),
+        {
+            'extend_existing': True,
+            'postgresql_partition_by': 'LIST (interval)'
+        }
+    )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    id: Mapped[int] = mapped_column(
+        Integer, primary_key=True, autoincrement=True
+    )
     interval: Mapped[str] = mapped_column(
-        String(10), nullable=False
+        String(10), primary_key=True
     )
     symbol: Mapped[str] = mapped_column(
         String(128), nullable=False
     )
-    open_time: Mapped[str] = mapped_column(
-        String(128), nullable=False
+    open_time: Mapped[datetime] = mapped_column(
+        DateTime, primary_key=True
     )
-    open: Mapped[str] = mapped_column(
-        String(255), nullable=False
+    open: Mapped[Decimal] = mapped_column(
+        Numeric(28, 8), nullable=False
     )
-    high: Mapped[str] = mapped_column(
-        String(255), nullable=False
+    high: Mapped[Decimal] = mapped_column(
+        Numeric(28, 8), nullable=False
     )
-    low: Mapped[str] = mapped_column(
-        String(255), nullable=False
+    low: Mapped[Decimal] = mapped_column(
+        Numeric(28, 8), nullable=False
     )
-    close: Mapped[str] = mapped_column(
-        String(255), nullable=False
+    close: Mapped[Decimal] = mapped_column(
+        Numeric(28, 8), nullable=False
     )
-    volume: Mapped[str] = mapped_column(
-        String(255), nullable=False
+    volume: Mapped[Decimal] = mapped_column(
+        Numeric(28, 8), nullable=False
     )
 
     @staticmethod
     async def create_binance_data(session: AsyncSession, kwargs: dict[str, Any]):
         """Create a row binance data in the database"""
+        await partition_manager.create_for_rows(session, [kwargs])
         new_row = BinanceData(**kwargs)
         session.add(new_row)
         try:
+            await bump_versions(session, {(new_row.symbol, new_row.interval)})
             await session.commit()
             return new_row
 
@@ -82,6 +210,42 @@ class BinanceData(Base):
             await session.rollback()
             raise
 
+    @staticmethod
+    async def upsert_binance_data(
+            session: AsyncSession, rows: list[dict[str, Any]],
+            batch_size: int = INGEST_BATCH_SIZE) -> int:
+        """
+        Insert or update rows binance data in one transaction,
+        keyed by (symbol, interval, open_time), bumping the versions
+        of their pairs, once the partitions of their months exist
+        """
+        if not rows:
+            return 0
+        await partition_manager.create_for_rows(session, rows)
+        query = insert(BinanceData)
+        query = query.on_conflict_do_update(
+            index_elements=['symbol', 'interval', 'open_time'],
+            set_={
+                'open': query.excluded.open,
+                'high': query.excluded.high,
+                'low': query.excluded.low,
+                'close': query.excluded.close,
+                'volume': query.excluded.volume
+            }
+        )
+        try:
+            await bump_versions(
+                session, {(row['symbol'], row['interval']) for row in rows}
+            )
+            for start in range(0, len(rows), batch_size):
+                await session.execute(query, rows[start:start + batch_size])
+            await session.commit()
+            return len(rows)
+
+        except Exception:
+            await session.rollback()
+            raise
+
     @staticmethod
     async def get_all_data_by_symbol(symbol: str, session: AsyncSession):
         """Returns all data for a symbol in the database"""
@@ -89,13 +253,303 @@ class BinanceData(Base):
         query_result: Result = await session.execute(query)
         return query_result.scalars().all()
 
+    @staticmethod
+    async def get_page_by_symbol(
+            session: AsyncSession, symbol: str, limit: int,
+            interval: Optional[str] = None,
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None,
+            after: Optional[tuple[datetime, int]] = None):
+        """
+        Returns up to limit rows for a symbol ordered by (open_time, id),
+        starting right after the keyset position after.
+        Plain rows are selected, loading ORM instances dominates large pages.
+        """
+        query: Select = select(*BinanceData.__table__.c).filter_by(symbol=symbol)
+        if interval is not None:
+            query = query.filter_by(interval=interval)
+        if start is not None:
+            query = query.where(BinanceData.open_time >= start)
+        if end is not None:
+            query = query.where(BinanceData.open_time < end)
+        if after is not None:
+            query = query.where(
+                tuple_(BinanceData.open_time, BinanceData.id) > tuple_(*after)
+            )
+        query = query.order_by(BinanceData.open_time, BinanceData.id)
+        query_result: Result = await session.execute(query.limit(limit))
+        return query_result.all()
+
+    @staticmethod
+    async def get_resampled_page(
+            session: AsyncSession, symbol: str, interval: str, target: str,
+            stride: Optional[timedelta], origin: datetime, limit: int,
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None,
+            after: Optional[datetime] = None):
+        """
+        Returns up to limit target candles aggregated from the stored
+        interval candles, starting right after the bucket after
+        """
+        query: Select = aggregate_candles(
+            symbol, interval, target, stride, origin, start, end, after
+        )
+        query = query.add_columns(null().label('id')).limit(limit)
+        query_result: Result = await session.execute(query)
+        return query_result.all()
+
+    @staticmethod
+    async def get_open_times(
+            session: AsyncSession, symbol: str, interval: str,
+            start: datetime, end: datetime) -> list[datetime]:
+        """Returns the stored open times for a symbol and interval in [start, end)"""
+        query: Select = select(BinanceData.open_time).filter_by(
+            symbol=symbol, interval=interval
+        ).where(BinanceData.open_time >= start, BinanceData.open_time < end)
+        query_result: Result = await session.execute(query)
+        return query_result.scalars().all()
+
+    @staticmethod
+    async def get_last_open_time(
+            session: AsyncSession, symbol: str,
+            interval: str) -> Optional[datetime]:
+        """Returns the latest stored open time for a symbol and interval"""
+        query: Select = select(func.max(BinanceData.open_time)).filter_by(
+            symbol=symbol, interval=interval
+        )
+        query_result: Result = await session.execute(query)
+        return query_result.scalar()
+
+    @staticmethod
+    async def get_versions(
+            session: AsyncSession, symbol: str,
+            interval: Optional[str] = None):
+        """
+        Returns the (interval, version, updated_at) rows of a symbol, or of
+        one of its intervals. Every write of their candles bumps them, so
+        pages only change along with them.
+        """
+        query: Select = select(
+            binance_data_version.c.interval, binance_data_version.c.version,
+            binance_data_version.c.updated_at
+        ).where(binance_data_version.c.symbol == symbol)
+        if interval is not None:
+            query = query.where(binance_data_version.c.interval == interval)
+        query_result: Result = await session.execute(
+            query.order_by(binance_data_version.c.interval)
+        )
+        return query_result.all()
+
+    @staticmethod
+    async def get_latest(
+            session: AsyncSession, symbol: str, interval: str, limit: int,
+            start: Optional[datetime] = None) -> list[tuple]:
+        """
+        Returns the last limit (open_time, open, high, low, close, volume)
+        rows opened at or after start, in open time order
+        """
+        query: Select = select(
+            BinanceData.open_time, BinanceData.open, BinanceData.high,
+            BinanceData.low, BinanceData.close, BinanceData.volume
+        ).filter_by(symbol=symbol, interval=interval)
+        if start is not None:
+            query = query.where(BinanceData.open_time >= start)
+        query = query.order_by(desc(BinanceData.open_time)).limit(limit)
+        query_result: Result = await session.execute(query)
+        return [tuple(row) for row in reversed(query_result.all())]
+
+    @staticmethod
+    async def stream_by_range(
+            session: AsyncSession, symbol: str, interval: str,
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None,
+            fetch_size: int = EXPORT_FETCH_SIZE) -> AsyncIterator[tuple]:
+        """
+        Yields (open_time, open, high, low, close, volume) rows in open time
+        order through a server-side cursor, fetch_size rows at a time
+        """
+        query: Select = select(
+            BinanceData.open_time, BinanceData.open, BinanceData.high,
+            BinanceData.low, BinanceData.close, BinanceData.volume
+        ).filter_by(symbol=symbol, interval=interval)
+        if start is not None:
+            query = query.where(BinanceData.open_time >= start)
+        if end is not None:
+            query = query.where(BinanceData.open_time < end)
+        query = query.order_by(BinanceData.open_time)
+
+        query_result = await session.stream(
+            query.execution_options(yield_per=fetch_size)
+        )
+        async for row in query_result:
+            yield tuple(row)
+
+
+kline_rollup = Table(
+    'kline_rollup',
+    metadata,
+    Column('id', Integer, primary_key=True),
+    Column('interval', String(10), nullable=False),
+    Column('symbol', String(128), nullable=False),
+    Column('open_time', DateTime, nullable=False),
+    Column('open', Numeric(28, 8), nullable=False),
+    Column('high', Numeric(28, 8), nullable=False),
+    Column('low', Numeric(28, 8), nullable=False),
+    Column('close', Numeric(28, 8), nullable=False),
+    Column('volume', Numeric(28, 8), nullable=False),
+    Index(
+        'ix_kline_rollup_symbol_interval_open_time',
+        'symbol', 'interval', 'open_time', unique=True
+    )
+)
+
+
+class KlineRollup(Base):
+    """
+    Model for precomputed candles aggregated from binance_data:
+    Attributes:
+        - interval: The rolled up interval
+        - symbol, open_time, open, high, low, close, volume:
+          as in BinanceData
+    Only the buckets touched by an ingest batch are recomputed.
+    """
+
+    __tablename__ = 'kline_rollup'
+    __table_args__ = (
+        Index(
+            'ix_kline_rollup_symbol_interval_open_time',
+            'symbol', 'interval', 'open_time', unique=True
+        ),
+        {'extend_existing': True}
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    interval: Mapped[str] = mapped_column(
+        String(10), nullable=False
+    )
+    symbol: Mapped[str] = mapped_column(
+        String(128), nullable=False
+    )
+    open_time: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False
+    )
+    open: Mapped[Decimal] = mapped_column(
+        Numeric(28, 8), nullable=False
+    )
+    high: Mapped[Decimal] = mapped_column(
+        Numeric(28, 8), nullable=False
+    )
+    low: Mapped[Decimal] = mapped_column(
+        Numeric(28, 8), nullable=False
+    )
+    close: Mapped[Decimal] = mapped_column(
+        Numeric(28, 8), nullable=False
+    )
+    volume: Mapped[Decimal] = mapped_column(
+        Numeric(28, 8), nullable=False
+    )
+
+    @staticmethod
+    async def refresh(
+            session: AsyncSession, symbol: str, interval: str, target: str,
+            stride: Optional[timedelta], origin: datetime,
+            start: datetime, end: datetime):
+        """
+        Recomputes the target candles whose buckets lie in [start, end)
+        from the stored interval candles
+        """
+        columns = ['interval', 'symbol', 'open_time', 'open',
+                   'high', 'low', 'close', 'volume']
+        query = insert(KlineRollup).from_select(columns, aggregate_candles(
+            symbol, interval, target, stride, origin, start, end
+        ))
+        query = query.on_conflict_do_update(
+            index_elements=['symbol', 'interval', 'open_time'],
+            set_={
+                'open': query.excluded.open,
+                'high': query.excluded.high,
+                'low': query.excluded.low,
+                'close': query.excluded.close,
+                'volume': query.excluded.volume
+            }
+        )
+        try:
+            # pages resampled from the rollups change along with them
+            await bump_versions(session, {(symbol, interval)})
+            await session.execute(query)
+            await session.commit()
+
+        except Exception:
+            await session.rollback()
+            raise
+
+    @staticmethod
+    async def get_page(
+            session: AsyncSession, symbol: str, interval: str, limit: int,
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None,
+            after: Optional[datetime] = None):
+        """Returns up to limit rolled up candles opened after after, as plain rows"""
+        query: Select = select(*KlineRollup.__table__.c).filter_by(
+            symbol=symbol, interval=interval
+        )
+        if start is not None:
+            query = query.where(KlineRollup.open_time >= start)
+        if end is not None:
+            query = query.where(KlineRollup.open_time < end)
+        if after is not None:
+            query = query.where(KlineRollup.open_time > after)
+        query = query.order_by(KlineRollup.open_time).limit(limit)
+        query_result: Result = await session.execute(query)
+        return query_result.all()
+
+
+csv_blob = Table(
+    'csv_blob',
+    metadata,
+    Column('hash', String(64), primary_key=True),
+    Column('encoding', String(16), nullable=False),
+    Column('size', BigInteger, nullable=False),
+    Column('data', BYTEA, nullable=False)
+)
+
+
+class CSVBlob(Base):
+    """
+    Model for the content of generated files, shared by every export
+    with the same content:
+    Attributes:
+        - hash: sha256 of the decoded content (string)
+        - encoding: identity, gzip or zstd (string)
+        - size: decoded size (integer)
+        - data: encoded data (bytes)
+    """
+
+    __tablename__ = 'csv_blob'
+    __table_args__ = {'extend_existing': True}
+
+    hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    encoding: Mapped[str] = mapped_column(String(16), nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    data = mapped_column(BYTEA, nullable=False)
+
 
 csv_data = Table(
     'csv_data',
     metadata,
     Column('id', Integer, primary_key=True),
     Column('filename', String(128), nullable=False),
-    Column('data', BYTEA, nullable=False)
+    Column('format', String(16), nullable=False, server_default='csv'),
+    Column('symbol', String(128)),
+    Column('interval', String(10)),
+    Column('generated_at', DateTime, nullable=False, server_default=utc_now),
+    Column(
+        'blob_hash', String(64), ForeignKey('csv_blob.hash'), nullable=False
+    ),
+    Index(
+        'ix_csv_data_symbol_interval_generated_at',
+        'symbol', 'interval', 'generated_at'
+    )
 )
 
 
@@ -104,26 +558,60 @@ class CSVData(Base):
     Model for CSV data:
     Attributes:
         - filename: filename (string)
-        - data: data (bytes)
+        - format: file format, csv, parquet or arrow (string)
+        - symbol, interval: what the file was generated for (string)
+        - generated_at: generation time (datetime)
+        - blob_hash: hash of its content in csv_blob (string)
+    Regenerating identical content stores a new export, not a new blob.
     """
 
     __tablename__ = 'csv_data'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index(
+            'ix_csv_data_symbol_interval_generated_at',
+            'symbol', 'interval', 'generated_at'
+        ),
+        {'extend_existing': True}
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     filename: Mapped[str] = mapped_column(
         String(128), nullable=False
     )
-    data = mapped_column(
-        BYTEA, nullable=False
+    format: Mapped[str] = mapped_column(
+        String(16), nullable=False, server_default='csv'
+    )
+    symbol: Mapped[Optional[str]] = mapped_column(String(128))
+    interval: Mapped[Optional[str]] = mapped_column(String(10))
+    generated_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, server_default=utc_now
+    )
+    blob_hash: Mapped[str] = mapped_column(
+        String(64), ForeignKey('csv_blob.hash'), nullable=False
     )
 
     @staticmethod
-    async def create_csv_data(session: AsyncSession, filename: str, data: bytes):
-        """Create a CSV data in database"""
-        new_csv_data = CSVData(filename=filename, data=data)
-        session.add(new_csv_data)
+    async def create_csv_data(
+            session: AsyncSession, filename: str, data: bytes,
+            file_format: str = 'csv', symbol: Optional[str] = None,
+            interval: Optional[str] = None, encoding: str = 'identity',
+            content_hash: Optional[str] = None, size: Optional[int] = None):
+        """
+        Create a CSV data in database, data is stored as is, so pass the
+        hash and size of the decoded content along with encoded data
+        """
+        if content_hash is None:
+            content_hash, size = hashlib.sha256(data).hexdigest(), len(data)
+        blob = insert(csv_blob).values(
+            hash=content_hash, encoding=encoding, size=size, data=data
+        ).on_conflict_do_nothing(index_elements=['hash'])
+        new_csv_data = CSVData(
+            filename=filename, format=file_format, symbol=symbol,
+            interval=interval, blob_hash=content_hash
+        )
         try:
+            await session.execute(blob)
+            session.add(new_csv_data)
             await session.commit()
             return new_csv_data
         except Exception:
@@ -138,3 +626,284 @@ class CSVData(Base):
         query_result: Result = await session.execute(query)
         return query_result.fetchone()
 
+    @staticmethod
+    async def get_last_csv_info(
+            session: AsyncSession, file_format: Optional[str] = None,
+            symbol: Optional[str] = None, interval: Optional[str] = None,
+            generated_before: Optional[datetime] = None,
+            csv_id: Optional[int] = None):
+        """
+        Returns the last csv data matching the filters with its blob hash,
+        encoding, decoded size and stored size, without its body
+        """
+        query: Select = select(
+            CSVData.id, CSVData.filename, CSVData.format, CSVData.symbol,
+            CSVData.interval, CSVData.generated_at, CSVData.blob_hash,
+            CSVBlob.encoding, CSVBlob.size,
+            func.octet_length(CSVBlob.data).label('stored_size')
+        ).join(CSVBlob, CSVBlob.hash == CSVData.blob_hash)
+        filters = {
+            'id': csv_id, 'format': file_format,
+            'symbol': symbol, 'interval': interval
+        }
+        for column, value in filters.items():
+            if value is not None:
+                query = query.where(csv_data.c[column] == value)
+        if generated_before is not None:
+            query = query.where(CSVData.generated_at <= generated_before)
+        query: Select = query.order_by(
+            desc(CSVData.generated_at), desc(CSVData.id)
+        ).limit(1)
+        query_result: Result = await session.execute(query)
+        return query_result.fetchone()
+
+    @staticmethod
+    async def list_csv_data(
+            session: AsyncSession, symbol: str, interval: Optional[str] = None,
+            limit: int = 100):
+        """Returns the newest exports of a symbol"""
+        query: Select = select(
+            CSVData.id, CSVData.filename, CSVData.format, CSVData.symbol,
+            CSVData.interval, CSVData.generated_at, CSVBlob.size
+        ).join(CSVBlob, CSVBlob.hash == CSVData.blob_hash).filter_by(symbol=symbol)
+        if interval is not None:
+            query = query.where(CSVData.interval == interval)
+        query = query.order_by(desc(CSVData.generated_at)).limit(limit)
+        query_result: Result = await session.execute(query)
+        return query_result.all()
+
+    @staticmethod
+    async def iter_csv_chunks(
+            session: AsyncSession, blob_hash: str, start: int, end: int,
+            chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Yields the inclusive stored byte range [start, end] of a blob in chunks"""
+        for offset in range(start, end + 1, chunk_size):
+            length = min(chunk_size, end + 1 - offset)
+            query: Select = select(
+                func.substring(CSVBlob.data, offset + 1, length)
+            ).filter_by(hash=blob_hash)
+            query_result: Result = await session.execute(query)
+            yield query_result.scalar_one()
+
+    @staticmethod
+    async def prune(
+            session: AsyncSession, before: datetime,
+            keep: int = CSV_RETENTION_KEEP) -> int:
+        """
+        Deletes the exports generated before before, except the keep newest
+        of every (symbol, interval, format), then the blobs no export uses.
+        Returns the number of exports deleted.
+        """
+        ranked = select(
+            csv_data.c.id, csv_data.c.generated_at,
+            func.row_number().over(
+                partition_by=(
+                    csv_data.c.symbol, csv_data.c.interval, csv_data.c.format
+                ),
+                order_by=(desc(csv_data.c.generated_at), desc(csv_data.c.id))
+            ).label('rank')
+        ).subquery()
+        expired = select(ranked.c.id).where(
+            ranked.c.rank > keep, ranked.c.generated_at < before
+        )
+        try:
+            deleted: Result = await session.execute(
+                delete(csv_data).where(csv_data.c.id.in_(expired))
+            )
+            await session.execute(delete(csv_blob).where(~exists().where(
+                csv_data.c.blob_hash == csv_blob.c.hash
+            )))
+            await session.commit()
+            return deleted.rowcount
+        except Exception:
+            await session.rollback()
+            raise
+
+
+# job statuses, a job is claimable while pending and once its run_at passed
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+# a retry that found an identical job pending, which does the work instead
+JOB_SUPERSEDED = 'superseded'
+
+job = Table(
+    'job',
+    metadata,
+    Column('id', Integer, primary_key=True),
+    Column('kind', String(32), nullable=False),
+    Column('symbol', String(128), nullable=False),
+    Column('interval', String(10), nullable=False),
+    Column('params', JSONB, nullable=False),
+    Column('status', String(16), nullable=False),
+    Column('attempts', Integer, nullable=False),
+    Column('max_attempts', Integer, nullable=False),
+    Column('error', Text),
+    Column('run_at', DateTime, nullable=False),
+    Column('locked_at', DateTime),
+    Column('created_at', DateTime, nullable=False),
+    Column('finished_at', DateTime),
+    Index(
+        'ix_job_pending_dedupe', 'kind', 'symbol', 'interval', 'params',
+        unique=True, postgresql_where=text("status = 'pending'")
+    ),
+    Index('ix_job_status_run_at', 'status', 'run_at')
+)
+
+
+class Job(Base):
+    """
+    Model for queued ingestion jobs:
+    Attributes:
+        - kind: the work to run, a key of the worker handlers
+        - symbol, interval, params: its arguments
+        - status: pending, running, done, failed or superseded
+        - attempts, max_attempts: runs so far and before it fails for good
+        - error: the last failure
+        - run_at: time it may be claimed from, pushed back on retry
+        - locked_at: last heartbeat of the worker running it
+    At most one identical job is pending, enqueueing it again returns it.
+    """
+
+    __tablename__ = 'job'
+    __table_args__ = (
+        Index(
+            'ix_job_pending_dedupe', 'kind', 'symbol', 'interval', 'params',
+            unique=True, postgresql_where=text("status = 'pending'")
+        ),
+        Index('ix_job_status_run_at', 'status', 'run_at'),
+        {'extend_existing': True}
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    kind: Mapped[str] = mapped_column(String(32), nullable=False)
+    symbol: Mapped[str] = mapped_column(String(128), nullable=False)
+    interval: Mapped[str] = mapped_column(String(10), nullable=False)
+    params: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    run_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    locked_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+
+    @staticmethod
+    async def enqueue(
+            session: AsyncSession, kind: str, symbol: str, interval: str,
+            params: dict[str, Any], max_attempts: int = JOB_MAX_ATTEMPTS) -> int:
+        """Adds a pending job, or returns the id of the identical pending one"""
+        query = insert(job).values(
+            kind=kind, symbol=symbol, interval=interval, params=params,
+            status=JOB_PENDING, attempts=0, max_attempts=max_attempts,
+            run_at=utc_now, created_at=utc_now
+        )
+        query = query.on_conflict_do_update(
+            index_elements=['kind', 'symbol', 'interval', 'params'],
+            index_where=text("status = 'pending'"),
+            set_={'max_attempts': query.excluded.max_attempts}
+        ).returning(job.c.id)
+        try:
+            query_result: Result = await session.execute(query)
+            await session.commit()
+            return query_result.scalar_one()
+        except Exception:
+            await session.rollback()
+            raise
+
+    @staticmethod
+    async def claim(
+            session: AsyncSession, kinds: list[str], limit: int,
+            lock_timeout: timedelta) -> list:
+        """
+        Marks up to limit due jobs of the given kinds as running and
+        returns them, skipping the rows other workers hold and reclaiming
+        jobs whose worker stopped sending heartbeats
+        """
+        due: Select = select(job.c.id).where(job.c.kind.in_(kinds), or_(
+            and_(job.c.status == JOB_PENDING, job.c.run_at <= utc_now),
+            and_(
+                job.c.status == JOB_RUNNING,
+                job.c.locked_at < utc_now - lock_timeout
+            )
+        )).order_by(job.c.run_at).limit(limit).with_for_update(skip_locked=True)
+
+        query = update(job).where(job.c.id.in_(due.scalar_subquery())).values(
+            status=JOB_RUNNING, attempts=job.c.attempts + 1, locked_at=utc_now
+        ).returning(
+            job.c.id, job.c.kind, job.c.symbol, job.c.interval, job.c.params,
+            job.c.attempts, job.c.max_attempts
+        )
+        query_result: Result = await session.execute(query)
+        claimed = query_result.all()
+        await session.commit()
+        return claimed
+
+    @staticmethod
+    async def heartbeat(session: AsyncSession, ids: list[int]):
+        """Tells other workers the running jobs are still alive"""
+        await session.execute(
+            update(job).where(
+                job.c.id.in_(ids), job.c.status == JOB_RUNNING
+            ).values(locked_at=utc_now)
+        )
+        await session.commit()
+
+    @staticmethod
+    async def complete(session: AsyncSession, job_id: int):
+        """Marks a job done"""
+        await session.execute(
+            update(job).where(job.c.id == job_id).values(
+                status=JOB_DONE, error=None, locked_at=None,
+                finished_at=utc_now
+            )
+        )
+        await session.commit()
+
+    @staticmethod
+    async def fail(
+            session: AsyncSession, job_id: int, error: str,
+            retry_in: Optional[timedelta] = None) -> Optional[int]:
+        """
+        Puts a failed job back in the queue after retry_in,
+        or fails it for good when retry_in is None. A retry finding an
+        identical job pending marks it superseded and returns that job id.
+        """
+        values = {'error': error, 'locked_at': None}
+        if retry_in is not None:
+            values.update(status=JOB_PENDING, run_at=utc_now + retry_in)
+        else:
+            values.update(status=JOB_FAILED, finished_at=utc_now)
+        try:
+            await session.execute(
+                update(job).where(job.c.id == job_id).values(**values)
+            )
+            await session.commit()
+        except IntegrityError:
+            # an identical job was enqueued meanwhile and will do the work
+            await session.rollback()
+            failed = select(
+                job.c.kind, job.c.symbol, job.c.interval, job.c.params
+            ).where(job.c.id == job_id).subquery()
+            query: Select = select(job.c.id).join(failed, and_(
+                job.c.kind == failed.c.kind, job.c.symbol == failed.c.symbol,
+                job.c.interval == failed.c.interval,
+                job.c.params == failed.c.params
+            )).where(job.c.status == JOB_PENDING)
+            pending_id = (await session.execute(query)).scalar_one_or_none()
+            await session.execute(
+                update(job).where(job.c.id == job_id).values(
+                    status=JOB_SUPERSEDED, locked_at=None, finished_at=utc_now,
+                    error=f'{error}, retried by pending job {pending_id}'
+                )
+            )
+            await session.commit()
+            return pending_id
+        return None
+
+    @staticmethod
+    async def get_job(session: AsyncSession, job_id: int) -> Optional['Job']:
+        """Returns a job by id"""
+        return await session.get(Job, job_id)
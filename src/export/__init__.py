@@ -0,0 +1,7 @@
+from .writers import iter_csv
+from .frames import CSV_COLUMNS, klines_to_frame, klines_to_csv
+from .columnar import (FileFormat, MEDIA_TYPES, COMPRESSIONS, klines_to_table,
+                       render_klines)
+from .storage import (Blob, IDENTITY, GZIP, ZSTD, ENCODINGS, encode_blob,
+                      render_blob, iter_decoded)
+from .pool import ExportPool
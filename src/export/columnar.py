@@ -0,0 +1,73 @@
+from enum import Enum
+from typing import Optional
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .frames import CSV_COLUMNS, klines_to_csv
+
+
+class FileFormat(str, Enum):
+    CSV = 'csv'
+    PARQUET = 'parquet'
+    ARROW = 'arrow'
+
+
+# media type and the compression codecs every format accepts, None first
+MEDIA_TYPES = {
+    FileFormat.CSV: 'text/csv',
+    FileFormat.PARQUET: 'application/vnd.apache.parquet',
+    FileFormat.ARROW: 'application/vnd.apache.arrow.file'
+}
+COMPRESSIONS = {
+    FileFormat.CSV: (None,),
+    FileFormat.PARQUET: (None, 'snappy', 'gzip', 'zstd', 'lz4', 'brotli'),
+    FileFormat.ARROW: (None, 'lz4', 'zstd')
+}
+
+PRICE_TYPE = pa.decimal128(28, 8)
+KLINE_SCHEMA = pa.schema(
+    [(CSV_COLUMNS[0], pa.timestamp('ms', tz='UTC'))]
+    + [(column, PRICE_TYPE) for column in CSV_COLUMNS[1:]]
+)
+
+
+def klines_to_table(result: list[list[list]]) -> pa.Table:
+    """
+    Packs pages of raw Binance klines in an Arrow table, open times as UTC
+    timestamps and prices and volumes as decimal128(28, 8) parsed
+    straight from the strings Binance returns
+    """
+    klines = [kline for page in result for kline in page]
+    columns = list(zip(*klines)) or [()] * len(CSV_COLUMNS)
+    arrays = [pa.array(columns[0], type=KLINE_SCHEMA.field(0).type)] + [
+        pa.array(column, type=pa.string()).cast(PRICE_TYPE)
+        for column in columns[1:len(CSV_COLUMNS)]
+    ]
+    return pa.Table.from_arrays(arrays, schema=KLINE_SCHEMA)
+
+
+def klines_to_parquet(result: list[list[list]], compression: Optional[str]) -> bytes:
+    """Renders pages of raw Binance klines as a Parquet file"""
+    sink = pa.BufferOutputStream()
+    pq.write_table(klines_to_table(result), sink, compression=compression or 'none')
+    return sink.getvalue().to_pybytes()
+
+
+def klines_to_arrow(result: list[list[list]], compression: Optional[str]) -> bytes:
+    """Renders pages of raw Binance klines as an Arrow IPC file"""
+    table = klines_to_table(result)
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def render_klines(
+        result: list[list[list]], file_format: FileFormat,
+        compression: Optional[str] = None) -> bytes:
+    """Renders pages of raw Binance klines in the requested file format"""
+    if file_format == FileFormat.PARQUET:
+        return klines_to_parquet(result, compression)
+    if file_format == FileFormat.ARROW:
+        return klines_to_arrow(result, compression)
+    return klines_to_csv(result)
@@ -0,0 +1,42 @@
+import csv
+import io
+import pandas as pd
+
+KLINE_COLUMNS = [
+    'Open time', 'Open', 'High', 'Low', 'Close', 'Volume',
+    'Close time', 'Quote asset volume',
+    'Number of trades', 'Taker buy base asset volume',
+    'Taker buy quote asset volume',
+    'Ignore'
+]
+CSV_COLUMNS = KLINE_COLUMNS[:6]
+
+# these run in the export pool, so they only take and return picklable values
+
+
+def klines_to_frame(result: list[list[list]]) -> pd.DataFrame:
+    """Packs pages of raw Binance klines in a data frame"""
+    df = pd.DataFrame(*result, columns=KLINE_COLUMNS)
+
+    # Преобразование временных меток в удобный формат
+    df['Open time'] = pd.to_datetime(df['Open time'], unit='ms')
+
+    # Удаление ненужных столбцов
+    return df.drop(KLINE_COLUMNS[6:], axis=1)
+
+
+def klines_to_csv(result: list[list[list]]) -> bytes:
+    """Renders pages of raw Binance klines as an encoded CSV file"""
+    csv_buffer = io.StringIO()
+    klines_to_frame(result).to_csv(csv_buffer, index=False)
+    return csv_buffer.getvalue().encode('utf8')
+
+
+def render_csv(rows: list[tuple], header: bool) -> bytes:
+    """Renders (open_time, open, high, low, close, volume) rows as CSV lines"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    if header:
+        writer.writerow(CSV_COLUMNS)
+    writer.writerows(rows)
+    return buffer.getvalue().encode('utf8')
@@ -0,0 +1,54 @@
+import asyncio
+import logging
+import os
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+from config import EXPORT_POOL, EXPORT_POOL_SIZE, EXPORT_POOL_NICE
+
+
+class ExportPool:
+    """
+    Executor the CPU heavy export work runs in, so the event loop
+    only awaits DataFrame building, encoding and compression:
+    Attributes:
+        - executor: the process or thread pool opened in the app lifespan
+    """
+
+    executor: Optional[Executor] = None
+
+    @classmethod
+    def start(cls, kind: str = EXPORT_POOL, size: int = EXPORT_POOL_SIZE) -> Executor:
+        """Opens a process pool, or a thread pool when kind is 'thread'"""
+        if kind == 'thread':
+            cls.executor = ThreadPoolExecutor(size, thread_name_prefix='export')
+        else:
+            # spawned workers do not inherit the event loop and its sockets,
+            # and a higher niceness keeps them from starving it of CPU
+            cls.executor = ProcessPoolExecutor(
+                size, mp_context=multiprocessing.get_context('spawn'),
+                initializer=os.nice, initargs=(EXPORT_POOL_NICE,)
+            )
+        logging.info(f'Export pool started: {size} {kind} workers')
+        return cls.executor
+
+    @classmethod
+    async def close(cls):
+        """
+        Shuts the pool down, dropping the work not started yet, and waits
+        for the running work in a thread so the event loop keeps serving
+        """
+        executor, cls.executor = cls.executor, None
+        if executor is not None:
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+            logging.info('Export pool closed')
+
+    @classmethod
+    async def run(cls, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Runs func(*args) in the pool, or in the default thread pool
+        when the app lifespan has not started it
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(cls.executor, partial(func, *args))
@@ -0,0 +1,64 @@
+import gzip
+import hashlib
+import zlib
+from typing import AsyncIterator, NamedTuple, Optional
+import zstandard
+from .columnar import FileFormat, render_klines
+
+IDENTITY = 'identity'
+GZIP = 'gzip'
+ZSTD = 'zstd'
+ENCODINGS = (IDENTITY, GZIP, ZSTD)
+
+
+class Blob(NamedTuple):
+    """A stored file: sha256 and size of its content, and its encoded bytes"""
+    hash: str
+    encoding: str
+    size: int
+    data: bytes
+
+
+def encode_blob(data: bytes, encoding: str) -> Blob:
+    """Hashes and compresses file content, runs in the export pool"""
+    content_hash = hashlib.sha256(data).hexdigest()
+    if encoding == GZIP:
+        encoded = gzip.compress(data, compresslevel=6, mtime=0)
+    elif encoding == ZSTD:
+        encoded = zstandard.ZstdCompressor(level=10).compress(data)
+    else:
+        encoded, encoding = data, IDENTITY
+    return Blob(content_hash, encoding, len(data), encoded)
+
+
+def render_blob(
+        result: list[list[list]], file_format: FileFormat,
+        compression: Optional[str], encoding: str) -> Blob:
+    """
+    Renders pages of raw Binance klines and encodes the file,
+    unless its format already compressed it
+    """
+    data = render_klines(result, file_format, compression)
+    if file_format != FileFormat.CSV and compression is not None:
+        encoding = IDENTITY
+    return encode_blob(data, encoding)
+
+
+async def iter_decoded(chunks: AsyncIterator[bytes], encoding: str) -> AsyncIterator[bytes]:
+    """Decompresses a stream of encoded chunks"""
+    if encoding == IDENTITY:
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    if encoding == GZIP:
+        decoder = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    else:
+        decoder = zstandard.ZstdDecompressor().decompressobj()
+    async for chunk in chunks:
+        decoded = decoder.decompress(chunk)
+        if decoded:
+            yield decoded
+    tail = decoder.flush()
+    if tail:
+        yield tail
@@ -0,0 +1,22 @@
+from typing import AsyncIterator
+from config import EXPORT_FETCH_SIZE
+from .frames import render_csv
+from .pool import ExportPool
+
+
+async def iter_csv(
+        rows: AsyncIterator, flush_rows: int = EXPORT_FETCH_SIZE
+) -> AsyncIterator[bytes]:
+    """
+    Renders (open_time, open, high, low, close, volume) rows as CSV,
+    yielding encoded chunks of at most flush_rows lines rendered
+    in the export pool
+    """
+    batch, header = [], True
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= flush_rows:
+            yield await ExportPool.run(render_csv, batch, header)
+            batch, header = [], False
+
+    yield await ExportPool.run(render_csv, batch, header)
@@ -0,0 +1,2 @@
+from .compute import INDICATORS, Indicator, make_indicator, to_candles
+from .cache import IndicatorCache, indicator_cache
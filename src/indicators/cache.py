@@ -0,0 +1,150 @@
+import asyncio
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Optional
+import numpy as np
+from config import INDICATOR_CACHE_SIZE
+from .compute import Candles, Indicator, to_candles, slice_candles
+
+
+class IndicatorEntry:
+    """
+    Indicator values computed over the closed candles of one series:
+    Attributes:
+        - open_times: open time of every closed candle
+        - values: output name -> value per closed candle
+        - state: what the indicator needs to continue after the last one
+        - origin: open time the candles were loaded from, None for the
+          whole series
+    """
+
+    def __init__(self, indicator: Indicator, origin: Optional[datetime] = None):
+        self.origin = origin
+        self.open_times = np.empty(0, dtype='datetime64[ms]')
+        self.values = {output: np.empty(0) for output in indicator.outputs}
+        self.state: Any = None
+
+    @property
+    def last_open_time(self) -> Optional[datetime]:
+        if not len(self.open_times):
+            return None
+        return self.open_times[-1].astype(datetime)
+
+    def append(self, open_times: np.ndarray, values: dict[str, np.ndarray]):
+        self.open_times = np.concatenate((self.open_times, open_times))
+        for output, series in values.items():
+            self.values[output] = np.concatenate((self.values[output], series))
+
+
+class IndicatorCache:
+    """
+    LRU cache of indicator series keyed by (symbol, interval, indicator, params):
+    Attributes:
+        - max_entries: series kept before the least recently used is dropped
+        - hits, extends, misses, invalidations: counters
+    Only closed candles are committed to an entry, so a lookup loads
+    the candles stored after its last one and extends it, while the
+    still open candle is recomputed on every lookup. An entry starts at
+    the since of the lookup that created it and is rebuilt for a lookup
+    reaching further back.
+    """
+
+    def __init__(self, max_entries: int = INDICATOR_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries: OrderedDict[tuple, IndicatorEntry] = OrderedDict()
+        self.locks: dict[tuple, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self.versions: dict[tuple[str, str], int] = defaultdict(int)
+        self.hits = self.extends = self.misses = self.invalidations = 0
+
+    async def get(
+            self, symbol: str, interval: str, indicator: Indicator,
+            load: Callable[[Optional[datetime]], Awaitable[list[tuple]]],
+            closed_before: datetime,
+            since: Optional[datetime] = None) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+        """
+        Returns (open_times, values) of the indicator over the candles opened
+        at or after since, or earlier ones when cached, the whole series when
+        None. load(after) must return the candle rows opened at or after after
+        """
+        key = (symbol, interval, indicator.name, indicator.params)
+        async with self.locks[key]:
+            version = self.versions[symbol, interval]
+            entry = self.entries.get(key)
+            if entry is not None and entry.origin is not None and (
+                    since is None or since < entry.origin):
+                entry = None
+            if entry is None:
+                self.misses += 1
+                entry = IndicatorEntry(indicator, since)
+            after = entry.last_open_time
+
+            candles = to_candles(await load(entry.origin if after is None else after))
+            if after is not None:
+                candles = slice_candles(
+                    candles, candles['open_time'] > entry.open_times[-1]
+                )
+            closed = candles['open_time'] < np.datetime64(closed_before, 'ms')
+
+            if closed.any():
+                values, entry.state = indicator.extend(
+                    slice_candles(candles, closed), entry.state
+                )
+                entry.append(candles['open_time'][closed], values)
+                if after is not None:
+                    self.extends += 1
+            elif after is not None:
+                self.hits += 1
+
+            if version == self.versions[symbol, interval]:
+                self._store(key, entry)
+            return self._with_open(entry, indicator, slice_candles(candles, ~closed))
+
+    @staticmethod
+    def _with_open(
+            entry: IndicatorEntry, indicator: Indicator,
+            candles: Candles) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+        if not len(candles['open_time']):
+            return entry.open_times, entry.values
+        values, _ = indicator.extend(candles, entry.state)
+        return (
+            np.concatenate((entry.open_times, candles['open_time'])),
+            {
+                output: np.concatenate((entry.values[output], values[output]))
+                for output in indicator.outputs
+            }
+        )
+
+    def _store(self, key: tuple, entry: IndicatorEntry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            evicted, _ = self.entries.popitem(last=False)
+            if not self.locks[evicted].locked():
+                del self.locks[evicted]
+
+    def invalidate(self, symbol: str, interval: str, since: datetime):
+        """Drops the series of symbol and interval whose committed candles were rewritten"""
+        self.versions[symbol, interval] += 1
+        for key in [
+            key for key, entry in self.entries.items()
+            if key[:2] == (symbol, interval)
+            and entry.last_open_time is not None
+            and entry.last_open_time >= since
+        ]:
+            del self.entries[key]
+            self.invalidations += 1
+
+    def stats(self) -> dict[str, Any]:
+        """Returns the cache counters"""
+        lookups = self.hits + self.extends + self.misses
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'extends': self.extends,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_rate': (self.hits + self.extends) / lookups if lookups else 0.0
+        }
+
+
+indicator_cache = IndicatorCache()
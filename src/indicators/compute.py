@@ -0,0 +1,229 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Any, Optional
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+CANDLE_COLUMNS = ['open_time', 'open', 'high', 'low', 'close', 'volume']
+
+# periods of candles exponential indicators are warmed up with, the
+# weight left to older candles is below e^-10
+EXPONENTIAL_WARMUP_PERIODS = 10
+
+# candle arrays: open_time as datetime64[ms], prices and volume as float64
+Candles = dict[str, np.ndarray]
+
+
+def to_candles(rows: list[tuple]) -> Candles:
+    """Packs (open_time, open, high, low, close, volume) rows into arrays"""
+    df = pd.DataFrame(rows, columns=CANDLE_COLUMNS)
+    candles = {
+        column: df[column].to_numpy(dtype=float)
+        for column in CANDLE_COLUMNS[1:]
+    }
+    candles['open_time'] = df['open_time'].to_numpy(dtype='datetime64[ms]')
+    return candles
+
+
+def slice_candles(candles: Candles, mask: np.ndarray) -> Candles:
+    """Returns the candles selected by a boolean mask"""
+    return {column: values[mask] for column, values in candles.items()}
+
+
+def pad(values: np.ndarray, size: int) -> np.ndarray:
+    """Left pads values with NaN up to size"""
+    out = np.full(size, np.nan)
+    if len(values):
+        out[size - len(values):] = values
+    return out
+
+
+def windows(state: Optional[np.ndarray], closes: np.ndarray, period: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the period long windows ending at every close that has one,
+    and the last period - 1 closes the next call continues from
+    """
+    if state is not None:
+        closes = np.concatenate((state, closes))
+    tail = closes[len(closes) - period + 1:]
+    if len(closes) < period:
+        return np.empty((0, period)), tail
+    return sliding_window_view(closes, period), tail
+
+
+def ewm(values: np.ndarray, alpha: float, seed: Optional[float]) -> np.ndarray:
+    """Exponential moving average continuing from seed, if any"""
+    if seed is not None:
+        values = np.concatenate(([seed], values))
+    out = pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return out if seed is None else out[1:]
+
+
+class Indicator(ABC):
+    """
+    Indicator computed over candle arrays:
+    Attributes:
+        - name: query name of the indicator
+        - outputs: names of the value series it produces
+        - params: normalized parameters, part of the cache key
+        - warmup: candles before the first wanted value it needs
+    extend continues the computation from the state returned by the
+    previous call, so only new candles are processed.
+    """
+
+    name = ''
+    outputs: tuple[str, ...] = ('value',)
+
+    def __init__(self, period: int):
+        self.period = period
+
+    @property
+    def params(self) -> tuple:
+        return (self.period,)
+
+    @property
+    def warmup(self) -> int:
+        return self.period
+
+    def warmup_start(self, first: datetime, step: timedelta) -> datetime:
+        """Returns the open time candles are loaded from to compute the values from first on"""
+        return first - self.warmup * step
+
+    @abstractmethod
+    def extend(self, candles: Candles, state: Any) -> tuple[dict[str, np.ndarray], Any]:
+        ...
+
+
+class SMA(Indicator):
+    """Simple moving average of the close, state is the last period - 1 closes"""
+
+    name = 'sma'
+
+    def extend(self, candles, state):
+        window, tail = windows(state, candles['close'], self.period)
+        return {'value': pad(window.mean(axis=1), len(candles['close']))}, tail
+
+
+class Bollinger(Indicator):
+    """Bollinger bands, k population standard deviations around the SMA"""
+
+    name = 'bollinger'
+    outputs = ('middle', 'upper', 'lower')
+
+    def __init__(self, period: int, k: float):
+        super().__init__(period)
+        self.k = k
+
+    @property
+    def params(self) -> tuple:
+        return self.period, self.k
+
+    def extend(self, candles, state):
+        window, tail = windows(state, candles['close'], self.period)
+        size = len(candles['close'])
+        middle = pad(window.mean(axis=1), size)
+        band = self.k * pad(window.std(axis=1), size)
+        return {'middle': middle, 'upper': middle + band, 'lower': middle - band}, tail
+
+
+class EMA(Indicator):
+    """Exponential moving average of the close, state is (last ema, candles seen)"""
+
+    name = 'ema'
+
+    @property
+    def warmup(self) -> int:
+        return EXPONENTIAL_WARMUP_PERIODS * self.period
+
+    def extend(self, candles, state):
+        last, seen = state or (None, 0)
+        closes = candles['close']
+        values = ewm(closes, 2 / (self.period + 1), last)
+        warmup = seen + np.arange(1, len(closes) + 1) < self.period
+        state = (values[-1], seen + len(closes)) if len(closes) else state
+        return {'value': np.where(warmup, np.nan, values)}, state
+
+
+class RSI(Indicator):
+    """
+    Wilder's relative strength index of the close,
+    state is (last close, average gain, average loss, changes seen)
+    """
+
+    name = 'rsi'
+
+    @property
+    def warmup(self) -> int:
+        return EXPONENTIAL_WARMUP_PERIODS * self.period
+
+    def extend(self, candles, state):
+        closes = candles['close']
+        if not len(closes):
+            return {'value': closes}, state
+        if state is None:
+            prev, gain, loss, seen = closes[0], None, None, -1
+        else:
+            prev, gain, loss, seen = state
+
+        changes = np.diff(np.concatenate(([prev], closes)))
+        gains = ewm(np.clip(changes, 0, None), 1 / self.period, gain)
+        losses = ewm(np.clip(-changes, 0, None), 1 / self.period, loss)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = np.where(losses == 0, 100.0, 100 - 100 / (1 + gains / losses))
+
+        # the first candle has no change, the next period ones warm up
+        warmup = seen + np.arange(1, len(closes) + 1) < self.period
+        state = (closes[-1], gains[-1], losses[-1], seen + len(closes))
+        return {'value': np.where(warmup, np.nan, values)}, state
+
+
+class VWAP(Indicator):
+    """
+    Volume weighted average typical price anchored to the UTC day,
+    state is (day, cumulative price * volume, cumulative volume)
+    """
+
+    name = 'vwap'
+
+    def __init__(self):
+        super().__init__(0)
+
+    @property
+    def params(self) -> tuple:
+        return ()
+
+    def warmup_start(self, first: datetime, step: timedelta) -> datetime:
+        return datetime(first.year, first.month, first.day)
+
+    def extend(self, candles, state):
+        if not len(candles['close']):
+            return {'value': candles['close']}, state
+        days = candles['open_time'].astype('datetime64[D]')
+        typical = (candles['high'] + candles['low'] + candles['close']) / 3
+        frame = pd.DataFrame({
+            'day': days, 'pv': typical * candles['volume'], 'v': candles['volume']
+        })
+        sums = frame.groupby('day')[['pv', 'v']].cumsum()
+        pv, v = sums['pv'].to_numpy(), sums['v'].to_numpy()
+        if state is not None:
+            same_day = days == state[0]
+            pv, v = pv + same_day * state[1], v + same_day * state[2]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = np.where(v > 0, pv / v, np.nan)
+        return {'value': values}, (days[-1], pv[-1], v[-1])
+
+
+INDICATORS = {
+    indicator.name: indicator for indicator in (SMA, EMA, RSI, VWAP, Bollinger)
+}
+
+
+def make_indicator(name: str, period: int, k: float) -> Indicator:
+    """Returns the named indicator with the parameters it takes"""
+    if name == VWAP.name:
+        return VWAP()
+    if name == Bollinger.name:
+        return Bollinger(period, k)
+    return INDICATORS[name](period)
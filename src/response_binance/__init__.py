@@ -1 +1,10 @@
-from .response import BinanceAPI
\ No newline at end of file
+from .response import BinanceAPI, ticker_cache
+from .client import BinanceClient
+from .backfill import Backfill
+from .rollup import is_rolled_up
+from .intervals import (is_supported_interval, can_resample, bucket_params,
+                        closed_before, interval_length)
+from .stream import KlineStreamIngester
+from .prices import PriceHub, PriceSubscription, price_hub
+from .limiter import weight_limiter, RateLimitExceeded
+from .jobs import JobWorker, CREATE_DATA, GENERATE_FILE, BACKFILL
\ No newline at end of file
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from config import BACKFILL_CONCURRENCY
+from database import async_session_maker, BinanceData
+from .response import BinanceAPI, KLINES_PAGE_LIMIT, to_ms, from_ms
+from .limiter import background
+from .intervals import INTERVAL_MS, MONTH_INTERVAL, interval_origin_ms
+
+
+def expected_open_times(interval: str, start: datetime, end: datetime) -> np.ndarray:
+    """Returns every open time in ms of the interval within [start, end)"""
+    if interval == MONTH_INTERVAL:
+        months = pd.date_range(start, end, freq='MS', inclusive='left')
+        return months.asi8 // 1_000_000
+
+    step = INTERVAL_MS[interval]
+    origin = interval_origin_ms(interval)
+    first = origin + -(-(to_ms(start) - origin) // step) * step
+    return np.arange(first, to_ms(end), step, dtype=np.int64)
+
+
+def find_gap_pages(
+        expected: np.ndarray, stored: np.ndarray,
+        limit: int = KLINES_PAGE_LIMIT) -> list[tuple[int, int]]:
+    """
+    Groups the expected open times missing from stored into contiguous
+    runs and splits them into (first, last) ms pages of at most limit candles
+    """
+    missing = np.flatnonzero(~np.isin(expected, stored))
+    if not missing.size:
+        return []
+
+    breaks = np.flatnonzero(np.diff(missing) != 1) + 1
+    pages = []
+    for run in np.split(missing, breaks):
+        for first in range(0, run.size, limit):
+            chunk = run[first:first + limit]
+            pages.append((int(expected[chunk[0]]), int(expected[chunk[-1]])))
+    return pages
+
+
+class Backfill:
+    """
+    Historical backfill for a symbol and interval:
+    fetches only the open time gaps missing from binance_data,
+    page by page, with at most BACKFILL_CONCURRENCY pages in flight
+    """
+
+    @classmethod
+    async def find_pages(
+            cls, symbol: str, interval: str,
+            start: datetime, end: datetime) -> list[tuple[int, int]]:
+        """Returns the (first, last) ms pages missing from the database"""
+        async with async_session_maker() as session:
+            stored = await BinanceData.get_open_times(
+                session, symbol, interval, start, end
+            )
+        stored_ms = np.array([to_ms(value) for value in stored], dtype=np.int64)
+        return find_gap_pages(
+            expected_open_times(interval, start, end), stored_ms
+        )
+
+    @classmethod
+    async def fetch_page(
+            cls, symbol: str, interval: str,
+            page: tuple[int, int], semaphore: asyncio.Semaphore) -> int:
+        """Fetches one page of klines and upserts it"""
+        async with semaphore:
+            klines = await BinanceAPI.get_klines_page(
+                symbol, interval, page[0], page[1]
+            )
+        return await BinanceAPI.upsert_klines(symbol, interval, klines)
+
+    @classmethod
+    @background
+    async def run(
+            cls, symbol: str, interval: str, start: datetime,
+            end: datetime, concurrency: int = BACKFILL_CONCURRENCY) -> int:
+        """
+        Backfills [start, end) and returns the number of rows written.
+        Every page is attempted, the first page error is raised once the
+        others are stored, a retry only fetches the pages still missing.
+        """
+        pages = await cls.find_pages(symbol, interval, start, end)
+        logging.info(
+            f'Backfill {symbol} {interval}: {len(pages)} pages missing '
+            f'between {start} and {end}'
+        )
+
+        semaphore = asyncio.Semaphore(concurrency)
+        results = await asyncio.gather(*[
+            cls.fetch_page(symbol, interval, page, semaphore)
+            for page in pages
+        ], return_exceptions=True)
+
+        written, errors = 0, []
+        for page, result in zip(pages, results):
+            if isinstance(result, BaseException):
+                logging.error(
+                    f'Backfill {symbol} {interval}: page {from_ms(page[0])} '
+                    f'to {from_ms(page[1])} failed: {result!r}'
+                )
+                errors.append(result)
+            else:
+                written += result
+
+        logging.info(
+            f'Backfill {symbol} {interval}: {written} rows written, '
+            f'{len(pages) - len(errors)} of {len(pages)} pages stored'
+        )
+        if errors:
+            raise errors[0]
+        return written
+
@@ -0,0 +1,74 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional, AsyncIterator
+import aiohttp
+from binance import AsyncClient
+from config import (API_KEY, API_SECRET, BINANCE_POOL_SIZE,
+                    BINANCE_KEEPALIVE_TIMEOUT, BINANCE_MAX_CONCURRENCY)
+
+
+class BinanceClient:
+    """
+    Long-lived Binance client shared by every request:
+    Attributes:
+        - client: the AsyncClient opened in the app lifespan
+        - semaphore: bounds the number of concurrent upstream calls
+    """
+
+    client: Optional[AsyncClient] = None
+    semaphore: Optional[asyncio.Semaphore] = None
+
+    @classmethod
+    async def start(cls) -> Optional[AsyncClient]:
+        """
+        Opens the shared client with a keep-alive connection pool,
+        the concurrency limit also holds for the short-lived clients
+        used when it fails to open
+        """
+        cls.semaphore = asyncio.Semaphore(BINANCE_MAX_CONCURRENCY)
+        connector = aiohttp.TCPConnector(
+            limit=BINANCE_POOL_SIZE,
+            keepalive_timeout=BINANCE_KEEPALIVE_TIMEOUT
+        )
+        try:
+            cls.client = await AsyncClient.create(
+                API_KEY, API_SECRET,
+                session_params={'connector': connector}
+            )
+        except Exception as err:
+            logging.error(f'Binance client start failed: {err}')
+            await connector.close()
+            cls.client = None
+            return None
+
+        logging.info('Binance client started')
+        return cls.client
+
+    @classmethod
+    async def close(cls):
+        """Closes the shared client and its connection pool"""
+        client, cls.client, cls.semaphore = cls.client, None, None
+        if client is not None:
+            await client.close_connection()
+            logging.info('Binance client closed')
+
+    @classmethod
+    @asynccontextmanager
+    async def connection(cls) -> AsyncIterator[AsyncClient]:
+        """
+        Yields the shared client, or a short-lived one when the app
+        lifespan has not started it, within the concurrency limit
+        """
+        if cls.semaphore is None:
+            cls.semaphore = asyncio.Semaphore(BINANCE_MAX_CONCURRENCY)
+        async with cls.semaphore:
+            if cls.client is not None:
+                yield cls.client
+                return
+
+            client = await AsyncClient.create(API_KEY, API_SECRET)
+            try:
+                yield client
+            finally:
+                await client.close_connection()
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+MINUTE_MS = 60 * 1000
+
+# fixed interval lengths and the origin Binance aligns their open times to
+INTERVAL_MS = {
+    '1m': MINUTE_MS,
+    '3m': 3 * MINUTE_MS,
+    '5m': 5 * MINUTE_MS,
+    '15m': 15 * MINUTE_MS,
+    '30m': 30 * MINUTE_MS,
+    '1h': 60 * MINUTE_MS,
+    '2h': 2 * 60 * MINUTE_MS,
+    '4h': 4 * 60 * MINUTE_MS,
+    '6h': 6 * 60 * MINUTE_MS,
+    '8h': 8 * 60 * MINUTE_MS,
+    '12h': 12 * 60 * MINUTE_MS,
+    '1d': 24 * 60 * MINUTE_MS,
+    '3d': 3 * 24 * 60 * MINUTE_MS,
+    '1w': 7 * 24 * 60 * MINUTE_MS
+}
+WEEK_ORIGIN_MS = 4 * 24 * 60 * MINUTE_MS  # 1970-01-05, a Monday
+MONTH_INTERVAL = '1M'
+EPOCH = datetime(1970, 1, 1)
+
+
+def is_supported_interval(interval: str) -> bool:
+    """Returns True if open times can be enumerated for the interval"""
+    return interval in INTERVAL_MS or interval == MONTH_INTERVAL
+
+
+def interval_origin_ms(interval: str) -> int:
+    """Returns the epoch ms the open times of a fixed interval are aligned to"""
+    return WEEK_ORIGIN_MS if interval == '1w' else 0
+
+
+def can_resample(base: str, target: str) -> bool:
+    """Returns True if every target candle is made of whole base candles"""
+    if base not in INTERVAL_MS or not is_supported_interval(target):
+        return False
+    if target == MONTH_INTERVAL:
+        return INTERVAL_MS['1d'] % INTERVAL_MS[base] == 0
+    step = INTERVAL_MS[target]
+    return step > INTERVAL_MS[base] and step % INTERVAL_MS[base] == 0 and (
+        interval_origin_ms(target) % INTERVAL_MS[base] == 0
+    )
+
+
+def bucket_params(target: str) -> tuple[Optional[timedelta], datetime]:
+    """
+    Returns the (stride, origin) target candles are binned with,
+    stride is None for calendar months
+    """
+    if target == MONTH_INTERVAL:
+        return None, EPOCH
+    return (
+        timedelta(milliseconds=INTERVAL_MS[target]),
+        EPOCH + timedelta(milliseconds=interval_origin_ms(target))
+    )
+
+
+def bucket_bounds(target: str, first: datetime, last: datetime) -> tuple[datetime, datetime]:
+    """Returns [start, end) covering the target buckets of first and last"""
+    if target == MONTH_INTERVAL:
+        start = datetime(first.year, first.month, 1)
+        end = datetime(last.year + last.month // 12, last.month % 12 + 1, 1)
+        return start, end
+
+    stride, origin = bucket_params(target)
+    start = origin + (first - origin) // stride * stride
+    end = origin + ((last - origin) // stride + 1) * stride
+    return start, end
+
+
+def interval_length(interval: str) -> timedelta:
+    """Returns the length of a candle of the interval, the longest month for 1M"""
+    if interval == MONTH_INTERVAL:
+        return timedelta(days=31)
+    return timedelta(milliseconds=INTERVAL_MS[interval])
+
+
+def closed_before(interval: str, now: datetime) -> datetime:
+    """Returns the open time before which every candle of the interval is closed"""
+    if interval == MONTH_INTERVAL:
+        return datetime(now.year, now.month, 1)
+    return now - timedelta(milliseconds=INTERVAL_MS[interval])
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Optional
+from binance.exceptions import BinanceAPIException
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from config import (JOB_CONCURRENCY, JOB_POLL_INTERVAL, JOB_RETRY_BASE,
+                    JOB_LOCK_TIMEOUT)
+from database import async_session_maker, Job
+from export import FileFormat
+from .response import BinanceAPI, to_ms, from_ms
+from .backfill import Backfill
+from .limiter import RateLimitExceeded, BAN_STATUSES
+
+CREATE_DATA = 'create_data'
+GENERATE_FILE = 'generate_file'
+BACKFILL = 'backfill'
+
+
+def param_time(value: str) -> datetime:
+    """Parses an isoformat job param as naive UTC, jobs queued earlier may hold offsets"""
+    return from_ms(to_ms(datetime.fromisoformat(value)))
+
+
+JobHandler = Callable[[str, str, dict[str, Any]], Awaitable[Any]]
+
+JOB_HANDLERS: dict[str, JobHandler] = {
+    CREATE_DATA: lambda symbol, interval, params: BinanceAPI.create_data_in_db(
+        symbol, interval, params.get('incremental', True)
+    ),
+    GENERATE_FILE: lambda symbol, interval, params:
+        BinanceAPI.write_file_and_save_to_db(
+            symbol, interval, FileFormat(params.get('format', FileFormat.CSV)),
+            params.get('compression')
+        ),
+    BACKFILL: lambda symbol, interval, params: Backfill.run(
+        symbol, interval, param_time(params['start']),
+        param_time(params['end']) if params.get('end')
+        else datetime.utcnow()
+    )
+}
+
+
+def retry_delay(err: Exception, attempts: int, base: float) -> Optional[float]:
+    """
+    Returns the seconds to wait before the next attempt, a jittered
+    exponential backoff, or None when the error will not go away
+    """
+    if isinstance(err, BinanceAPIException) and err.status_code < 500 \
+            and err.status_code not in BAN_STATUSES:
+        return None
+    delay = base * 2 ** (attempts - 1) * random.uniform(0.5, 1)
+    if isinstance(err, RateLimitExceeded):
+        delay = max(delay, err.retry_after)
+    return delay
+
+
+class JobWorker:
+    """
+    Runs queued jobs claimed from the job table:
+    Attributes:
+        - concurrency: jobs run at once by this worker
+        - poll_interval: seconds between claims while the queue is empty
+        - retry_base: backoff of the first retry, doubled on every attempt
+        - lock_timeout: seconds without a heartbeat after which
+          another worker may reclaim a running job
+        - handlers: job kind -> coroutine running it
+    A worker only claims the kinds it has handlers for. Rows are claimed
+    with SELECT ... FOR UPDATE SKIP LOCKED, so any number of workers in
+    any number of processes share one queue.
+    """
+
+    def __init__(
+            self, concurrency: int = JOB_CONCURRENCY,
+            poll_interval: float = JOB_POLL_INTERVAL,
+            retry_base: float = JOB_RETRY_BASE,
+            lock_timeout: float = JOB_LOCK_TIMEOUT,
+            handlers: Optional[dict[str, JobHandler]] = None,
+            session_maker: async_sessionmaker = async_session_maker):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.retry_base = retry_base
+        self.lock_timeout = lock_timeout
+        self.handlers = handlers or JOB_HANDLERS
+        self.session_maker = session_maker
+        self.running: dict[int, asyncio.Task] = {}
+        self.stopped = asyncio.Event()
+
+    def stop(self):
+        """Asks the worker to finish its running jobs and return"""
+        self.stopped.set()
+
+    async def claim(self) -> list:
+        """Claims as many due jobs as there are free slots"""
+        free = self.concurrency - len(self.running)
+        if free <= 0:
+            return []
+        async with self.session_maker() as session:
+            return await Job.claim(
+                session, list(self.handlers), free,
+                timedelta(seconds=self.lock_timeout)
+            )
+
+    async def execute(self, job: Any):
+        """Runs one claimed job and records its outcome"""
+        try:
+            await self.handlers[job.kind](job.symbol, job.interval, job.params)
+        except Exception as err:
+            delay = None
+            if job.attempts < job.max_attempts:
+                delay = retry_delay(err, job.attempts, self.retry_base)
+            logging.error(
+                f'Job {job.id} {job.kind} {job.symbol} {job.interval} '
+                f'failed on attempt {job.attempts}: {err}'
+            )
+            async with self.session_maker() as session:
+                pending_id = await Job.fail(
+                    session, job.id, str(err),
+                    None if delay is None else timedelta(seconds=delay)
+                )
+            if pending_id is not None:
+                logging.info(f'Job {job.id} superseded by pending job {pending_id}')
+            return
+
+        async with self.session_maker() as session:
+            await Job.complete(session, job.id)
+        logging.info(f'Job {job.id} {job.kind} {job.symbol} {job.interval} done')
+
+    async def heartbeat(self):
+        """Refreshes the lock of the running jobs until stopped"""
+        while not self.stopped.is_set():
+            await self.wait(self.lock_timeout / 3)
+            if not self.running:
+                continue
+            try:
+                async with self.session_maker() as session:
+                    await Job.heartbeat(session, list(self.running))
+            except Exception as err:
+                logging.error(f'Job heartbeat failed: {err}')
+
+    async def wait(self, timeout: float):
+        """Sleeps for timeout or until stopped"""
+        try:
+            await asyncio.wait_for(self.stopped.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def spawn(self, job: Any):
+        """Runs a claimed job in the background"""
+        task = asyncio.create_task(self.execute(job))
+        self.running[job.id] = task
+        task.add_done_callback(lambda _: self.running.pop(job.id, None))
+
+    async def run(self):
+        """Claims and runs jobs until stopped"""
+        heartbeat = asyncio.create_task(self.heartbeat())
+        try:
+            while not self.stopped.is_set():
+                try:
+                    jobs = await self.claim()
+                except Exception as err:
+                    logging.error(f'Job claim failed: {err}')
+                    jobs = []
+                for job in jobs:
+                    self.spawn(job)
+                if len(self.running) >= self.concurrency:
+                    await asyncio.wait(
+                        list(self.running.values()), timeout=self.poll_interval,
+                        return_when=asyncio.FIRST_COMPLETED
+                    )
+                elif not jobs:
+                    await self.wait(self.poll_interval)
+        finally:
+            if self.running:
+                await asyncio.gather(*self.running.values(), return_exceptions=True)
+            heartbeat.cancel()
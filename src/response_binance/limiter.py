@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from functools import wraps
+from typing import Any, Optional, Iterator
+from binance.exceptions import BinanceAPIException
+from config import (BINANCE_WEIGHT_LIMIT, BINANCE_WEIGHT_RESERVE,
+                    INTERACTIVE_MAX_WAIT, BACKGROUND_MAX_WAIT)
+
+USED_WEIGHT_HEADER = 'x-mbx-used-weight-1m'
+BAN_STATUSES = (418, 429)
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+request_priority: ContextVar[Priority] = ContextVar(
+    'request_priority', default=Priority.INTERACTIVE
+)
+
+
+@contextmanager
+def priority(value: Priority) -> Iterator[None]:
+    """Runs the Binance calls made inside the block with the given priority"""
+    token = request_priority.set(value)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+
+def background(func):
+    """Runs the Binance calls of an async function with background priority"""
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        with priority(Priority.BACKGROUND):
+            return await func(*args, **kwargs)
+    return wrapper
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call would wait longer than its priority allows"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f'Binance request weight exhausted, retry in {retry_after:.1f}s')
+        self.retry_after = retry_after
+
+
+class WeightLimiter:
+    """
+    Shared Binance request-weight budget:
+    Attributes:
+        - limit: request weight allowed per minute
+        - reserve: share of the budget only interactive calls may spend
+        - tokens: token bucket refilled at limit per minute and
+          corrected down from the used-weight response header
+        - used_weight: last used weight reported by Binance
+        - banned_until: monotonic time before which nothing is sent
+    Background calls queue while only the reserve is left and are shed
+    past their max wait, interactive calls only wait out an empty bucket.
+    """
+
+    def __init__(
+            self, limit: int = BINANCE_WEIGHT_LIMIT,
+            reserve: float = BINANCE_WEIGHT_RESERVE,
+            interactive_max_wait: float = INTERACTIVE_MAX_WAIT,
+            background_max_wait: float = BACKGROUND_MAX_WAIT):
+        self.limit = limit
+        self.reserve = reserve
+        self.max_wait = {
+            Priority.INTERACTIVE: interactive_max_wait,
+            Priority.BACKGROUND: background_max_wait
+        }
+        self.tokens = float(limit)
+        self.used_weight = 0
+        self.updated_at = time.monotonic()
+        self.banned_until = 0.0
+        self.strikes = 0
+        self.waited = self.shed = self.bans = 0
+
+    @property
+    def rate(self) -> float:
+        """Returns the weight refilled per second"""
+        return self.limit / 60
+
+    def _refill(self, now: float):
+        self.tokens = min(
+            self.limit, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    def _delay(self, weight: int, value: Priority, now: float) -> float:
+        if now < self.banned_until:
+            return self.banned_until - now
+        floor = self.limit * self.reserve if value is Priority.BACKGROUND else 0
+        missing = weight + floor - self.tokens
+        return missing / self.rate if missing > 0 else 0
+
+    async def acquire(self, weight: int, value: Optional[Priority] = None):
+        """Waits until weight can be spent, or raises RateLimitExceeded"""
+        value = request_priority.get() if value is None else value
+        deadline = time.monotonic() + self.max_wait[value]
+        while True:
+            now = time.monotonic()
+            self._refill(now)
+            delay = self._delay(weight, value, now)
+            if delay <= 0:
+                self.tokens -= weight
+                return
+            if now + delay > deadline:
+                self.shed += 1
+                raise RateLimitExceeded(delay)
+
+            self.waited += 1
+            await asyncio.sleep(delay * random.uniform(1, 1.2))
+
+    def update(self, response: Any):
+        """Syncs the budget with the used weight of a successful response"""
+        headers = getattr(response, 'headers', None) or {}
+        used = headers.get(USED_WEIGHT_HEADER)
+        if used is None:
+            return
+        self.used_weight = int(used)
+        self._refill(time.monotonic())
+        self.tokens = min(self.tokens, self.limit - self.used_weight)
+        self.strikes = 0
+
+    def on_error(self, err: BinanceAPIException):
+        """Stops every call after a 429 or 418 for Retry-After or a jittered backoff"""
+        if err.status_code not in BAN_STATUSES:
+            return
+        headers = getattr(err.response, 'headers', None) or {}
+        retry_after = headers.get('Retry-After')
+        self.strikes += 1
+        wait = float(retry_after) if retry_after else min(2 ** self.strikes, 300)
+        self.banned_until = time.monotonic() + wait * random.uniform(1, 1.2)
+        self.tokens = 0
+        self.bans += 1
+        logging.error(f'Binance returned {err.status_code}, pausing for {wait}s')
+
+    def stats(self) -> dict[str, Any]:
+        """Returns the current weight usage"""
+        now = time.monotonic()
+        self._refill(now)
+        return {
+            'limit': self.limit,
+            'used_weight': self.used_weight,
+            'available': round(self.tokens, 1),
+            'banned_for': round(max(self.banned_until - now, 0), 1),
+            'waited': self.waited,
+            'shed': self.shed,
+            'bans': self.bans
+        }
+
+
+weight_limiter = WeightLimiter()
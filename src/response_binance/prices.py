@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import random
+from typing import Any, Awaitable, Callable, Optional, Iterable
+from binance import AsyncClient, BinanceSocketManager
+from config import (STREAM_MAX_RECONNECT_WAIT, PRICE_MAX_SYMBOLS,
+                    PRICE_HEARTBEAT_INTERVAL, PRICE_MAX_STREAMS,
+                    PRICE_SYMBOLS_TTL)
+from cache import TTLCache
+from .response import BinanceAPI, ticker_cache
+
+TRADING_SYMBOLS_KEY = 'symbols'
+
+
+def symbol_set(symbols: Any) -> set[str]:
+    """Returns the upper-cased symbols of a list of strings, rejecting other payloads"""
+    if not isinstance(symbols, (list, tuple, set)) or not all(
+            isinstance(symbol, str) and symbol for symbol in symbols):
+        raise ValueError('Symbols must be a list of strings')
+    return {symbol.upper() for symbol in symbols}
+
+
+class PriceSubscription:
+    """
+    One client's view of the price streams:
+    Attributes:
+        - symbols: the symbols subscribed to
+        - latest: the newest unsent update per symbol
+        - dropped: updates overwritten before the client read them
+    Updates never queue up, a slow client only gets the latest price
+    of each symbol when it reads again.
+    """
+
+    def __init__(self):
+        self.symbols: set[str] = set()
+        self.latest: dict[str, dict[str, Any]] = {}
+        self.dropped = 0
+        self.ready = asyncio.Event()
+
+    def publish(self, update: dict[str, Any]):
+        """Replaces the pending update of the symbol, never blocks"""
+        if update['symbol'] in self.latest:
+            self.dropped += 1
+        self.latest[update['symbol']] = update
+        self.ready.set()
+
+    async def get(self) -> list[dict[str, Any]]:
+        """Waits for and returns the pending updates"""
+        await self.ready.wait()
+        updates, self.latest = list(self.latest.values()), {}
+        self.ready.clear()
+        return updates
+
+
+class PriceHub:
+    """
+    Fans out Binance mini ticker streams to subscribed clients:
+    Attributes:
+        - stream_url: websocket base url, Binance when None
+        - max_symbols: symbols a single client may subscribe to
+        - max_streams: upstream streams open at once across every client
+        - heartbeat_interval: seconds an idle client waits for a keep-alive
+        - load_symbols: returns the symbols trading on the exchange,
+          only those can be subscribed to
+        - subscribers: the subscriptions of every streamed symbol
+        - tasks: the one upstream stream task per symbol
+    An upstream stream is opened with the first subscriber of a symbol
+    and closed with the last one. Streamed prices also refresh ticker_cache.
+    """
+
+    def __init__(
+            self, stream_url: Optional[str] = None,
+            max_symbols: int = PRICE_MAX_SYMBOLS,
+            max_streams: int = PRICE_MAX_STREAMS,
+            heartbeat_interval: float = PRICE_HEARTBEAT_INTERVAL,
+            load_symbols: Optional[Callable[[], Awaitable[set[str]]]] = None):
+        self.stream_url = stream_url
+        self.max_symbols = max_symbols
+        self.max_streams = max_streams
+        self.heartbeat_interval = heartbeat_interval
+        self.load_symbols = load_symbols or BinanceAPI.get_trading_symbols
+        self.trading_symbols = TTLCache(PRICE_SYMBOLS_TTL)
+        self.subscribers: dict[str, set[PriceSubscription]] = {}
+        self.tasks: dict[str, asyncio.Task] = {}
+        self.client: Optional[AsyncClient] = None
+
+    async def subscribe(self, subscription: PriceSubscription, symbols: Iterable[str]):
+        """
+        Adds symbols to a subscription, starting their upstream streams.
+        Raises ValueError for symbols not trading on the exchange or past
+        the subscription and upstream stream limits.
+        """
+        symbols = symbol_set(symbols) - subscription.symbols
+        if len(subscription.symbols) + len(symbols) > self.max_symbols:
+            raise ValueError(f'At most {self.max_symbols} symbols per subscription')
+        if not symbols:
+            return
+
+        try:
+            trading = await self.trading_symbols.get(TRADING_SYMBOLS_KEY, self.load_symbols)
+        except Exception as err:
+            logging.error(f'Exchange symbols request failed: {err!r}')
+            raise ValueError('Symbols cannot be checked, retry later')
+        unknown = symbols - trading
+        if unknown:
+            raise ValueError(f'Unknown symbols {", ".join(sorted(unknown))}')
+        # no await from here on, so the count cannot change under the check
+        opened = symbols - self.tasks.keys()
+        if len(self.tasks) + len(opened) > self.max_streams:
+            raise ValueError(f'At most {self.max_streams} symbols streamed at once')
+
+        for symbol in symbols:
+            subscription.symbols.add(symbol)
+            self.subscribers.setdefault(symbol, set()).add(subscription)
+            if symbol not in self.tasks:
+                self.tasks[symbol] = asyncio.create_task(self.stream(symbol))
+
+    def unsubscribe(self, subscription: PriceSubscription, symbols: Optional[Iterable[str]] = None):
+        """Removes symbols, all by default, stopping streams nobody reads anymore"""
+        symbols = subscription.symbols if symbols is None else symbol_set(symbols)
+        for symbol in symbols & subscription.symbols:
+            subscribers = self.subscribers.get(symbol, set())
+            subscribers.discard(subscription)
+            if not subscribers:
+                self.subscribers.pop(symbol, None)
+                task = self.tasks.pop(symbol, None)
+                if task is not None:
+                    task.cancel()
+            subscription.latest.pop(symbol, None)
+        subscription.symbols -= set(symbols)
+
+    def broadcast(self, message: dict[str, Any]):
+        """Publishes a mini ticker event to the subscribers of its symbol"""
+        data = message.get('data', message)
+        if data.get('e') == 'error':
+            raise ConnectionError(data.get('m'))
+        if data.get('e') != '24hrMiniTicker':
+            return
+
+        update = {'symbol': data['s'], 'price': data['c'], 'time': data['E']}
+        ticker_cache.put(data['s'], {'symbol': data['s'], 'price': data['c']})
+        for subscription in self.subscribers.get(data['s'], ()):
+            subscription.publish(update)
+
+    async def consume(self, symbol: str):
+        """Reads the mini ticker stream of a symbol until cancelled or disconnected"""
+        if self.client is None:
+            self.client = AsyncClient()
+        manager = BinanceSocketManager(self.client)
+        if self.stream_url is not None:
+            manager.STREAM_URL = self.stream_url
+
+        async with manager.symbol_miniticker_socket(symbol) as socket:
+            logging.info(f'Price stream opened for {symbol}')
+            while True:
+                self.broadcast(await socket.recv())
+
+    async def stream(self, symbol: str):
+        """Streams a symbol while it has subscribers, reconnecting with jittered backoff"""
+        attempt = 0
+        while True:
+            try:
+                await self.consume(symbol)
+                attempt = 0
+            except asyncio.CancelledError:
+                logging.info(f'Price stream closed for {symbol}')
+                raise
+            except Exception as err:
+                logging.error(f'Price stream for {symbol} failed: {err}')
+            attempt += 1
+            wait = min(2 ** attempt, STREAM_MAX_RECONNECT_WAIT)
+            await asyncio.sleep(wait * random.uniform(0.5, 1))
+
+    def stats(self) -> dict[str, Any]:
+        """Returns the streamed symbols with their subscriber counts"""
+        return {symbol: len(subscribers) for symbol, subscribers in self.subscribers.items()}
+
+    async def close(self):
+        """Stops every upstream stream"""
+        tasks, self.tasks = list(self.tasks.values()), {}
+        self.subscribers = {}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        client, self.client = self.client, None
+        if client is not None:
+            await client.close_connection()
+
+
+price_hub = PriceHub()
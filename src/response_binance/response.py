@@ -1,13 +1,42 @@
+import asyncio
 import logging
-import io
+import time
 from functools import wraps
-from datetime import datetime
-from typing import Optional, Any
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Optional, Any, AsyncIterator, Awaitable, Callable, Hashable
 from enum import Enum
 import pandas as pd
 from binance import AsyncClient
-from config import API_KEY, API_SECRET
+from binance.exceptions import BinanceAPIException
+from sqlalchemy.exc import IntegrityError
+from config import (INGEST_BATCH_SIZE, TICKER_CACHE_TTL, TICKER_CACHE_STALE_TTL,
+                    TICKER_ALL_THRESHOLD, BATCH_CONCURRENCY,
+                    CSV_STORAGE_ENCODING, CSV_RETENTION_DAYS)
 from database import async_session_maker, BinanceData, CSVData
+from cache import TTLCache
+from export import ExportPool, FileFormat, klines_to_frame, render_blob
+from .client import BinanceClient
+from .limiter import weight_limiter, background
+from .rollup import store_rows
+
+# the maximum number of klines Binance returns per request
+KLINES_PAGE_LIMIT = 1000
+
+ticker_cache = TTLCache(TICKER_CACHE_TTL, TICKER_CACHE_STALE_TTL)
+ALL_TICKERS_KEY = '*'
+
+
+def to_ms(value: datetime) -> int:
+    """Converts a naive UTC or an aware datetime to epoch milliseconds"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.astimezone(timezone.utc).timestamp() * 1000)
+
+
+def from_ms(value: int) -> datetime:
+    """Converts epoch milliseconds to a naive UTC datetime"""
+    return datetime.utcfromtimestamp(value / 1000)
 
 
 class Interval(Enum):
@@ -28,14 +57,44 @@ class Interval(Enum):
     INTERVAL_1MONTH = ('1M', AsyncClient.KLINE_INTERVAL_1MONTH)
 
 
-def with_connection_client(func):
-    @wraps(func)
-    async def wrapper(*args, **kwargs):
-        client = await AsyncClient.create(API_KEY, API_SECRET)
-        result = await func(*args, client, **kwargs)
-        await client.close_connection()
-        return result
-    return wrapper
+async def gather_bounded(
+        calls: dict[Hashable, Callable[[], Awaitable[Any]]],
+        limit: int = BATCH_CONCURRENCY) -> dict[Hashable, Any]:
+    """
+    Runs the calls with at most limit in flight and returns
+    key -> result, or key -> exception for the calls that failed
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def call(func: Callable[[], Awaitable[Any]]) -> Any:
+        async with semaphore:
+            return await func()
+
+    results = await asyncio.gather(
+        *[call(func) for func in calls.values()], return_exceptions=True
+    )
+    return dict(zip(calls, results))
+
+
+def with_connection_client(weight: int = 1):
+    """
+    Passes a Binance client to the decorated call once
+    the shared limiter allows spending its request weight
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            await weight_limiter.acquire(weight)
+            async with BinanceClient.connection() as client:
+                try:
+                    result = await func(*args, client, **kwargs)
+                except BinanceAPIException as err:
+                    weight_limiter.on_error(err)
+                    raise
+                weight_limiter.update(getattr(client, 'response', None))
+                return result
+        return wrapper
+    return decorator
 
 
 class BinanceAPI:
@@ -45,7 +104,7 @@ class BinanceAPI:
     """
 
     @classmethod
-    @with_connection_client
+    @with_connection_client(weight=20)
     async def get_account_balance(
             cls, asset: Optional[str], client: AsyncClient
     ) -> dict[str, Any]:
@@ -53,93 +112,192 @@ class BinanceAPI:
         return await client.get_asset_balance(asset=asset)
 
     @classmethod
-    @with_connection_client
+    @with_connection_client(weight=2)
     async def get_klines(
             cls, symbol: Optional[str], intervals: Optional[str],
             client: AsyncClient
     ):
         """Get information about a Symbol from the Binance API"""
-        result = [
-            await client.get_klines(symbol=symbol, interval=interval.value[1])
+        return await asyncio.gather(*[
+            client.get_klines(symbol=symbol, interval=interval.value[1])
             for interval in Interval if intervals == interval.value[0]
-        ]
+        ])
 
-        return result
+    @classmethod
+    @with_connection_client(weight=2)
+    async def get_klines_page(
+            cls, symbol: str, interval: str,
+            start_time: int, end_time: int, client: AsyncClient
+    ) -> list[list]:
+        """Returns up to KLINES_PAGE_LIMIT klines opened in [start_time, end_time] ms"""
+        return await client.get_klines(
+            symbol=symbol, interval=interval,
+            startTime=start_time, endTime=end_time,
+            limit=KLINES_PAGE_LIMIT
+        )
 
     @classmethod
-    @with_connection_client
+    @with_connection_client(weight=2)
     async def get_symbol_ticker(cls, symbol: str, client: AsyncClient) -> dict[str, Any]:
         """Returns current price about a symbol"""
         return await client.get_symbol_ticker(symbol=symbol)
 
     @classmethod
-    async def data_frame(cls, symbol: Optional[str], interval: Optional[str]) -> pd.DataFrame:
-        """Packing in data frame"""
-        result = await cls.get_klines(symbol, interval)
+    @with_connection_client(weight=4)
+    async def get_all_tickers(cls, client: AsyncClient) -> list[dict[str, Any]]:
+        """Returns current prices about every symbol"""
+        return await client.get_all_tickers()
+
+    @classmethod
+    @with_connection_client(weight=20)
+    async def get_trading_symbols(cls, client: AsyncClient) -> set[str]:
+        """Returns the symbols currently trading on the exchange"""
+        info = await client.get_exchange_info()
+        return {
+            symbol['symbol'] for symbol in info['symbols']
+            if symbol['status'] == 'TRADING'
+        }
 
-        df = pd.DataFrame(
-            *result,
-            columns=[
-                'Open time', 'Open', 'High', 'Low', 'Close', 'Volume',
-                'Close time', 'Quote asset volume',
-                'Number of trades', 'Taker buy base asset volume',
-                'Taker buy quote asset volume',
-                'Ignore'
-            ]
+    @classmethod
+    async def get_cached_symbol_ticker(cls, symbol: str) -> dict[str, Any]:
+        """Returns current price about a symbol through the ticker cache"""
+        return await ticker_cache.get(
+            symbol, lambda: cls.get_symbol_ticker(symbol)
         )
 
-        # Преобразование временных меток в удобный формат
-        df['Open time'] = pd.to_datetime(df['Open time'], unit='ms')
+    @classmethod
+    async def load_all_tickers(cls) -> int:
+        """Fills the ticker cache from one all-symbols request"""
+        tickers = await cls.get_all_tickers()
+        for ticker in tickers:
+            ticker_cache.put(ticker['symbol'], ticker)
+        return len(tickers)
 
-        # Удаление ненужных столбцов
-        df = df.drop(
-            [
-                'Close time', 'Quote asset volume', 'Number of trades',
-                'Taker buy base asset volume',
-                'Taker buy quote asset volume', 'Ignore'
-            ],
-            axis=1)
+    @classmethod
+    async def get_cached_symbol_tickers(cls, symbols: list[str]) -> dict[str, Any]:
+        """
+        Returns symbol -> current price, or symbol -> exception. Once
+        TICKER_ALL_THRESHOLD symbols miss the cache, one all-symbols
+        request replaces their individual requests.
+        """
+        missing = [symbol for symbol in symbols if not ticker_cache.is_fresh(symbol)]
+        if len(missing) >= TICKER_ALL_THRESHOLD:
+            # the symbols are then served from the cache or requested one by one
+            try:
+                await ticker_cache.get(ALL_TICKERS_KEY, cls.load_all_tickers)
+            except Exception as err:
+                logging.error(f'All tickers request failed: {err!r}')
 
-        return df
+        return await gather_bounded({
+            symbol: lambda symbol=symbol: cls.get_cached_symbol_ticker(symbol)
+            for symbol in symbols
+        })
 
     @classmethod
-    async def write_to_csv_and_save_to_db(cls, symbol: Optional[str], interval: Optional[str]):
-        """Write the data frame to a CSV file"""
-        csv_buffer = io.StringIO()
-        df = await cls.data_frame(symbol, interval)
-        df.to_csv(csv_buffer, index=False)
+    async def data_frame(cls, symbol: Optional[str], interval: Optional[str]) -> pd.DataFrame:
+        """Packing in data frame"""
+        result = await cls.get_klines(symbol, interval)
+        return await ExportPool.run(klines_to_frame, result)
 
-        file_data = csv_buffer.getvalue().encode('utf8')
+    @classmethod
+    @background
+    async def write_file_and_save_to_db(
+            cls, symbol: Optional[str], interval: Optional[str],
+            file_format: FileFormat, compression: Optional[str] = None):
+        """
+        Write the klines to a CSV, Parquet or Arrow IPC file stored
+        compressed with CSV_STORAGE_ENCODING, then prune expired files
+        """
+        result = await cls.get_klines(symbol, interval)
+        blob = await ExportPool.run(
+            render_blob, result, file_format, compression, CSV_STORAGE_ENCODING
+        )
 
         async with async_session_maker() as session:
             await CSVData.create_csv_data(
-                session, f'{symbol}-{interval}.csv',
-                file_data
+                session, f'{symbol}-{interval}.{file_format.value}',
+                blob.data, file_format.value, symbol, interval,
+                blob.encoding, blob.hash, blob.size
             )
             logging.info('Data saved successfully in database')
-        csv_buffer.close()
+
+            try:
+                pruned = await CSVData.prune(
+                    session,
+                    datetime.utcnow() - timedelta(days=CSV_RETENTION_DAYS)
+                )
+                logging.info(f'Pruned {pruned} expired files')
+            except IntegrityError as err:
+                # a blob was reused while being pruned, the next run retries
+                logging.error(f'Pruning files failed: {err}')
+
+    @staticmethod
+    def kline_to_row(symbol: str, interval: str, data: list) -> dict[str, Any]:
+        """Converts a raw Binance kline to a binance_data row"""
+        return {
+            'interval': interval,
+            'symbol': symbol,
+            'open_time': from_ms(data[0]),
+            'open': Decimal(data[1]),
+            'high': Decimal(data[2]),
+            'low': Decimal(data[3]),
+            'close': Decimal(data[4]),
+            'volume': Decimal(data[5])
+        }
 
     @classmethod
-    async def create_data_in_db(cls, symbol: Optional[str], interval: Optional[str]):
-        """Create a new data frame from the database"""
-        result = await cls.get_klines(symbol, interval)
+    async def iter_klines_since(
+            cls, symbol: str, interval: str,
+            start_time: int) -> AsyncIterator[list[list]]:
+        """Yields pages of every kline opened at or after start_time ms"""
+        end_time = int(time.time() * 1000)
+        while True:
+            klines = await cls.get_klines_page(
+                symbol, interval, start_time, end_time
+            )
+            if klines:
+                yield klines
+            if len(klines) < KLINES_PAGE_LIMIT:
+                return
+            start_time = klines[-1][0] + 1
 
-        async with async_session_maker() as session:
-            create_data = [
-                await BinanceData.create_binance_data(
-                    session,
-                    {
-                        'interval': interval,
-                        'symbol': symbol,
-                        'open_time': str(datetime.fromtimestamp(data[0] / 1000)),
-                        'open': str(data[1]),
-                        'high': str(data[2]),
-                        'low': str(data[3]),
-                        'close': str(data[4]),
-                        'volume': str(data[5])
-                    })
-                for res in result for data in res
-            ]
-
-        logging.info('Binance data created successfully')
-        return create_data
+    @classmethod
+    async def upsert_klines(
+            cls, symbol: str, interval: str, klines: list[list],
+            batch_size: int = INGEST_BATCH_SIZE) -> int:
+        """Upserts raw Binance klines into the database"""
+        rows = [cls.kline_to_row(symbol, interval, data) for data in klines]
+        return await store_rows(rows, batch_size)
+
+    @classmethod
+    @background
+    async def create_data_in_db(
+            cls, symbol: Optional[str], interval: Optional[str],
+            incremental: bool = True,
+            batch_size: int = INGEST_BATCH_SIZE) -> int:
+        """
+        Upserts candles for a symbol and interval. In incremental mode only
+        candles opened since the last stored one are fetched; that last
+        candle is fetched again so a partial candle is updated in place.
+        """
+        last_open_time = None
+        if incremental:
+            async with async_session_maker() as session:
+                last_open_time = await BinanceData.get_last_open_time(
+                    session, symbol, interval
+                )
+
+        if last_open_time is None:
+            result = await cls.get_klines(symbol, interval)
+            klines = [data for res in result for data in res]
+            created = await cls.upsert_klines(symbol, interval, klines, batch_size)
+        else:
+            created = 0
+            pages = cls.iter_klines_since(symbol, interval, to_ms(last_open_time))
+            async for klines in pages:
+                created += await cls.upsert_klines(
+                    symbol, interval, klines, batch_size
+                )
+
+        logging.info(f'Binance data upserted successfully: {created} rows')
+        return created
@@ -0,0 +1,64 @@
+from datetime import datetime
+from typing import Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import INGEST_BATCH_SIZE, ROLLUP_SOURCE_INTERVAL, ROLLUP_INTERVALS
+from cache import kline_store, result_cache
+from database import async_session_maker, BinanceData, KlineRollup
+from indicators import indicator_cache
+from .intervals import can_resample, bucket_params, bucket_bounds
+
+ROLLUP_TARGETS = [
+    target for target in ROLLUP_INTERVALS
+    if can_resample(ROLLUP_SOURCE_INTERVAL, target)
+]
+
+
+def is_rolled_up(interval: str, target: str) -> bool:
+    """Returns True if target candles of interval are precomputed"""
+    return interval == ROLLUP_SOURCE_INTERVAL and target in ROLLUP_TARGETS
+
+
+async def refresh_rollups(session: AsyncSession, rows: list[dict[str, Any]]):
+    """Recomputes the rollup buckets touched by freshly upserted rows"""
+    touched: dict[str, tuple] = {}
+    for row in rows:
+        if row['interval'] != ROLLUP_SOURCE_INTERVAL:
+            continue
+        first, last = touched.get(row['symbol'], (row['open_time'],) * 2)
+        touched[row['symbol']] = (
+            min(first, row['open_time']), max(last, row['open_time'])
+        )
+
+    for symbol, (first, last) in touched.items():
+        for target in ROLLUP_TARGETS:
+            stride, origin = bucket_params(target)
+            start, end = bucket_bounds(target, first, last)
+            await KlineRollup.refresh(
+                session, symbol, ROLLUP_SOURCE_INTERVAL, target,
+                stride, origin, start, end
+            )
+
+
+async def store_rows(
+        rows: list[dict[str, Any]],
+        batch_size: int = INGEST_BATCH_SIZE) -> int:
+    """
+    Upserts binance_data rows, refreshes the rollups they touch and
+    updates the in-memory rings, indicator series and cached pages
+    of their pairs
+    """
+    async with async_session_maker() as session:
+        written = await BinanceData.upsert_binance_data(
+            session, rows, batch_size
+        )
+        await refresh_rollups(session, rows)
+    kline_store.ingest(rows)
+
+    since: dict[tuple[str, str], datetime] = {}
+    for row in rows:
+        key = (row['symbol'], row['interval'])
+        since[key] = min(since.get(key, row['open_time']), row['open_time'])
+    for (symbol, interval), open_time in since.items():
+        indicator_cache.invalidate(symbol, interval, open_time)
+        result_cache.invalidate(symbol, interval)
+    return written
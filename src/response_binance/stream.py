@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Optional, Callable, Awaitable, Any
+from binance import AsyncClient, BinanceSocketManager
+from config import (STREAM_BATCH_SIZE, STREAM_FLUSH_INTERVAL,
+                    STREAM_MAX_RECONNECT_WAIT)
+from .response import BinanceAPI
+from .rollup import store_rows
+
+
+class KlineStreamIngester:
+    """
+    Long-running kline stream ingestion into binance_data:
+    Attributes:
+        - symbols: the symbols subscribed to
+        - intervals: the kline intervals subscribed to for every symbol
+        - batch_size: closed candles buffered before an upsert
+        - flush_interval: seconds a closed candle may wait in the buffer
+        - pending_since: monotonic time the oldest buffered candle arrived
+        - stream_url: websocket base url, Binance when None
+    Before every (re)connect the stored history is caught up
+    incrementally, so candles closed while disconnected are not lost.
+    """
+
+    def __init__(
+            self, symbols: list[str], intervals: list[str],
+            batch_size: int = STREAM_BATCH_SIZE,
+            flush_interval: float = STREAM_FLUSH_INTERVAL,
+            stream_url: Optional[str] = None,
+            flush: Callable[[list[dict[str, Any]]], Awaitable[int]] = store_rows,
+            catch_up: Optional[Callable[[str, str], Awaitable[Any]]] = None):
+        self.symbols = symbols
+        self.intervals = intervals
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stream_url = stream_url
+        self.flush = flush
+        self.catch_up = catch_up or BinanceAPI.create_data_in_db
+        self.pending: list[dict[str, Any]] = []
+        self.pending_since: Optional[float] = None
+        self.stopped = asyncio.Event()
+
+    @property
+    def streams(self) -> list[str]:
+        """Returns the multiplexed stream names"""
+        return [
+            f'{symbol.lower()}@kline_{interval}'
+            for symbol in self.symbols for interval in self.intervals
+        ]
+
+    def stop(self):
+        """Asks the ingester to flush and return"""
+        self.stopped.set()
+
+    async def flush_pending(self):
+        """Upserts the buffered closed candles, they stay buffered if it fails"""
+        if not self.pending:
+            return
+        await self.flush(self.pending)
+        logging.info(f'Kline stream flushed {len(self.pending)} rows')
+        self.pending, self.pending_since = [], None
+
+    def flush_due(self) -> bool:
+        """Returns True when the buffer is full or its oldest candle waited flush_interval"""
+        return len(self.pending) >= self.batch_size or (
+            self.pending_since is not None
+            and time.monotonic() - self.pending_since >= self.flush_interval
+        )
+
+    def handle_message(self, message: dict[str, Any]) -> bool:
+        """Buffers a closed candle, returns True when the buffer is full"""
+        data = message.get('data', message)
+        if data.get('e') == 'error':
+            raise ConnectionError(data.get('m'))
+
+        kline = data.get('k')
+        if data.get('e') != 'kline' or not kline or not kline['x']:
+            return False
+
+        if not self.pending:
+            self.pending_since = time.monotonic()
+        self.pending.append(BinanceAPI.kline_to_row(
+            kline['s'], kline['i'],
+            [kline['t'], kline['o'], kline['h'],
+             kline['l'], kline['c'], kline['v']]
+        ))
+        return len(self.pending) >= self.batch_size
+
+    async def resume(self):
+        """Fetches every candle stored history is missing since the last open time"""
+        for symbol in self.symbols:
+            for interval in self.intervals:
+                await self.catch_up(symbol, interval)
+
+    async def consume(self, client: AsyncClient):
+        """Reads the kline streams until stopped or disconnected"""
+        manager = BinanceSocketManager(client)
+        if self.stream_url is not None:
+            manager.STREAM_URL = self.stream_url
+
+        async with manager.multiplex_socket(self.streams) as socket:
+            logging.info(f'Kline stream subscribed to {len(self.streams)} streams')
+            while not self.stopped.is_set():
+                # messages keep arriving on busy streams, so the wait ends
+                # when the oldest buffered candle is due, not after a quiet period
+                timeout = self.flush_interval
+                if self.pending_since is not None:
+                    timeout = max(
+                        self.pending_since + self.flush_interval - time.monotonic(), 0
+                    )
+                try:
+                    self.handle_message(
+                        await asyncio.wait_for(socket.recv(), timeout)
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                if self.flush_due():
+                    await self.flush_pending()
+
+    async def run(self):
+        """Ingests until stopped, reconnecting with jittered backoff"""
+        client = AsyncClient()
+        attempt = 0
+        try:
+            while not self.stopped.is_set():
+                try:
+                    await self.resume()
+                    attempt = 0
+                    await self.consume(client)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as err:
+                    logging.error(f'Kline stream failed: {err}')
+                finally:
+                    try:
+                        await self.flush_pending()
+                    except Exception as err:
+                        logging.error(
+                            f'Kline stream flush of {len(self.pending)} rows failed: {err}'
+                        )
+
+                if self.stopped.is_set():
+                    break
+                attempt += 1
+                wait = min(2 ** attempt, STREAM_MAX_RECONNECT_WAIT)
+                try:
+                    await asyncio.wait_for(
+                        self.stopped.wait(), wait * random.uniform(0.5, 1)
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await client.close_connection()
@@ -0,0 +1,69 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pytest
+from response_binance.backfill import (Backfill, expected_open_times,
+                                       find_gap_pages, to_ms)
+
+
+async def test_expected_open_times_aligned():
+    """Test open times are aligned to the interval grid"""
+    result = expected_open_times(
+        '1h', datetime(2023, 5, 27, 7, 30), datetime(2023, 5, 27, 10)
+    )
+    assert result.tolist() == [
+        to_ms(datetime(2023, 5, 27, 8)), to_ms(datetime(2023, 5, 27, 9))
+    ]
+
+
+async def test_to_ms_converts_offsets():
+    """Test aware datetimes are converted to UTC, naive ones read as UTC"""
+    paris = timezone(timedelta(hours=2))
+    assert to_ms(datetime(2023, 5, 27, 20, tzinfo=paris)) == to_ms(datetime(2023, 5, 27, 18))
+    assert to_ms(datetime(2023, 5, 27, 18)) == 1685210400000
+
+
+async def test_expected_open_times_weeks_and_months():
+    """Test weeks open on Mondays and months on the first day"""
+    weeks = expected_open_times('1w', datetime(2023, 5, 1), datetime(2023, 5, 16))
+    months = expected_open_times('1M', datetime(2023, 1, 15), datetime(2023, 4, 1))
+    assert weeks.tolist() == [
+        to_ms(datetime(2023, 5, 1)), to_ms(datetime(2023, 5, 8)),
+        to_ms(datetime(2023, 5, 15))
+    ]
+    assert months.tolist() == [
+        to_ms(datetime(2023, 2, 1)), to_ms(datetime(2023, 3, 1))
+    ]
+
+
+async def test_find_gap_pages():
+    """Test only missing runs are fetched, split by the page limit"""
+    expected = np.arange(0, 10, dtype=np.int64)
+    stored = np.array([0, 1, 5], dtype=np.int64)
+    assert find_gap_pages(expected, stored, limit=2) == [
+        (2, 3), (4, 4), (6, 7), (8, 9)
+    ]
+    assert find_gap_pages(expected, expected) == []
+
+
+async def test_run_stores_pages_past_a_failed_one(monkeypatch):
+    """Test a failed page does not cancel the others and is raised after them"""
+    fetched = []
+
+    async def find_pages(symbol, interval, start, end):
+        return [(0, 1), (2, 3), (4, 5)]
+
+    async def fetch_page(symbol, interval, page, semaphore):
+        if page == (2, 3):
+            raise ConnectionError('reset')
+        await asyncio.sleep(0.01)
+        fetched.append(page)
+        return 2
+
+    monkeypatch.setattr(Backfill, 'find_pages', find_pages)
+    monkeypatch.setattr(Backfill, 'fetch_page', fetch_page)
+    with pytest.raises(ConnectionError):
+        await Backfill.run(
+            'BTCUSDT', '1h', datetime(2023, 5, 27), datetime(2023, 5, 28)
+        )
+    assert sorted(fetched) == [(0, 1), (4, 5)]
@@ -0,0 +1,66 @@
+import asyncio
+from aiohttp import ClientConnectionError
+from cache import TTLCache
+from response_binance import BinanceAPI, RateLimitExceeded, ticker_cache
+from response_binance.response import ALL_TICKERS_KEY
+
+
+async def test_concurrent_misses_share_one_load():
+    """Test concurrent misses for a key coalesce into one loader call"""
+    cache = TTLCache(ttl=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {'symbol': 'BTCUSDT', 'price': '26690.05000000'}
+
+    results = await asyncio.gather(*[
+        cache.get('BTCUSDT', loader) for _ in range(100)
+    ])
+    assert len(calls) == 1
+    assert all(result == results[0] for result in results)
+    assert cache.stats()['coalesced'] == 99
+    assert await cache.get('BTCUSDT', loader) == results[0]
+    assert cache.stats()['hits'] == 1
+
+
+async def test_stale_value_served_while_refreshing():
+    """Test an expired value is served while one refresh runs"""
+    cache = TTLCache(ttl=0, stale_ttl=60)
+    prices = iter(['1.0', '2.0'])
+
+    async def loader():
+        return next(prices)
+
+    assert await cache.get('BTCUSDT', loader) == '1.0'
+    assert await cache.get('BTCUSDT', loader) == '1.0'
+    await asyncio.sleep(0)
+    assert cache.entries['BTCUSDT'][0] == '2.0'
+    assert cache.stats()['stale_hits'] == 1
+
+
+async def test_failed_all_tickers_load_falls_back_per_symbol(monkeypatch):
+    """Test a non-Binance error of the all-symbols request leaves the batch served"""
+    async def get_all_tickers():
+        raise RateLimitExceeded(30)
+
+    async def get_symbol_ticker(symbol):
+        if symbol == 'NOPEUSDT':
+            raise ClientConnectionError('reset')
+        return {'symbol': symbol, 'price': '1.00000000'}
+
+    monkeypatch.setattr(BinanceAPI, 'get_all_tickers', get_all_tickers)
+    monkeypatch.setattr(BinanceAPI, 'get_symbol_ticker', get_symbol_ticker)
+    monkeypatch.setattr('response_binance.response.TICKER_ALL_THRESHOLD', 1)
+    symbols = ['BTCUSDT', 'ETHUSDT', 'NOPEUSDT']
+    for symbol in symbols + [ALL_TICKERS_KEY]:
+        ticker_cache.invalidate(symbol)
+    try:
+        results = await BinanceAPI.get_cached_symbol_tickers(symbols)
+    finally:
+        for symbol in symbols:
+            ticker_cache.invalidate(symbol)
+
+    assert results['BTCUSDT'] == {'symbol': 'BTCUSDT', 'price': '1.00000000'}
+    assert isinstance(results['NOPEUSDT'], ClientConnectionError)
@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+from binance import AsyncClient
+from response_binance import BinanceClient
+
+
+class ShortLivedClient:
+    open = 0
+    peak = 0
+
+    @classmethod
+    async def create(cls, *args, **kwargs):
+        if 'session_params' in kwargs:
+            raise ConnectionError('unreachable')
+        cls.open += 1
+        cls.peak = max(cls.peak, cls.open)
+        return cls()
+
+    async def close_connection(self):
+        ShortLivedClient.open -= 1
+
+
+@pytest.fixture
+def short_lived(monkeypatch):
+    monkeypatch.setattr(AsyncClient, 'create', ShortLivedClient.create)
+    monkeypatch.setattr('response_binance.client.BINANCE_MAX_CONCURRENCY', 2)
+    yield ShortLivedClient
+    ShortLivedClient.open = ShortLivedClient.peak = 0
+
+
+async def test_failed_start_bounds_short_lived_clients(short_lived):
+    """Test a failed start keeps the concurrency limit for the fallback clients"""
+    assert await BinanceClient.start() is None
+    assert BinanceClient.client is None
+
+    async def call():
+        async with BinanceClient.connection():
+            await asyncio.sleep(0.01)
+
+    try:
+        await asyncio.gather(*[call() for _ in range(6)])
+    finally:
+        await BinanceClient.close()
+    assert short_lived.peak == 2
+    assert short_lived.open == 0
@@ -0,0 +1,32 @@
+from decimal import Decimal
+import pyarrow as pa
+import pyarrow.parquet as pq
+from export import FileFormat, render_klines
+
+KLINE = [
+    1685210400000, '26666.87000000', '26690.06000000', '26636.98000000',
+    '26690.05000000', '519.80287000', 1685213999999, '13862481.17',
+    12345, '250.1', '6670000.5', '0'
+]
+
+
+def test_parquet_keeps_types():
+    """Test Parquet files keep timestamps and exact decimals"""
+    data = render_klines([[KLINE] * 3], FileFormat.PARQUET, 'zstd')
+    table = pq.read_table(pa.BufferReader(data))
+
+    assert table.num_rows == 3
+    assert table.schema.field('Open time').type == pa.timestamp('ms', tz='UTC')
+    assert table.schema.field('Close').type == pa.decimal128(28, 8)
+    assert table.column('Close')[0].as_py() == Decimal('26690.05000000')
+
+
+def test_arrow_ipc_round_trip():
+    """Test Arrow IPC files read back the same table"""
+    parquet = pq.read_table(pa.BufferReader(
+        render_klines([[KLINE] * 3], FileFormat.PARQUET, None)
+    ))
+    arrow = pa.ipc.open_file(
+        render_klines([[KLINE] * 3], FileFormat.ARROW, 'lz4')
+    ).read_all()
+    assert arrow.equals(parquet)
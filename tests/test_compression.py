@@ -0,0 +1,90 @@
+import orjson
+import zstandard
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from httpx import AsyncClient
+from api import CompressionMiddleware
+from api.streaming import negotiate_encoding
+
+PAGE = orjson.dumps({'items': [{'close': '26690.05000000'}] * 500})
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+
+@app.get('/page')
+async def page() -> Response:
+    return Response(PAGE, media_type='application/json', headers={'ETag': '"page"'})
+
+
+@app.get('/small')
+async def small() -> Response:
+    return Response(b'{"items": []}', media_type='application/json')
+
+
+@app.get('/stream')
+async def stream() -> StreamingResponse:
+    async def chunks():
+        for offset in range(0, len(PAGE), 4096):
+            yield PAGE[offset:offset + 4096]
+    return StreamingResponse(chunks(), media_type='application/json')
+
+
+@app.get('/stored')
+async def stored() -> Response:
+    return Response(
+        zstandard.compress(PAGE), media_type='application/json',
+        headers={'Content-Encoding': 'zstd'}
+    )
+
+
+def test_negotiate_encoding():
+    """Test the highest q-value wins, ties going to the first offered coding"""
+    offered = ('zstd', 'br', 'gzip')
+    assert negotiate_encoding('gzip, br', offered) == 'br'
+    assert negotiate_encoding('gzip;q=1, zstd;q=0.5', offered) == 'gzip'
+    assert negotiate_encoding('*;q=0.1, zstd;q=0', offered) == 'br'
+    assert negotiate_encoding('identity', offered) is None
+    assert negotiate_encoding(None, offered) is None
+
+
+async def test_json_compressed_in_preferred_coding():
+    """Test pages are sent in the client coding with a weakened ETag"""
+    async with AsyncClient(app=app, base_url='http://test') as client:
+        response = await client.get('/page', headers={'Accept-Encoding': 'zstd, gzip'})
+        assert response.headers['content-encoding'] == 'zstd'
+        assert response.headers['vary'] == 'Accept-Encoding'
+        assert response.headers['etag'] == 'W/"page"'
+        assert int(response.headers['content-length']) < len(PAGE)
+        assert zstandard.ZstdDecompressor().decompressobj().decompress(
+            response.content) == PAGE
+
+        for encoding in ('gzip', 'br'):
+            response = await client.get('/page', headers={'Accept-Encoding': encoding})
+            assert response.headers['content-encoding'] == encoding
+            assert response.content == PAGE
+
+
+async def test_uncompressed_responses():
+    """Test small bodies, encoded bodies and identity clients pass through"""
+    async with AsyncClient(app=app, base_url='http://test') as client:
+        response = await client.get('/small', headers={'Accept-Encoding': 'gzip'})
+        assert 'content-encoding' not in response.headers
+        assert response.headers['vary'] == 'Accept-Encoding'
+
+        response = await client.get('/page', headers={'Accept-Encoding': 'identity'})
+        assert 'content-encoding' not in response.headers
+        assert response.content == PAGE
+
+        response = await client.get('/stored', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['content-encoding'] == 'zstd'
+        assert zstandard.decompress(response.content) == PAGE
+
+
+async def test_streamed_json_compressed():
+    """Test streamed bodies are compressed chunk by chunk"""
+    async with AsyncClient(app=app, base_url='http://test') as client:
+        response = await client.get('/stream', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['content-encoding'] == 'gzip'
+        assert 'content-length' not in response.headers
+        assert response.content == PAGE
@@ -0,0 +1,53 @@
+from datetime import datetime
+from starlette.requests import Request
+from api.conditional import (etag_matches, http_date, is_not_modified,
+                             not_modified, weak_etag)
+
+
+def make_request(headers: dict[str, str]) -> Request:
+    return Request({
+        'type': 'http',
+        'headers': [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+    })
+
+
+def test_etag_matches_weakly():
+    """Test If-None-Match lists and weak tags match the entity tag"""
+    etag = weak_etag(1042, datetime(2023, 5, 27, 18), '26690.05')
+    assert etag == weak_etag(1042, datetime(2023, 5, 27, 18), '26690.05')
+    assert etag != weak_etag(1043, datetime(2023, 5, 27, 18), '26690.05')
+    assert etag_matches(f'"other", {etag.removeprefix("W/")}', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_if_modified_since_only_without_if_none_match():
+    """Test If-Modified-Since is compared to the second and yields to If-None-Match"""
+    generated_at = datetime(2023, 5, 27, 18, 0, 0, 500000)
+    since = http_date(datetime(2023, 5, 27, 18))
+    assert since == 'Sat, 27 May 2023 18:00:00 GMT'
+
+    assert is_not_modified(make_request({'If-Modified-Since': since}), '"a"', generated_at)
+    assert not is_not_modified(
+        make_request({'If-Modified-Since': http_date(datetime(2023, 5, 27, 17))}),
+        '"a"', generated_at
+    )
+    assert not is_not_modified(
+        make_request({'If-Modified-Since': since, 'If-None-Match': '"b"'}),
+        '"a"', generated_at
+    )
+    assert not is_not_modified(make_request({'If-Modified-Since': 'garbage'}), '"a"', generated_at)
+    assert not is_not_modified(make_request({'If-Modified-Since': since}), '"a"')
+
+
+def test_not_modified_keeps_validators_only():
+    """Test a 304 repeats the validators without the body headers"""
+    response = not_modified({
+        'ETag': '"a"', 'Cache-Control': 'no-cache',
+        'Content-Disposition': 'attachment; filename="a.csv"'
+    })
+    assert response.status_code == 304
+    assert response.headers['etag'] == '"a"'
+    assert 'content-disposition' not in response.headers
+    assert 'content-length' not in response.headers
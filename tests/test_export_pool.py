@@ -0,0 +1,73 @@
+import asyncio
+import time
+from httpx import AsyncClient
+from export import ExportPool, klines_to_csv
+from response_binance import ticker_cache
+from main import app
+
+KLINE = [
+    1685210400000, '26666.87000000', '26690.06000000', '26636.98000000',
+    '26690.05000000', '519.80287000', 1685213999999, '13862481.17',
+    12345, '250.1', '6670000.5', '0'
+]
+
+
+def p99(latencies: list[float]) -> float:
+    return sorted(latencies)[int(len(latencies) * 0.99) - 1]
+
+
+async def ticker_latencies(
+        client: AsyncClient, until: asyncio.Future, clients: int = 10) -> list[float]:
+    """Requests the ticker price from concurrent clients until the future is done"""
+    latencies = []
+
+    async def poll():
+        while not until.done():
+            started = time.perf_counter()
+            response = await client.get('/crypto/ticker/price?symbol=BTCUSDT')
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200
+
+    await asyncio.gather(*[poll() for _ in range(clients)])
+    return latencies
+
+
+async def test_ticker_latency_flat_while_exporting():
+    """Test /ticker/price p99 does not grow while large exports render"""
+    ticker_cache.entries['BTCUSDT'] = (
+        {'symbol': 'BTCUSDT', 'price': '26690.05000000'},
+        time.monotonic() + 600
+    )
+    result = [[KLINE] * 50000]
+    ExportPool.start('process', 2)
+    try:
+        async with AsyncClient(app=app, base_url='http://test') as client:
+            await ticker_latencies(client, asyncio.ensure_future(asyncio.sleep(0.5)))
+            baseline = p99(
+                await ticker_latencies(client, asyncio.ensure_future(asyncio.sleep(1)))
+            )
+            exports = asyncio.gather(*[
+                ExportPool.run(klines_to_csv, result) for _ in range(2)
+            ])
+            under_load = p99(await ticker_latencies(client, exports))
+            files = exports.result()
+    finally:
+        await ExportPool.close()
+        ticker_cache.invalidate('BTCUSDT')
+
+    assert all(file.startswith(b'Open time,Open') for file in files)
+    assert under_load < baseline * 3 + 0.01
+
+
+async def test_close_waits_off_the_event_loop():
+    """Test closing the pool lets the loop run while the running work ends"""
+    ExportPool.start('thread', 1)
+    running = asyncio.ensure_future(ExportPool.run(time.sleep, 0.5))
+    await asyncio.sleep(0.05)
+    started = time.perf_counter()
+    closing = asyncio.ensure_future(ExportPool.close())
+    await asyncio.sleep(0.01)
+    assert time.perf_counter() - started < 0.25
+    assert not closing.done()
+    await asyncio.gather(closing, running)
+    assert ExportPool.executor is None
@@ -1,8 +1,11 @@
 import io
+from datetime import datetime
+from decimal import Decimal
 from http import HTTPStatus
 from httpx import AsyncClient
 from database import BinanceData, CSVData
 from response_binance import BinanceAPI
+from export import FileFormat, render_klines, encode_blob, ZSTD
 
 
 async def test_create_data_in_db(async_session_test):
@@ -10,12 +13,12 @@ async def test_create_data_in_db(async_session_test):
     data_test_info = {
         'interval': '1h',
         'symbol': 'BTCUSDT',
-        'open_time': '2023-05-27 18:00:00',
-        'open': '26666.87000000',
-        'high': '26690.06000000',
-        'low': '26636.98000000',
-        'close': '26690.05000000',
-        'volume': '519.80287000'
+        'open_time': datetime(2023, 5, 27, 18),
+        'open': Decimal('26666.87000000'),
+        'high': Decimal('26690.06000000'),
+        'low': Decimal('26636.98000000'),
+        'close': Decimal('26690.05000000'),
+        'volume': Decimal('519.80287000')
     }
     async with async_session_test() as session:
         created_data = await BinanceData.create_binance_data(
@@ -25,6 +28,28 @@ async def test_create_data_in_db(async_session_test):
     assert created_data.interval == data_test_info.get('interval')
 
 
+async def test_upsert_data_in_db(async_session_test):
+    """Test re-ingesting a batch of rows does not duplicate them"""
+    rows = [
+        BinanceAPI.kline_to_row(
+            'BTCUSDT', '1h',
+            [1685210400000 + hour * 3600000, '26666.87000000',
+             '26690.06000000', '26636.98000000', '26690.05000000',
+             '519.80287000']
+        )
+        for hour in range(5)
+    ]
+    async with async_session_test() as session:
+        await BinanceData.upsert_binance_data(session, rows, batch_size=2)
+        rows[-1]['close'] = Decimal('26700.00000000')
+        await BinanceData.upsert_binance_data(session, rows, batch_size=2)
+        stored = await BinanceData.get_all_data_by_symbol('BTCUSDT', session)
+
+    open_times = [row.open_time for row in stored if row.interval == '1h']
+    assert len(open_times) == len(set(open_times))
+    assert Decimal('26700.00000000') in [row.close for row in stored]
+
+
 async def test_get_all_by_symbol(client: AsyncClient):
     """Test get_all_by_symbol"""
     response = await client.get('/crypto/all_by_symbol?symbol=BTCUSDT')
@@ -32,6 +57,122 @@ async def test_get_all_by_symbol(client: AsyncClient):
     assert response.json()['items'][0]['symbol'] == 'BTCUSDT'
 
 
+async def test_get_all_by_symbol_pages(client: AsyncClient):
+    """Test keyset pages do not overlap"""
+    url = '/crypto/all_by_symbol?symbol=BTCUSDT&interval=1h&size=2'
+    first = (await client.get(url)).json()
+    second = (await client.get(f'{url}&cursor={first["next_cursor"]}')).json()
+
+    assert len(first['items']) == 2
+    assert first['items'][-1]['open_time'] < second['items'][0]['open_time']
+
+
+async def test_get_all_by_symbol_compact(client: AsyncClient):
+    """Test the compact layout returns the same klines as arrays"""
+    url = '/crypto/all_by_symbol?symbol=BTCUSDT&interval=1h&size=2'
+    objects = (await client.get(url)).json()
+    compact = (await client.get(f'{url}&compact=true')).json()
+
+    assert compact['next_cursor'] == objects['next_cursor']
+    assert [
+        dict(zip(compact['columns'], item)) for item in compact['items']
+    ] == objects['items']
+
+
+async def test_get_all_by_symbol_not_modified(client: AsyncClient):
+    """Test an unchanged page is answered 304 from its ETag"""
+    url = '/crypto/all_by_symbol?symbol=BTCUSDT&interval=1h&size=2'
+    response = await client.get(url)
+    assert response.headers['last-modified'].endswith('GMT')
+
+    response = await client.get(url, headers={'If-None-Match': response.headers['etag']})
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.content == b''
+
+
+async def test_get_all_by_symbol_etag_follows_writes(client: AsyncClient, async_session_test):
+    """Test rewriting a candle of any interval changes the symbol wide ETag"""
+    url = '/crypto/all_by_symbol?symbol=BTCUSDT'
+    etag = (await client.get(url)).headers['etag']
+    row = BinanceAPI.kline_to_row(
+        'BTCUSDT', '1h',
+        [1685210400000, '26666.87000000', '26690.06000000',
+         '26636.98000000', '26691.00000000', '519.80287000']
+    )
+    async with async_session_test() as session:
+        await BinanceData.upsert_binance_data(session, [row])
+
+    response = await client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['etag'] != etag
+
+
+async def test_get_all_by_symbol_resampled(client: AsyncClient):
+    """Test hourly candles are rolled up into one daily candle"""
+    response = await client.get(
+        '/crypto/all_by_symbol?symbol=BTCUSDT&interval=1h&resample=1d'
+        '&start=2023-05-27T00:00:00&end=2023-05-28T00:00:00'
+    )
+    candle = response.json()['items'][0]
+    assert response.status_code == HTTPStatus.OK
+    assert candle['interval'] == '1d'
+    assert candle['open_time'] == '2023-05-27T00:00:00'
+
+
+async def test_get_all_by_symbol_aware_bounds(client: AsyncClient):
+    """Test offset bounds are converted to the UTC open times"""
+    url = '/crypto/all_by_symbol?symbol=BTCUSDT&interval=1h'
+    naive = (await client.get(
+        f'{url}&start=2023-05-27T18:00:00&end=2023-05-27T20:00:00'
+    )).json()
+    response = await client.get(
+        f'{url}&start=2023-05-27T18:00:00Z&end=2023-05-27T22:00:00%2B02:00'
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['items'] == naive['items']
+
+    response = await client.get(
+        '/crypto/export/file?symbol=BTCUSDT&interval=1h'
+        '&start=2023-05-27T18:00:00Z'
+    )
+    assert response.status_code == HTTPStatus.OK
+
+
+async def test_get_latest_klines(client: AsyncClient):
+    """Test the last candles are served in open time order"""
+    response = await client.get(
+        '/crypto/klines/latest?symbol=BTCUSDT&interval=1h&limit=2'
+    )
+    items = response.json()['items']
+    assert response.status_code == HTTPStatus.OK
+    assert len(items) == 2
+    assert items[0]['open_time'] < items[1]['open_time']
+    assert len(items[1]['close'].split('.')[1]) == 8
+
+
+async def test_get_indicators(client: AsyncClient):
+    """Test an indicator is computed over the stored candles"""
+    response = await client.get(
+        '/crypto/indicators?symbol=BTCUSDT&interval=1h&indicator=sma&period=3'
+    )
+    items = response.json()['items']
+    assert response.status_code == HTTPStatus.OK
+    assert items[0]['values']['value'] is None
+    assert items[-1]['values']['value'] is not None
+
+    response = await client.get('/crypto/indicators?indicator=macd')
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+async def test_get_indicators_aware_end(client: AsyncClient):
+    """Test an end with an offset bounds the values like its UTC time"""
+    url = '/crypto/indicators?symbol=BTCUSDT&interval=1h&indicator=sma&period=2'
+    naive = (await client.get(f'{url}&end=2023-05-27T21:00:00')).json()
+    response = await client.get(f'{url}&end=2023-05-27T23:00:00%2B02:00')
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['items'] == naive['items']
+
+
 async def test_not_found_symbol(client: AsyncClient):
     """Test a not found symbol"""
     response = await client.get('/crypto/all_by_symbol?symbol=ETHBTC')
@@ -46,6 +187,18 @@ async def test_get_ticker_price(client: AsyncClient):
     assert len(response.json()) == 2
 
 
+async def test_get_ticker_prices(client: AsyncClient):
+    """Test batch ticker prices keep per symbol errors"""
+    response = await client.get(
+        '/crypto/ticker/prices?symbols=BTCUSDT&symbols=ETHUSDT'
+        '&symbols=ETHBTC&symbols=NOTASYMBOL'
+    )
+    prices = {price['symbol']: price for price in response.json()}
+    assert response.status_code == HTTPStatus.OK
+    assert prices['BTCUSDT']['price'] is not None
+    assert prices['NOTASYMBOL']['error'] is not None
+
+
 async def test_create_data_csv(async_session_test):
     """Test creating data CSV in database"""
     csv_buffer = io.StringIO()
@@ -63,20 +216,122 @@ async def test_create_data_csv(async_session_test):
 
 
 async def test_generate_file(client: AsyncClient):
-    """Test generate file"""
+    """Test generate file is queued"""
     response = await client.get('/crypto/generate/file?symbol=BTCUSDT&interval=6h')
+    assert response.status_code == HTTPStatus.ACCEPTED
+    assert response.json()['job_id'] is not None
+
+
+async def test_generate_file_parquet(client: AsyncClient):
+    """Test columnar files are queued and unsupported codecs rejected"""
+    response = await client.get(
+        '/crypto/generate/file?symbol=BTCUSDT&interval=6h'
+        '&format=parquet&compression=zstd'
+    )
+    assert response.status_code == HTTPStatus.ACCEPTED
+
+    response = await client.get(
+        '/crypto/generate/file?symbol=BTCUSDT&interval=6h'
+        '&format=arrow&compression=brotli'
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+async def test_export_file(client: AsyncClient):
+    """Test exporting stored candles as csv"""
+    response = await client.get(
+        '/crypto/export/file?symbol=BTCUSDT&interval=1h'
+    )
+    lines = response.text.splitlines()
     assert response.status_code == HTTPStatus.OK
+    assert lines[0] == 'Open time,Open,High,Low,Close,Volume'
+    assert len(lines) > 1
 
 
 async def test_download_file(client: AsyncClient):
     """Test download file"""
     response = await client.get('/crypto/download/file')
     assert response.status_code == HTTPStatus.OK
+    assert int(response.headers['content-length']) == len(response.content)
+
+
+async def test_download_file_parquet(client: AsyncClient, async_session_test):
+    """Test downloading the last Parquet file"""
+    kline = [1685210400000, '26666.87000000', '26690.06000000',
+             '26636.98000000', '26690.05000000', '519.80287000']
+    async with async_session_test() as session:
+        await CSVData.create_csv_data(
+            session, 'BTCUSDT-1h.parquet',
+            render_klines([[kline]], FileFormat.PARQUET, 'snappy'), 'parquet'
+        )
+
+    response = await client.get('/crypto/download/file?format=parquet')
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/vnd.apache.parquet'
+    assert response.content.startswith(b'PAR1')
+
+
+async def test_download_file_range(client: AsyncClient):
+    """Test resuming a download with a Range request"""
+    full = await client.get('/crypto/download/file')
+    response = await client.get(
+        '/crypto/download/file', headers={'Range': 'bytes=10-'}
+    )
+    assert response.status_code == HTTPStatus.PARTIAL_CONTENT
+    assert response.content == full.content[10:]
+
+
+async def test_download_file_not_modified(client: AsyncClient):
+    """Test a cached download is revalidated with its ETag or Last-Modified"""
+    full = await client.get('/crypto/download/file')
+    for headers in (
+            {'If-None-Match': full.headers['etag']},
+            {'If-Modified-Since': full.headers['last-modified']}):
+        response = await client.get('/crypto/download/file', headers=headers)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert response.headers['etag'] == full.headers['etag']
+
+
+async def test_download_file_encoded(client: AsyncClient, async_session_test):
+    """Test compressed files pass through or are decoded per Accept-Encoding"""
+    data = b'Open time,Open,High,Low,Close,Volume\n' * 200
+    blob = encode_blob(data, ZSTD)
+    async with async_session_test() as session:
+        await CSVData.create_csv_data(
+            session, 'ETHUSDT-1h.csv', blob.data, 'csv', 'ETHUSDT', '1h',
+            blob.encoding, blob.hash, blob.size
+        )
+    url = '/crypto/download/file?symbol=ETHUSDT&interval=1h'
+
+    response = await client.get(url, headers={'Accept-Encoding': 'zstd'})
+    assert response.headers['content-encoding'] == 'zstd'
+    assert response.content == blob.data
+
+    response = await client.get(url, headers={'Accept-Encoding': 'identity'})
+    assert 'content-encoding' not in response.headers
+    assert response.content == data
+
+    response = await client.get('/crypto/files?symbol=ETHUSDT')
+    assert response.status_code == HTTPStatus.OK
+    file_id = response.json()[0]['id']
+    assert response.json()[0]['size'] == len(data)
+    response = await client.get(
+        f'/crypto/download/file?file_id={file_id}',
+        headers={'Accept-Encoding': 'identity'}
+    )
+    assert response.content == data
 
 
 async def test_create_data(client: AsyncClient):
-    """Test create data"""
-    response = await client.post('/crypto/create/data?symbol=BTCUSDT&interval=4h')
+    """Test create data is queued once and its status exposed"""
+    url = '/crypto/create/data?symbol=BTCUSDT&interval=4h'
+    response = await client.post(url)
+    job_id = response.json()['job_id']
+    assert response.status_code == HTTPStatus.ACCEPTED
+    assert (await client.post(url)).json()['job_id'] == job_id
+
+    response = await client.get(f'/crypto/jobs/{job_id}')
     assert response.status_code == HTTPStatus.OK
+    assert response.json()['status'] == 'pending'
 
 
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+import numpy as np
+import pytest
+from indicators import (INDICATORS, Indicator, IndicatorCache, make_indicator,
+                        to_candles)
+
+START = datetime(2023, 5, 27)
+
+
+def make_rows(count: int, first: int = 0) -> list[tuple]:
+    """Hourly (open_time, open, high, low, close, volume) rows"""
+    return [
+        (
+            START + timedelta(hours=hour), Decimal('26600'),
+            Decimal(26700 + hour % 7 * 10), Decimal(26500 - hour % 5 * 10),
+            Decimal(26600 + hour % 11 * 10 - hour % 3 * 25),
+            Decimal('519.80287000')
+        )
+        for hour in range(first, first + count)
+    ]
+
+
+def test_extend_matches_full_computation():
+    """Test extending chunk by chunk gives the values of one full pass"""
+    candles = to_candles(make_rows(200))
+    for name in INDICATORS:
+        indicator = make_indicator(name, 14, 2.0)
+        full, _ = indicator.extend(candles, None)
+
+        state, chunks = None, []
+        for first, last in ((0, 5), (5, 5), (5, 40), (40, 200)):
+            chunk = {column: values[first:last] for column, values in candles.items()}
+            values, state = indicator.extend(chunk, state)
+            chunks.append(values)
+
+        for output in indicator.outputs:
+            extended = np.concatenate([chunk[output] for chunk in chunks])
+            assert np.allclose(full[output], extended, equal_nan=True)
+
+
+async def test_cache_extends_with_new_closed_candles():
+    """Test lookups only load candles stored after the cached ones"""
+    cache = IndicatorCache()
+    stored = make_rows(48)
+    loads = []
+
+    async def load(after):
+        loads.append(after)
+        return [row for row in stored if after is None or row[0] >= after]
+
+    indicator = make_indicator('ema', 3, 2.0)
+    closed = START + timedelta(hours=47)
+    open_times, _ = await cache.get('BTCUSDT', '1h', indicator, load, closed)
+    assert len(open_times) == 48
+
+    stored += make_rows(2, first=48)
+    open_times, values = await cache.get(
+        'BTCUSDT', '1h', indicator, load, closed + timedelta(hours=2)
+    )
+    assert loads == [None, START + timedelta(hours=46)]
+    assert len(open_times) == 50
+    assert not np.isnan(values['value'][-1])
+    assert cache.stats()['extends'] == 1
+
+    cache.invalidate('BTCUSDT', '1h', START)
+    assert cache.stats()['size'] == 0
+
+
+async def test_cache_loads_from_since():
+    """Test a cold lookup only loads the candles from since, an earlier since rebuilds it"""
+    cache = IndicatorCache()
+    stored = make_rows(48)
+    loads = []
+
+    async def load(after):
+        loads.append(after)
+        return [row for row in stored if row[0] >= after]
+
+    indicator = make_indicator('sma', 3, 2.0)
+    closed = START + timedelta(hours=47)
+    since = indicator.warmup_start(START + timedelta(hours=40), timedelta(hours=1))
+    open_times, _ = await cache.get('BTCUSDT', '1h', indicator, load, closed, since)
+    assert since == START + timedelta(hours=37)
+    assert len(open_times) == 11
+
+    await cache.get('BTCUSDT', '1h', indicator, load, closed, since + timedelta(hours=1))
+    open_times, _ = await cache.get('BTCUSDT', '1h', indicator, load, closed, START)
+    assert loads == [since, START + timedelta(hours=46), START]
+    assert len(open_times) == 48
+    assert cache.stats()['misses'] == 2
+
+
+def test_indicator_requires_extend():
+    """Test an indicator without extend cannot be instantiated"""
+    class Partial(Indicator):
+        name = 'partial'
+
+    with pytest.raises(TypeError):
+        Partial(3)
@@ -0,0 +1,94 @@
+import asyncio
+from datetime import datetime, timedelta
+from database import Job
+from response_binance import JobWorker
+from response_binance.jobs import param_time
+
+
+async def run_until_finished(worker: JobWorker, session_maker, job_id: int) -> Job:
+    """Runs the worker until the job is done or failed"""
+    task = asyncio.create_task(worker.run())
+    try:
+        while True:
+            async with session_maker() as session:
+                job = await Job.get_job(session, job_id)
+            if job.status in ('done', 'failed'):
+                return job
+            await asyncio.sleep(0.05)
+    finally:
+        worker.stop()
+        await task
+
+
+async def test_enqueue_dedupes_pending_jobs(async_session_test):
+    """Test an identical pending job is not queued twice"""
+    async with async_session_test() as session:
+        first = await Job.enqueue(session, 'test_dedupe', 'BTCUSDT', '1h', {})
+        second = await Job.enqueue(session, 'test_dedupe', 'BTCUSDT', '1h', {})
+        other = await Job.enqueue(session, 'test_dedupe', 'ETHUSDT', '1h', {})
+    assert first == second
+    assert other != first
+
+
+async def test_worker_retries_failed_job(async_session_test):
+    """Test a failing job is retried and completes"""
+    calls = []
+
+    async def flaky(symbol, interval, params):
+        calls.append(symbol)
+        if len(calls) == 1:
+            raise ConnectionError('Binance unreachable')
+
+    async with async_session_test() as session:
+        job_id = await Job.enqueue(session, 'test_retry', 'BTCUSDT', '1h', {})
+    worker = JobWorker(
+        poll_interval=0.05, retry_base=0, handlers={'test_retry': flaky},
+        session_maker=async_session_test
+    )
+    job = await run_until_finished(worker, async_session_test, job_id)
+
+    assert job.status == 'done'
+    assert job.attempts == 2
+    assert len(calls) == 2
+
+
+async def test_worker_fails_after_max_attempts(async_session_test):
+    """Test a job that keeps failing stops after max_attempts"""
+    async def broken(symbol, interval, params):
+        raise ConnectionError('Binance unreachable')
+
+    async with async_session_test() as session:
+        job_id = await Job.enqueue(
+            session, 'test_fail', 'BTCUSDT', '1h', {}, max_attempts=2
+        )
+    worker = JobWorker(
+        poll_interval=0.05, retry_base=0, handlers={'test_fail': broken},
+        session_maker=async_session_test
+    )
+    job = await run_until_finished(worker, async_session_test, job_id)
+
+    assert job.status == 'failed'
+    assert job.attempts == 2
+    assert job.error == 'Binance unreachable'
+
+
+async def test_retry_superseded_by_pending_job(async_session_test):
+    """Test a retry finding an identical pending job returns it instead of failing"""
+    async with async_session_test() as session:
+        job_id = await Job.enqueue(session, 'test_supersede', 'BTCUSDT', '1h', {})
+        claimed = await Job.claim(session, ['test_supersede'], 1, timedelta(minutes=5))
+        pending_id = await Job.enqueue(session, 'test_supersede', 'BTCUSDT', '1h', {})
+        retried_by = await Job.fail(
+            session, job_id, 'Binance unreachable', timedelta(seconds=0)
+        )
+        job = await Job.get_job(session, job_id)
+
+    assert [row.id for row in claimed] == [job_id]
+    assert retried_by == pending_id != job_id
+    assert job.status == 'superseded'
+
+
+async def test_backfill_params_read_as_naive_utc():
+    """Test backfill bounds queued with an offset are read as naive UTC"""
+    assert param_time('2023-05-27T20:00:00+02:00') == datetime(2023, 5, 27, 18)
+    assert param_time('2023-05-27T18:00:00') == datetime(2023, 5, 27, 18)
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+import numpy as np
+from cache import KlineRing, KlineStore, to_klines
+
+START = datetime(2023, 5, 27)
+
+
+def rows(first: int, count: int, close: float = 1.0) -> list[tuple]:
+    """Returns count hourly candle rows starting first hours after START"""
+    return [
+        (START + timedelta(hours=i), 1.0, 2.0, 0.5, close, 10.0)
+        for i in range(first, first + count)
+    ]
+
+
+def test_ring_keeps_the_last_capacity_candles():
+    """Test appends wrap around and reads come back in open time order"""
+    ring = KlineRing(4)
+    ring.extend(to_klines(rows(0, 3)))
+    ring.extend(to_klines(rows(3, 3)))
+
+    assert ring.size == 4
+    assert ring.last(2)['open_time'].tolist() == [
+        START + timedelta(hours=4), START + timedelta(hours=5)
+    ]
+    assert ring.since(START + timedelta(hours=3))['open_time'][0] == np.datetime64(
+        START + timedelta(hours=3), 'ms'
+    )
+
+
+def test_ring_replaces_and_drops_older_candles():
+    """Test re-ingested candles replace held ones and older ones are dropped"""
+    ring = KlineRing(4)
+    ring.extend(to_klines(rows(2, 3)))
+    ring.extend(to_klines(rows(0, 1) + rows(3, 1, close=5.0) + rows(5, 1)))
+
+    assert ring.size == 4
+    assert ring.first_open_time == np.datetime64(START + timedelta(hours=2), 'ms')
+    assert ring.last(4)['close'].tolist() == [1.0, 5.0, 1.0, 1.0]
+
+
+async def test_store_serves_ingested_candles_and_evicts_cold_pairs():
+    """Test reads hit the ring once loaded and the least recently read pair is evicted"""
+    loads = []
+
+    def loader(symbol: str):
+        async def load(limit, after):
+            loads.append((symbol, after))
+            return rows(0, 3) if after is None else []
+        return load
+
+    store = KlineStore(capacity=8, budget=KlineRing(8).nbytes * 2, max_age=60)
+    ring = await store.get('BTCUSDT', '1h', loader('BTCUSDT'))
+    store.ingest([{
+        'symbol': 'BTCUSDT', 'interval': '1h',
+        'open_time': START + timedelta(hours=3), 'open': Decimal('1'),
+        'high': Decimal('2'), 'low': Decimal('0.5'), 'close': Decimal('3.25'),
+        'volume': Decimal('10')
+    }])
+    assert (await store.get('BTCUSDT', '1h', loader('BTCUSDT'))) is ring
+    assert ring.last(1)['close'][0] == 3.25
+    assert loads == [('BTCUSDT', None)]
+
+    await store.get('ETHUSDT', '1h', loader('ETHUSDT'))
+    await store.get('BTCUSDT', '1h', loader('BTCUSDT'))
+    await store.get('BNBUSDT', '1h', loader('BNBUSDT'))
+    assert list(store.rings) == [('BTCUSDT', '1h'), ('BNBUSDT', '1h')]
+    assert store.stats()['evictions'] == 1
+    assert store.nbytes <= store.budget
+
+
+async def test_store_tops_up_stale_rings():
+    """Test a ring older than max_age loads only the candles since its last one"""
+    afters = []
+
+    async def load(limit, after):
+        afters.append(after)
+        return rows(0, 3) if after is None else rows(2, 2)
+
+    store = KlineStore(capacity=8, max_age=0)
+    await store.get('BTCUSDT', '1h', load)
+    ring = await store.get('BTCUSDT', '1h', load)
+
+    assert afters == [None, START + timedelta(hours=2)]
+    assert ring.size == 4
+    assert store.stats()['topups'] == 1
+
+
+async def test_store_keeps_no_ring_for_unknown_pairs():
+    """Test pairs without candles are not cached and short loads mark the ring complete"""
+    async def load(limit, after):
+        return []
+
+    store = KlineStore(capacity=8, max_age=60)
+    ring = await store.get('NOPEUSDT', '1h', load)
+    assert ring.size == 0 and ring.complete
+    assert not store.rings and not store.locks
+
+    async def short(limit, after):
+        return rows(2, 3)
+
+    ring = await store.get('BTCUSDT', '1h', short)
+    assert ring.complete
+    store.ingest([{
+        'symbol': 'BTCUSDT', 'interval': '1h', 'open_time': START,
+        'open': 1, 'high': 2, 'low': 0.5, 'close': 1, 'volume': 10
+    }])
+    assert ring.size == 3 and not ring.complete
@@ -0,0 +1,27 @@
+from types import SimpleNamespace
+import pytest
+from response_binance.limiter import (WeightLimiter, Priority,
+                                      RateLimitExceeded)
+
+
+async def test_background_keeps_interactive_reserve():
+    """Test background calls cannot spend the interactive reserve"""
+    limiter = WeightLimiter(limit=100, reserve=0.5, background_max_wait=1)
+    limiter.update(SimpleNamespace(headers={'x-mbx-used-weight-1m': '45'}))
+
+    await limiter.acquire(2, Priority.INTERACTIVE)
+    with pytest.raises(RateLimitExceeded):
+        await limiter.acquire(50, Priority.BACKGROUND)
+    assert limiter.stats()['used_weight'] == 45
+    assert limiter.stats()['shed'] == 1
+
+
+async def test_ban_stops_every_call():
+    """Test a 429 pauses interactive calls for Retry-After"""
+    limiter = WeightLimiter(limit=100)
+    response = SimpleNamespace(headers={'Retry-After': '30'})
+    limiter.on_error(SimpleNamespace(status_code=429, response=response))
+
+    with pytest.raises(RateLimitExceeded) as err:
+        await limiter.acquire(1, Priority.INTERACTIVE)
+    assert err.value.retry_after >= 29
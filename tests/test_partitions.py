@@ -0,0 +1,56 @@
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import text
+from database import BinanceData, PartitionManager
+from database.partitions import interval_table, month_table, month_partition_ddl
+
+
+def test_partition_names():
+    """Test partition names are stable and 1M does not collide with 1m"""
+    assert interval_table('1m') == 'binance_data_1m'
+    assert interval_table('1M') == 'binance_data_1mo'
+    assert month_table('1m', datetime(2023, 12, 1)) == 'binance_data_1m_p2023_12'
+    assert month_partition_ddl('1m', datetime(2023, 12, 1)).endswith(
+        "FOR VALUES FROM ('2023-12-01') TO ('2024-01-01')"
+    )
+
+
+async def test_partitions_created_and_dropped(async_session_test):
+    """Test rows land in their month partition and expired months are dropped"""
+    manager = PartitionManager(
+        intervals=['1m'], retention={'1m': 90}, session_maker=async_session_test
+    )
+    rows = [{
+        'interval': '1m', 'symbol': 'PARTUSDT', 'open_time': datetime(2023, month, 2),
+        'open': Decimal('1'), 'high': Decimal('1'), 'low': Decimal('1'),
+        'close': Decimal('1'), 'volume': Decimal('1')
+    } for month in (1, 2)]
+
+    async with async_session_test() as session:
+        created = await manager.create_for_rows(session, rows)
+        assert await manager.create_for_rows(session, rows) == []
+        await BinanceData.upsert_binance_data(session, rows)
+        located = await session.scalar(text(
+            "SELECT tableoid::regclass::text FROM binance_data "
+            "WHERE symbol = 'PARTUSDT' AND open_time = '2023-01-02'"
+        ))
+        dropped = await manager.drop_expired(session, datetime(2023, 5, 15))
+        remaining = await session.scalar(text(
+            "SELECT count(*) FROM binance_data WHERE symbol = 'PARTUSDT'"
+        ))
+        detached = await session.scalar(text(
+            "SELECT to_regclass('binance_data_1m_p2023_01') IS NULL "
+            "AND to_regclass('binance_data_1m_default') IS NULL"
+        ))
+
+    assert created == ['binance_data_1m_p2023_01', 'binance_data_1m_p2023_02']
+    assert located == 'binance_data_1m_p2023_01'
+    assert dropped == ['binance_data_1m_p2023_01']
+    assert remaining == 1
+    assert detached
+
+
+def test_retention_of_unpartitioned_interval_warns(caplog):
+    """Test a retention for an interval kept in the default partition is reported"""
+    PartitionManager(intervals=['1m'], retention={'1m': 90, '1d': 30})
+    assert '1d' in caplog.text
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import pytest
+import websockets
+from response_binance import PriceHub, PriceSubscription
+
+
+async def trading_symbols() -> set[str]:
+    return {'BTCUSDT', 'ETHUSDT', 'BNBUSDT'}
+
+
+def mini_ticker(symbol: str, price: str, event_time: int) -> str:
+    """Returns a mini ticker event"""
+    return json.dumps({
+        'e': '24hrMiniTicker', 'E': event_time, 's': symbol, 'c': price,
+        'o': '26000.00000000', 'h': '27000.00000000', 'l': '25000.00000000',
+        'v': '1000.00000000', 'q': '26000000.00000000'
+    })
+
+
+async def test_price_streams_are_shared_and_drop_to_latest():
+    """Test subscribers share one upstream stream and slow ones skip to the latest price"""
+    paths, sent = [], asyncio.Event()
+
+    async def fake_binance(websocket):
+        paths.append(websocket.path)
+        for i in range(3):
+            await websocket.send(mini_ticker('BTCUSDT', f'2669{i}.00000000', i))
+        sent.set()
+        await websocket.wait_closed()
+
+    async with websockets.serve(fake_binance, '127.0.0.1', 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        hub = PriceHub(stream_url=f'ws://127.0.0.1:{port}/', load_symbols=trading_symbols)
+        fast, slow = PriceSubscription(), PriceSubscription()
+        await hub.subscribe(fast, ['btcusdt'])
+        await hub.subscribe(slow, ['BTCUSDT'])
+
+        first = await asyncio.wait_for(fast.get(), 5)
+        await asyncio.wait_for(sent.wait(), 5)
+        await asyncio.sleep(0.1)
+        updates = await asyncio.wait_for(slow.get(), 5)
+
+        assert hub.stats() == {'BTCUSDT': 2}
+        hub.unsubscribe(fast)
+        assert len(hub.tasks) == 1
+        hub.unsubscribe(slow)
+        assert hub.tasks == {} and hub.stats() == {}
+        await hub.close()
+
+    assert paths == ['/ws/btcusdt@miniTicker']
+    assert first[0]['symbol'] == 'BTCUSDT'
+    assert updates == [{'symbol': 'BTCUSDT', 'price': '26692.00000000', 'time': 2}]
+    assert slow.dropped == 2
+
+
+async def test_subscription_symbol_limit():
+    """Test a subscription cannot exceed max_symbols"""
+    hub = PriceHub(max_symbols=1, load_symbols=trading_symbols)
+    subscription = PriceSubscription()
+    subscription.symbols.add('BTCUSDT')
+    with pytest.raises(ValueError):
+        await hub.subscribe(subscription, ['ETHUSDT'])
+    assert hub.tasks == {}
+
+
+async def test_subscription_rejects_unknown_symbols_and_stream_overflow():
+    """Test only trading symbols are streamed, up to max_streams across clients"""
+    hub = PriceHub(max_streams=2, load_symbols=trading_symbols)
+    first, second = PriceSubscription(), PriceSubscription()
+    with pytest.raises(ValueError, match='NOPEUSDT'):
+        await hub.subscribe(first, ['BTCUSDT', 'NOPEUSDT'])
+    assert hub.tasks == {}
+
+    await hub.subscribe(first, ['BTCUSDT', 'ETHUSDT'])
+    await hub.subscribe(second, ['ETHUSDT'])
+    with pytest.raises(ValueError):
+        await hub.subscribe(second, ['BNBUSDT'])
+    assert set(hub.tasks) == {'BTCUSDT', 'ETHUSDT'}
+    await hub.close()
+
+
+async def test_subscription_rejects_non_list_payloads():
+    """Test a string or non-string symbols are rejected instead of iterated"""
+    hub = PriceHub(load_symbols=trading_symbols)
+    subscription = PriceSubscription()
+    for symbols in ('BTCUSDT', ['BTCUSDT', 1], {'BTCUSDT': 1}, ['']):
+        with pytest.raises(ValueError):
+            await hub.subscribe(subscription, symbols)
+        with pytest.raises(ValueError):
+            hub.unsubscribe(subscription, symbols)
+    assert hub.tasks == {} and subscription.symbols == set()
@@ -0,0 +1,50 @@
+from cache import ResultCache
+
+
+def loader(value: bytes, calls: list):
+    async def load() -> bytes:
+        calls.append(value)
+        return value
+    return load
+
+
+async def test_results_cached_until_pair_ingested():
+    """Test ingesting a pair drops its pages and the symbol wide ones only"""
+    cache, calls = ResultCache(ttl=60), []
+    for key in (('BTCUSDT', '1h', 1), ('BTCUSDT', None, 1), ('BTCUSDT', '1d', 1)):
+        await cache.get(key, loader(b'page', calls))
+        await cache.get(key, loader(b'page', calls))
+    assert len(calls) == 3
+
+    cache.invalidate('BTCUSDT', '1h')
+    assert set(cache.entries) == {('BTCUSDT', '1d', 1)}
+    assert cache.stats()['hits'] == 3
+    assert cache.stats()['hit_rate'] == 0.5
+
+
+async def test_result_loaded_during_ingest_not_stored():
+    """Test a page read while candles landed is served but not cached"""
+    cache = ResultCache(ttl=60)
+
+    async def load() -> bytes:
+        cache.invalidate('BTCUSDT', '1h')
+        return b'stale'
+
+    assert await cache.get(('BTCUSDT', '1h'), load) == b'stale'
+    assert cache.entries == {}
+
+
+async def test_results_bounded_and_expire():
+    """Test the least recently used results are evicted past the budget"""
+    cache, calls = ResultCache(max_entries=10, budget=8, ttl=60), []
+    await cache.get(('A', '1h'), loader(b'1234', calls))
+    await cache.get(('B', '1h'), loader(b'1234', calls))
+    await cache.get(('A', '1h'), loader(b'1234', calls))
+    await cache.get(('C', '1h'), loader(b'1234', calls))
+    assert list(cache.entries) == [('A', '1h'), ('C', '1h')]
+    assert cache.nbytes == 8
+
+    cache.ttl = 0
+    await cache.get(('D', '1h'), loader(b'1', calls))
+    await cache.get(('D', '1h'), loader(b'1', calls))
+    assert cache.stats()['expirations'] == 1
@@ -0,0 +1,37 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+from api.schemas import BinanceModel, KlinePage
+from api.serialization import dump_kline_page
+from database import BinanceData
+
+ROWS = [
+    BinanceData(
+        id=i, interval='1h', symbol='BTCUSDT',
+        open_time=datetime(2023, 5, 27, i), open=Decimal('26666.87000000'),
+        high=Decimal('26690.06000000'), low=Decimal('26636.98000000'),
+        close=Decimal('26690.05000000'), volume=Decimal('519.80287000')
+    )
+    for i in range(3)
+]
+
+
+def test_dump_matches_kline_page():
+    """Test the fast path renders the same JSON as the pydantic models"""
+    page = KlinePage(
+        items=[BinanceModel(**row.__dict__) for row in ROWS],
+        size=3, next_cursor='abc'
+    )
+    assert json.loads(dump_kline_page(ROWS, 3, 'abc')) == json.loads(page.json())
+
+
+def test_dump_compact():
+    """Test the compact layout sends one array per kline"""
+    page = json.loads(dump_kline_page(ROWS, 3, None, compact=True))
+
+    assert page['columns'][:4] == ['id', 'interval', 'symbol', 'open_time']
+    assert page['items'][1] == [
+        1, '1h', 'BTCUSDT', '2023-05-27T01:00:00', '26666.87000000',
+        '26690.06000000', '26636.98000000', '26690.05000000', '519.80287000'
+    ]
+    assert page['next_cursor'] is None
@@ -0,0 +1,44 @@
+import gzip
+from export import encode_blob, iter_decoded, render_blob, FileFormat, GZIP, ZSTD, IDENTITY
+
+KLINE = [
+    1685210400000, '26666.87000000', '26690.06000000', '26636.98000000',
+    '26690.05000000', '519.80287000', 1685213999999, '13862481.17',
+    12345, '250.1', '6670000.5', '0'
+]
+
+
+async def chunked(data: bytes, size: int = 7):
+    """Yields data the way ranged blob reads do"""
+    for offset in range(0, len(data), size):
+        yield data[offset:offset + size]
+
+
+def test_blob_hash_ignores_encoding():
+    """Test the content hash dedupes the same file across encodings"""
+    data = b'Open time,Open\n' * 100
+    blobs = [encode_blob(data, encoding) for encoding in (IDENTITY, GZIP, ZSTD)]
+
+    assert len({blob.hash for blob in blobs}) == 1
+    assert all(blob.size == len(data) for blob in blobs)
+    assert gzip.decompress(blobs[1].data) == data
+    assert encode_blob(data, GZIP).data == blobs[1].data
+    assert len(blobs[2].data) < len(data)
+
+
+async def test_iter_decoded_round_trip():
+    """Test streamed decompression returns the original content"""
+    data = b'Open time,Open,High,Low,Close,Volume\n' * 500
+    for encoding in (IDENTITY, GZIP, ZSTD):
+        blob = encode_blob(data, encoding)
+        decoded = b''.join([
+            chunk async for chunk in iter_decoded(chunked(blob.data), encoding)
+        ])
+        assert decoded == data
+
+
+def test_compressed_columnar_stored_as_is():
+    """Test already compressed Parquet files are not compressed again"""
+    blob = render_blob([[KLINE] * 3], FileFormat.PARQUET, 'zstd', ZSTD)
+    assert blob.encoding == IDENTITY
+    assert render_blob([[KLINE] * 3], FileFormat.CSV, None, ZSTD).encoding == ZSTD
@@ -0,0 +1,103 @@
+import asyncio
+import json
+import pytest
+import websockets
+from response_binance import KlineStreamIngester
+
+
+def kline_message(open_time: int, closed: bool) -> str:
+    """Returns a combined stream kline event"""
+    return json.dumps({
+        'stream': 'btcusdt@kline_1m',
+        'data': {
+            'e': 'kline', 's': 'BTCUSDT',
+            'k': {
+                't': open_time, 's': 'BTCUSDT', 'i': '1m',
+                'o': '26666.87000000', 'h': '26690.06000000',
+                'l': '26636.98000000', 'c': '26690.05000000',
+                'v': '519.80287000', 'x': closed
+            }
+        }
+    })
+
+
+async def test_stream_ingests_closed_candles():
+    """Test closed candles from a local websocket server are flushed in batches"""
+    paths, flushed, resumed = [], [], []
+
+    async def fake_binance(websocket):
+        paths.append(websocket.path)
+        await websocket.send(kline_message(1685210400000, closed=True))
+        await websocket.send(kline_message(1685210460000, closed=False))
+        await websocket.send(kline_message(1685210460000, closed=True))
+        await websocket.wait_closed()
+
+    async def flush(rows):
+        flushed.append(rows)
+        return len(rows)
+
+    async def catch_up(symbol, interval):
+        resumed.append((symbol, interval))
+
+    async with websockets.serve(fake_binance, '127.0.0.1', 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        ingester = KlineStreamIngester(
+            ['BTCUSDT'], ['1m'], batch_size=2, flush_interval=0.1,
+            stream_url=f'ws://127.0.0.1:{port}/',
+            flush=flush, catch_up=catch_up
+        )
+        task = asyncio.create_task(ingester.run())
+        for _ in range(50):
+            if flushed:
+                break
+            await asyncio.sleep(0.1)
+        ingester.stop()
+        await asyncio.wait_for(task, 5)
+
+    assert paths == ['/stream?streams=btcusdt@kline_1m']
+    assert resumed == [('BTCUSDT', '1m')]
+    assert [len(rows) for rows in flushed] == [2]
+    assert flushed[0][0]['symbol'] == 'BTCUSDT'
+
+
+async def test_stream_flushes_on_busy_streams():
+    """Test a closed candle is flushed within flush_interval while updates keep arriving"""
+    flushed = []
+
+    async def fake_binance(websocket):
+        await websocket.send(kline_message(1685210400000, closed=True))
+        for _ in range(100):
+            await websocket.send(kline_message(1685210460000, closed=False))
+            await asyncio.sleep(0.05)
+
+    async def flush(rows):
+        flushed.append(list(rows))
+        return len(rows)
+
+    async def catch_up(symbol, interval):
+        pass
+
+    async with websockets.serve(fake_binance, '127.0.0.1', 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        ingester = KlineStreamIngester(
+            ['BTCUSDT'], ['1m'], batch_size=500, flush_interval=0.2,
+            stream_url=f'ws://127.0.0.1:{port}/',
+            flush=flush, catch_up=catch_up
+        )
+        task = asyncio.create_task(ingester.run())
+        await asyncio.sleep(1)
+        assert [len(rows) for rows in flushed] == [1]
+        ingester.stop()
+        await asyncio.wait_for(task, 5)
+
+
+async def test_failed_flush_keeps_rows():
+    """Test rows stay buffered when the upsert fails"""
+    async def flush(rows):
+        raise ConnectionError('database down')
+
+    ingester = KlineStreamIngester(['BTCUSDT'], ['1m'], flush=flush)
+    ingester.handle_message(json.loads(kline_message(1685210400000, closed=True)))
+    with pytest.raises(ConnectionError):
+        await ingester.flush_pending()
+    assert len(ingester.pending) == 1
@@ -0,0 +1,24 @@
+import asyncio
+import logging
+from database import partition_manager
+from export import ExportPool
+from response_binance import BinanceClient, JobWorker
+
+
+async def main():
+    await BinanceClient.start()
+    ExportPool.start()
+    try:
+        await asyncio.gather(JobWorker().run(), partition_manager.run())
+    finally:
+        await ExportPool.close()
+        await BinanceClient.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level='INFO'.upper(),
+        format='%(asctime)s | %(levelname)s | %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    asyncio.run(main())